@@ -0,0 +1,85 @@
+# -*- coding: utf-8 -*-
+"""
+measure how much concurrent searches delay the asyncio event loop.
+
+A ticker coroutine sleeps for a fixed interval and records how late it wakes
+up while several searches run concurrently, once with the blocking
+find_path and once with find_path_async.
+
+    python -m benchmarks.async_latency [--size 200] [--searches 4]
+"""
+import argparse
+import asyncio
+import time
+
+from core.grid import Grid
+from finder.a_star import AStarFinder
+from .util import random_matrix, percentile, Timer
+
+TICK = 0.001  # seconds between two ticks of the latency probe
+
+
+async def ticker(lags, stop):
+    while not stop.is_set():
+        before = time.perf_counter()
+        await asyncio.sleep(TICK)
+        lags.append(time.perf_counter() - before - TICK)
+
+
+async def blocking_search(grid):
+    return AStarFinder().find_path(
+        grid.node(0, 0), grid.node(grid.width - 1, grid.height - 1), grid)
+
+
+async def async_search(grid, yield_every):
+    return await AStarFinder().find_path_async(
+        grid.node(0, 0), grid.node(grid.width - 1, grid.height - 1), grid,
+        yield_every=yield_every)
+
+
+async def measure(grid, searches, make_search):
+    lags = []
+    stop = asyncio.Event()
+    probe = asyncio.ensure_future(ticker(lags, stop))
+    await asyncio.sleep(TICK)  # let the probe start
+    with Timer() as timer:
+        await asyncio.gather(*(make_search(grid) for _ in range(searches)))
+    stop.set()
+    await probe
+    return timer.elapsed, lags
+
+
+def report(name, elapsed, lags):
+    print('{:<24} total {:8.3f}s  ticks {:6d}  lag p50 {:8.3f}ms  '
+          'p99 {:8.3f}ms  max {:8.3f}ms'.format(
+              name, elapsed, len(lags),
+              percentile(lags, 50) * 1000, percentile(lags, 99) * 1000,
+              max(lags or [0]) * 1000))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('--size', type=int, default=200)
+    parser.add_argument('--density', type=float, default=0.2)
+    parser.add_argument('--searches', type=int, default=4)
+    parser.add_argument('--yield-every', type=int, nargs='+',
+                        default=[10, 100, 1000])
+    args = parser.parse_args()
+
+    # all searches share one grid, the finders keep their state apart
+    grid = Grid(matrix=random_matrix(args.size, args.size, args.density))
+    loop = asyncio.new_event_loop()
+    try:
+        report('find_path', *loop.run_until_complete(
+            measure(grid, args.searches, blocking_search)))
+        for k in args.yield_every:
+            report('find_path_async K={}'.format(k),
+                   *loop.run_until_complete(measure(
+                       grid, args.searches,
+                       lambda g, k=k: async_search(g, k))))
+    finally:
+        loop.close()
+
+
+if __name__ == '__main__':
+    main()
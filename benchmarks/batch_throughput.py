@@ -0,0 +1,55 @@
+# -*- coding: utf-8 -*-
+"""
+throughput of finder.batch.find_paths for an increasing amount of workers,
+compared to answering the same queries sequentially in this process.
+
+    python -m benchmarks.batch_throughput [--size 150] [--queries 400]
+"""
+import argparse
+import os
+import random
+
+from core.grid import Grid
+from finder.a_star import AStarFinder
+from finder.batch import find_paths
+from .util import random_matrix, Timer
+
+
+def random_queries(grid, amount, seed=1):
+    rnd = random.Random(seed)
+    cells = [(node.x, node.y) for row in grid.nodes for node in row
+             if node.walkable]
+    return [(rnd.choice(cells), rnd.choice(cells)) for _ in range(amount)]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('--size', type=int, default=150)
+    parser.add_argument('--density', type=float, default=0.2)
+    parser.add_argument('--queries', type=int, default=400)
+    parser.add_argument('--workers', type=int, nargs='+',
+                        default=sorted({1, 2, 4, os.cpu_count() or 1}))
+    args = parser.parse_args()
+
+    grid = Grid(matrix=random_matrix(args.size, args.size, args.density))
+    queries = random_queries(grid, args.queries)
+
+    finder = AStarFinder()
+    with Timer() as timer:
+        for start, end in queries:
+            finder.find_path(grid.node(*start), grid.node(*end), grid)
+    print('{:<12} {:8.3f}s  {:8.1f} queries/s'.format(
+        'sequential', timer.elapsed, len(queries) / timer.elapsed))
+
+    for workers in args.workers:
+        with Timer() as timer:
+            answered = sum(1 for _ in find_paths(
+                grid, queries, max_workers=workers))
+        assert answered == len(queries)
+        print('{:<12} {:8.3f}s  {:8.1f} queries/s'.format(
+            '{} worker(s)'.format(workers), timer.elapsed,
+            answered / timer.elapsed))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,66 @@
+# -*- coding: utf-8 -*-
+"""
+peak RSS of AStarFinder with the default SearchState against the compact
+mode (finder.compact_state) on a large random SparseGrid.
+
+Every mode runs in a fresh interpreter, so the peaks do not mix.
+
+    python -m benchmarks.compact_state [--size 1000] [--density 0.2]
+"""
+import argparse
+import random
+import resource
+import subprocess
+import sys
+
+from core.sparse_grid import SparseGrid
+from finder.a_star import AStarFinder
+from .util import Timer
+
+
+def max_rss():
+    """peak resident set size of this process in MiB"""
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # bytes on macOS, KiB elsewhere
+    return rss / 2.0 ** 20 if sys.platform == 'darwin' else rss / 1024.0
+
+
+def child(args):
+    rnd = random.Random(0)
+    size = args.size
+    obstacles = {(rnd.randrange(size), rnd.randrange(size))
+                 for _ in range(int(size * size * args.density))}
+    obstacles -= {(0, 0), (size - 1, size - 1)}
+    grid = SparseGrid(size, size, obstacles=obstacles)
+    del obstacles
+    finder = AStarFinder(diagonal_movement=args.diagonal_movement,
+                         compact=args.mode == 'compact')
+    with Timer() as timer:
+        path, runs = finder.find_path(
+            grid.node(0, 0), grid.node(size - 1, size - 1), grid)
+    print('{:<8} {:8.2f}s {:9d} runs  path {:6d}  peak RSS {:8.1f} MiB'
+          .format(args.mode, timer.elapsed, runs, len(path), max_rss()))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('--size', type=int, default=1000)
+    parser.add_argument('--density', type=float, default=0.2)
+    parser.add_argument('--diagonal-movement', type=int, default=2)
+    parser.add_argument('--mode', choices=('default', 'compact'),
+                        help='run a single mode in this process')
+    args = parser.parse_args()
+
+    if args.mode:
+        child(args)
+        return
+    for mode in ('default', 'compact'):
+        subprocess.check_call([
+            sys.executable, '-m', 'benchmarks.compact_state',
+            '--size', str(args.size), '--density', str(args.density),
+            '--diagonal-movement', str(args.diagonal_movement),
+            '--mode', mode])
+
+
+if __name__ == '__main__':
+    main()
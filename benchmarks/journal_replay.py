@@ -0,0 +1,82 @@
+# -*- coding: utf-8 -*-
+"""
+headless re-run of the bombs of a journal (see journal.py), with the
+answers compared against the ones given back then.
+
+Every bomb is solved again line by line with HeadlessSession and the
+time per line is reported, as well as the time resume_bomb needs to
+rebuild the game state of the last bomb. Exits with status 1 if an
+answer changed.
+
+    python -m benchmarks.journal_replay [FILE] [--repeat 5]
+"""
+import argparse
+import sys
+
+import eventlog
+import journal
+import keeptalkingandnobodyexplodes as ktane
+from .util import percentile, Timer
+
+
+def rerun(lines):
+    """
+    solve the lines of a journal again
+    :return: (seconds per solved line, list of changed answers)
+    """
+    session = ktane.HeadlessSession()
+    times = []
+    changed = []
+    for line, answer in journal.entries(lines):
+        with Timer() as timer:
+            output = session.feed(line)
+        if output is None:
+            continue
+        times.append(timer.elapsed)
+        if answer is None:
+            continue
+        # "<module>: <answer>", "<module>: game over: <reason>"
+        given = output.split(': ', 1)[1]
+        if given.startswith('game over: '):
+            given = given[len('game over: '):]
+        given = journal.format_answer(given)
+        if given != answer:
+            changed.append((line, answer, given))
+    return times, changed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('journal', nargs='?', default=ktane.JOURNAL_PATH)
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    ktane.events().level = eventlog.OFF
+    lines = journal.read(args.journal)
+    bombs = sum(1 for line in lines if line.strip() == 'bomb')
+
+    best = None
+    for _ in range(args.repeat):
+        times, changed = rerun(lines)
+        if best is None or sum(times) < sum(best):
+            best = times
+    print('{} bombs, {} lines: total {:.2f}ms, p50 {:.1f}us, p99 {:.1f}us'
+          .format(bombs, len(best), sum(best) * 1000,
+                  percentile(best, 50) * 1e6, percentile(best, 99) * 1e6))
+
+    with Timer() as timer:
+        session = ktane.resume_bomb(args.journal)
+    print('resume_bomb {:.2f}ms ({})'.format(
+        timer.elapsed * 1000,
+        'nothing to resume' if session is None else
+        '{} strike(s)'.format(session.state.strike if session.state else 0)))
+
+    for line, before, after in changed:
+        print('{}: {!r} -> {!r}'.format(line, before, after))
+    if changed:
+        print('{} answers changed'.format(len(changed)))
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
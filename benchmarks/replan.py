@@ -0,0 +1,80 @@
+# -*- coding: utf-8 -*-
+"""
+repeated small obstacle changes: incremental D* Lite replanning against a
+fresh AStarFinder search after every change.
+
+Every round blocks a few cells on the current path and opens a few random
+blocked cells, then both finders compute the new path.
+
+    python -m benchmarks.replan [--size 512] [--rounds 20] [--changes 3]
+"""
+import argparse
+import random
+
+from core.grid import Grid
+from finder.a_star import AStarFinder
+from finder.d_star_lite import DStarLiteFinder
+from .util import random_matrix, Timer
+
+
+def toggle(grid, cells):
+    for x, y in cells:
+        node = grid.node(x, y)
+        node.walkable = not node.walkable
+        node.weight = 1
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('--size', type=int, default=512)
+    parser.add_argument('--density', type=float, default=0.2)
+    parser.add_argument('--rounds', type=int, default=20)
+    parser.add_argument('--changes', type=int, default=3)
+    parser.add_argument('--diagonal-movement', type=int, default=2)
+    args = parser.parse_args()
+
+    rnd = random.Random(2)
+    grid = Grid(matrix=random_matrix(args.size, args.size, args.density))
+    start = grid.node(0, 0)
+    end = grid.node(grid.width - 1, grid.height - 1)
+    blocked = [(node.x, node.y) for row in grid.nodes for node in row
+               if not node.walkable]
+
+    d_star = DStarLiteFinder(diagonal_movement=args.diagonal_movement)
+    a_star = AStarFinder(diagonal_movement=args.diagonal_movement)
+    with Timer() as timer:
+        path, runs = d_star.find_path(start, end, grid)
+    print('initial D* Lite plan: {:.3f}s, {} expansions'.format(
+        timer.elapsed, runs))
+
+    d_time = a_time = 0.0
+    d_runs = a_runs = 0
+    for _ in range(args.rounds):
+        inner = path[1:-1]
+        cells = rnd.sample(inner, min(args.changes, len(inner)))
+        cells += rnd.sample(blocked, args.changes)
+        toggle(grid, cells)
+
+        with Timer() as timer:
+            d_star.notify_changed(cells)
+            path, runs = d_star.replan()
+        d_time += timer.elapsed
+        d_runs += runs
+
+        with Timer() as timer:
+            a_path, runs = a_star.find_path(start, end, grid)
+        a_time += timer.elapsed
+        a_runs += runs
+        assert bool(path) == bool(a_path)
+        if not path:
+            break
+
+    rounds = args.rounds
+    print('D* Lite replan  {:8.2f}ms/round {:10.0f} expansions/round'.format(
+        d_time / rounds * 1000, d_runs / rounds))
+    print('fresh A*        {:8.2f}ms/round {:10.0f} expansions/round'.format(
+        a_time / rounds * 1000, a_runs / rounds))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,180 @@
+# -*- coding: utf-8 -*-
+"""
+differential check of the solvers compiled from rules.py against the
+hand-written solvers they replaced.
+
+Every Simple Wires input (3-6 wires of 5 colors), every button and every
+complicated wire is solved with both on every game state that makes a
+difference to the rules: serial number odd or even, 0-3 batteries and
+CAR, FRK and PARALLEL missing, unlit or lit. Exits with status 1 on the
+first difference.
+
+    python -m benchmarks.rules_check
+"""
+import itertools
+import sys
+
+import eventlog
+import keeptalkingandnobodyexplodes as ktane
+import rules
+
+WIRE_COLORS = rules.WIRE_COLORS
+BUTTON_COLORS = rules.BUTTON_COLORS + ("black",)
+BUTTON_TEXTS = rules.BUTTON_TEXTS + ("",)
+INDICATORS = ("CAR", "FRK", "PARALLEL")
+
+
+# the solvers before rules.py (tables and if/elif chains)
+COMPLICATED_WIRES_DIAGRAM = {"x": 1, "r": 2, "b": 2, "br": 2, "rs": 1, "brs": 3, "blrs": 0,
+                             "blr": 2, "lr": 4, "s": 1, "bl": 3, "bls": 3, "ls": 4, "lrs": 4,
+                             "bs": 0, "l": 0}
+
+
+def legacy_parse_wire_module(wires, state):
+
+    def last_occurence(value, iterable):
+        return max(loc for loc, val in enumerate(iterable) if val == value) + 1
+
+    if len(wires) == 3:  # 3 wires:
+        if "red" not in wires:  # If there are no red wires,
+            return 2            # cut the second wire.
+        elif wires[-1] == "white":  # Otherwise, if the last wire is white,
+            return 3                # cut the last wire.
+        elif wires.count("blue") > 1:             # Otherwise, if there is more than one blue wire,
+            return last_occurence("blue", wires)  # cut the last blue wire.
+        else:         # Otherwise,
+            return 3  # cut the last wire.
+    elif len(wires) == 4:  # 4 wires:
+        if wires.count("red") > 1 and state.odd:  # If there is more than one red wire and the last
+                                                  # digit of the serial number is odd, 
+            return last_occurence("red", wires)   # cut the last red wire.
+        elif wires[-1] == "yellow" and "red" not in wires: # Otherwise, if the last wire is yellow
+                                                           # and there are no red wires,
+            return 1                                       # cut the first wire.
+        elif wires.count("blue") == 1:  # Otherwise, if there is exactly one blue wire,
+            return 1                    # cut the first wire.
+        elif wires.count("yellow") > 1:  # Otherwise, if there is more than one yellow wire,
+            return 4                     # cut the last wire.
+        else:         # Otherwise,
+            return 2  # cut the second wire.
+    elif len(wires) == 5:  # 5 wires:
+        if wires[-1] == "black" and state.odd:  # If the last wire is black and the last digit of
+                                                # the serial number is odd,
+            return 4                            # cut the fourth wire.
+        elif (wires.count("red") == 1 and  # Otherwise, if there is exactly one red wire and
+              wires.count("yellow") > 1):  # there is more than one yellow wire,
+            return 1                       # cut the first wire.
+        elif "black" not in wires:  # Otherwise, if there are no black wires,
+            return 2                # cut the second wire.
+        else:         # Otherwise,
+            return 1  # cut the first wire.
+    elif len(wires) == 6:  # 6 wires:
+        if "yellow" not in wires and state.odd:  # If there are no yellow wires and the last digit
+                                                 # of the serial number is odd,
+            return 3                             # cut the third wire.
+        elif (wires.count("yellow") == 1 and  # Otherwise, if there is exactly one yellow wire and
+              wires.count("white") > 1):      # there is more than one white wire,
+            return 4                          # cut the fourth wire.
+        elif "red" not in wires:  # Otherwise, if there are no red wires,
+            return 6              # cut the last wire.
+        else:         # Otherwise,
+            return 4  # cut the fourth wire.
+    else:
+        raise ktane.MalformedInput(
+            "Simple Wires module can only contain 3-6 wires, got {} instead".format(
+                len(wires)))
+
+
+def legacy_parse_button_module_initial(color, text, state):
+
+    if color == "blue" and text == "abort":  # 1. If the button is blue and the button says "Abort",
+        return False                         # hold the button.
+    elif state.battery > 1 and text == "detonate":  # 2. If there is more than 1 battery on the bomb
+                                                    # and the button says "Detonate",
+        return True                                 # press and immediately release the button.
+    elif color == "white" and state.lit.get("CAR"):  # 3. If the button is white and there is a lit
+                                                     # indicator with label CAR,
+        return False                                 # hold the button.
+    elif state.battery > 2 and state.lit.get("FRK"):  # 4. If there are more than 2 batteries on the
+                                                      # bomb and a lit indicator with label FRK
+        return True                                   # press and immediately release the button.
+    elif color == "yellow":  # 5. If the button is yellow,
+        return False         # hold the button.
+    elif color == "red" and text == "hold":  # 6. If the button is red and the button says "Hold",
+        return True                          # press and immediately release the button.
+    else:             # 7. If none of the above apply,
+        return False  # hold the button.
+
+
+def legacy_parse_comp_wires_module(wires, state):
+
+    solved = []
+    for i in wires:
+        i = ''.join(sorted(i))
+        solution = COMPLICATED_WIRES_DIAGRAM[i]
+        if solution == 2:
+            solution = state.even
+        elif solution == 3:
+            solution = state.ind.get("PARALLEL", False)
+        elif solution == 4:
+            solution = (state.battery > 1)
+        else:
+            solution = bool(solution)
+        solved.append(solution)
+
+    return solved
+
+
+def states():
+    """every game state that makes a difference to the rules"""
+    for serial in ("A0", "A1"):
+        for battery in range(4):
+            for kinds in itertools.product((None, "unlit", "lit"),
+                                           repeat=len(INDICATORS)):
+                indicators = [label for label, kind in zip(INDICATORS, kinds)
+                              if kind]
+                lit = [label for label, kind in zip(INDICATORS, kinds)
+                       if kind == "lit"]
+                yield ktane.setup_state(battery, 0, indicators, lit, serial)
+
+
+def check(name, state, inputs, new, old):
+    for value in inputs:
+        expected, got = old(value, state), new(value, state)
+        if expected != got:
+            print('{} differs for {!r} (battery {}, indicators {}, lit {}, '
+                  'serial {}): {!r} != {!r}'.format(
+                      name, value, state.battery, list(state.ind),
+                      list(state.lit), state.code, expected, got))
+            sys.exit(1)
+    return len(inputs)
+
+
+def main():
+    ktane.events().level = eventlog.OFF
+    wires = [list(wires) for amount in range(3, 7)
+             for wires in itertools.product(WIRE_COLORS, repeat=amount)]
+    buttons = list(itertools.product(BUTTON_COLORS, BUTTON_TEXTS))
+    comp_wires = [[code] for code in COMPLICATED_WIRES_DIAGRAM]
+    checked = count = 0
+    for state in states():
+        count += 1
+        checked += check('wires', state, wires, ktane.parse_wire_module,
+                         legacy_parse_wire_module)
+        checked += check(
+            'button', state, buttons,
+            lambda button, state: ktane.parse_button_module_initial(
+                *button, state),
+            lambda button, state: legacy_parse_button_module_initial(
+                *button, state))
+        checked += check(
+            'complicated wires', state, comp_wires,
+            ktane.parse_comp_wires_module,
+            lambda wires, state: [
+                bool(cut) for cut in legacy_parse_comp_wires_module(
+                    wires, state)])
+    print('{} answers on {} game states are the same'.format(checked, count))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,140 @@
+# -*- coding: utf-8 -*-
+"""
+load generator for the solver service (see service.py): latency and
+requests per second of concurrent, pipelined stations.
+
+Every connection is a station solving its own bomb: it sets the bomb up
+and then sends the module lines and solver calls of MIX over and over,
+keeping up to --depth requests in flight. The latency of a request is the
+time from sending it until its response is read. Without --port a service
+is started in a subprocess on a free port. Exits with status 1 if a
+request got an error.
+
+    python -m benchmarks.service_load [--connections 8] [--depth 16]
+                                      [--requests 20000] [--port PORT]
+"""
+import argparse
+import asyncio
+import json
+import subprocess
+import sys
+import time
+
+from .util import percentile, Timer
+
+SETUP = ['bomb', 'batteries 3 2', 'indicators FRK CAR PARALLEL', 'lit FRK',
+         'serial AB3DE4']
+
+# requests of a station, without id and bomb
+MIX = [
+    {'line': 'wires red blue yellow'},
+    {'line': 'wires red red blue black'},
+    {'line': 'button red hold'},
+    {'line': 'release blue'},
+    {'line': 'keypad s zh lo co'},
+    {'line': 'simon red blue'},
+    {'line': 'memory 3 1 2 3 4'},
+    {'line': 'won yes ready first no blank nothing yes'},
+    {'line': 'compwires r bs x brs'},
+    {'line': 'caesar HELLO'},
+    {'line': 'maze 1 2 1 1 6 6'},
+    {'call': 'parse_wire_module', 'args': [['red', 'white', 'blue', 'black']]},
+    {'call': 'parse_button_module_initial', 'args': ['blue', 'abort']},
+    {'call': 'parse_keypad_module', 'args': [['ae', 'ps', 'b', 'o']]},
+    {'call': 'get_path', 'args': [0, [1, 2], [6, 6]]},
+]
+
+
+async def station(host, port, bomb, count, depth, latencies, errors):
+    reader, writer = await asyncio.open_connection(host, port)
+    requests = [dict(line=line) for line in SETUP]
+    requests += [MIX[i % len(MIX)] for i in range(count - len(requests))]
+    sent = {}
+    slots = asyncio.Semaphore(depth)
+
+    async def send():
+        for number, request in enumerate(requests):
+            await slots.acquire()
+            sent[number] = time.perf_counter()
+            writer.write(json.dumps(dict(request, id=number, bomb=bomb))
+                         .encode() + b'\n')
+            await writer.drain()
+
+    sender = asyncio.ensure_future(send())
+    for _ in requests:
+        response = json.loads(await reader.readline())
+        latencies.append(time.perf_counter() - sent.pop(response['id']))
+        if 'error' in response:
+            errors.append(response)
+        slots.release()
+    await sender
+    writer.write(json.dumps({'id': -1, 'bomb': bomb, 'call': 'close'})
+                 .encode() + b'\n')
+    await reader.readline()
+    writer.close()
+
+
+async def run(host, port, connections, requests, depth):
+    latencies = []
+    errors = []
+    with Timer() as timer:
+        await asyncio.gather(*(
+            station(host, port, 'station {}'.format(number),
+                    requests // connections, depth, latencies, errors)
+            for number in range(connections)))
+    return timer.elapsed, latencies, errors
+
+
+def start_service():
+    """
+    start service.py on a free port
+    :return: (process, port)
+    """
+    process = subprocess.Popen(
+        [sys.executable, 'service.py', '--port', '0', '--log-level', 'off'],
+        stdout=subprocess.PIPE, universal_newlines=True)
+    line = process.stdout.readline()  # "listening on host:port"
+    if not line.startswith('listening on'):
+        process.kill()
+        sys.exit('service.py did not start')
+    return process, int(line.rsplit(':', 1)[1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('--connections', type=int, default=8)
+    parser.add_argument('--depth', type=int, default=16,
+                        help='requests in flight per connection')
+    parser.add_argument('--requests', type=int, default=20000)
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int,
+                        help='port of a running service (default: start one)')
+    args = parser.parse_args()
+
+    process = None
+    port = args.port
+    if port is None:
+        process, port = start_service()
+    try:
+        elapsed, latencies, errors = asyncio.run(run(
+            args.host, port, args.connections, args.requests, args.depth))
+    finally:
+        if process is not None:
+            process.terminate()
+            process.wait()
+
+    print('{} connections, depth {}: {} requests in {:.3f}s, {:.0f} req/s'.format(
+        args.connections, args.depth, len(latencies), elapsed,
+        len(latencies) / elapsed))
+    print('latency p50 {:8.3f}ms  p99 {:8.3f}ms  max {:8.3f}ms'.format(
+        percentile(latencies, 50) * 1000, percentile(latencies, 99) * 1000,
+        max(latencies or [0]) * 1000))
+    for response in errors[:10]:
+        print('error:', response)
+    if errors:
+        print('{} requests failed'.format(len(errors)))
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
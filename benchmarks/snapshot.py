@@ -0,0 +1,63 @@
+# -*- coding: utf-8 -*-
+"""
+save/load time and size of finder.snapshot for a search interrupted half
+way, and a check that the resumed search finds the same path.
+
+    python -m benchmarks.snapshot [--size 512] [--max-runs 20000] [--compact]
+"""
+import argparse
+
+from core.grid import Grid
+from finder.a_star import AStarFinder
+from finder.finder import ExecutionRunsException
+from finder import snapshot
+from .util import random_matrix, Timer
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('--size', type=int, default=512)
+    parser.add_argument('--density', type=float, default=0.2)
+    parser.add_argument('--max-runs', type=int, default=20000)
+    parser.add_argument('--diagonal-movement', type=int, default=2)
+    parser.add_argument('--compact', action='store_true',
+                        help='snapshot a CompactSearchState')
+    args = parser.parse_args()
+
+    matrix = random_matrix(args.size, args.size, args.density)
+    grid = Grid(matrix=matrix)
+    start = grid.node(0, 0)
+    end = grid.node(grid.width - 1, grid.height - 1)
+    expected, _ = AStarFinder(
+        diagonal_movement=args.diagonal_movement).find_path(start, end, grid)
+
+    try:
+        AStarFinder(diagonal_movement=args.diagonal_movement,
+                    max_runs=args.max_runs, compact=args.compact).find_path(start, end, grid)
+        print('search finished within {} runs, nothing to snapshot'.format(
+            args.max_runs))
+        return
+    except ExecutionRunsException as e:
+        state = e.state
+
+    with Timer() as timer:
+        data = snapshot.dumps(grid, state, start, end)
+    touched = state.size if args.compact else len(state.g)
+    print('dumps: {:.3f}s, {} bytes ({} {}, {} open)'.format(
+        timer.elapsed, len(data), touched,
+        'cells' if args.compact else 'touched nodes', len(state.open_list)))
+    with Timer() as timer:
+        restored = snapshot.loads(data)
+    print('loads: {:.3f}s'.format(timer.elapsed))
+
+    finder = AStarFinder(diagonal_movement=args.diagonal_movement,
+                         compact=args.compact)
+    with Timer() as timer:
+        path, runs = finder.find_path(restored.start, restored.end,
+                                      restored.grid, state=restored.state)
+    print('resumed search: {:.3f}s, {} runs in total, same path: {}'.format(
+        timer.elapsed, runs, path == expected))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,68 @@
+# -*- coding: utf-8 -*-
+"""
+memory and search time of Grid against SparseGrid on a mostly open map.
+
+    python -m benchmarks.sparse_grid [--size 1000] [--density 0.02]
+"""
+import argparse
+import random
+import tracemalloc
+
+from core.grid import Grid
+from core.sparse_grid import SparseGrid
+from finder.a_star import AStarFinder
+from .util import Timer
+
+
+def build(grid_class, size, obstacles):
+    """
+    create a grid and measure the memory it holds
+    :return: grid, allocated bytes
+    """
+    tracemalloc.start()
+    if grid_class is SparseGrid:
+        grid = SparseGrid(size, size, obstacles=obstacles)
+        # obstacles have the default weight, only their bits are stored
+        assert not grid.weights, '{} obstacle weights stored'.format(
+            len(grid.weights))
+    else:
+        grid = Grid(size, size)
+        for x, y in obstacles:
+            grid.node(x, y).walkable = False
+            grid.node(x, y).weight = 0
+    allocated = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    return grid, allocated
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('--size', type=int, default=1000)
+    parser.add_argument('--density', type=float, default=0.02)
+    parser.add_argument('--diagonal-movement', type=int, default=2)
+    args = parser.parse_args()
+
+    rnd = random.Random(0)
+    size = args.size
+    obstacles = {(rnd.randrange(size), rnd.randrange(size))
+                 for _ in range(int(size * size * args.density))}
+    obstacles -= {(0, 0), (size - 1, size - 1)}
+
+    paths = []
+    for grid_class in (Grid, SparseGrid):
+        with Timer() as timer:
+            grid, allocated = build(grid_class, size, obstacles)
+        built = timer.elapsed
+        finder = AStarFinder(diagonal_movement=args.diagonal_movement)
+        with Timer() as timer:
+            path, runs = finder.find_path(
+                grid.node(0, 0), grid.node(size - 1, size - 1), grid)
+        paths.append(path)
+        print('{:<10} build {:.2f}s, {:.1f} MiB, search {:.2f}s '
+              '({} runs)'.format(grid_class.__name__, built,
+                                 allocated / 2 ** 20, timer.elapsed, runs))
+    print('same path: {}'.format(paths[0] == paths[1]))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,90 @@
+# -*- coding: utf-8 -*-
+"""
+startup budget check: import time of the entry modules measured with
+`python -X importtime`, and modules they must not import eagerly.
+
+Each module is imported in a fresh interpreter --runs times and the
+fastest cumulative import time is compared with its budget. The script
+exits with status 1 if a budget is exceeded or a lazy import turned
+eager again.
+
+    python -m benchmarks.startup [--runs 5] [--scale 1.0]
+"""
+import argparse
+import subprocess
+import sys
+
+# module -> (import time budget in ms, modules it must not pull in)
+BUDGETS = {
+    'keeptalkingandnobodyexplodes': (
+        25, ('easygui', 'tkinter', 'pathfinder', 'core.grid', 'numpy',
+             'asyncio', 'eventlog', 'rules', 'tables', 'journal')),
+    'pathfinder': (60, ('numpy', 'asyncio', 'easygui')),
+    'core.grid': (30, ('numpy',)),
+}
+
+
+def import_times(module):
+    """
+    import module in a fresh interpreter
+    :return: {imported module: cumulative import time in microseconds}
+    """
+    result = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', 'import ' + module],
+        stderr=subprocess.PIPE, stdout=subprocess.DEVNULL,
+        universal_newlines=True, check=True)
+    times = {}
+    for line in result.stderr.splitlines():
+        if not line.startswith('import time:'):
+            continue
+        _, cumulative, name = line[len('import time:'):].split('|')
+        try:
+            times[name.strip()] = int(cumulative)
+        except ValueError:
+            # the header line
+            continue
+    return times
+
+
+def check(module, budget, forbidden, runs, scale):
+    """
+    :return: list of problems (empty if the module is within its budget)
+    """
+    best = None
+    imported = set()
+    for _ in range(runs):
+        times = import_times(module)
+        imported |= set(times)
+        took = times.get(module, 0) / 1000.0
+        best = took if best is None else min(best, took)
+    limit = budget * scale
+    problems = []
+    if best > limit:
+        problems.append('{} took {:.1f}ms, budget {:.1f}ms'.format(
+            module, best, limit))
+    for name in forbidden:
+        if name in imported:
+            problems.append('{} imports {} eagerly'.format(module, name))
+    print('{:<32} {:7.1f}ms (budget {:5.1f}ms) {}'.format(
+        module, best, limit, 'ok' if not problems else 'FAILED'))
+    return problems
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('--runs', type=int, default=5)
+    parser.add_argument('--scale', type=float, default=1.0,
+                        help='multiply all budgets (for slow machines)')
+    args = parser.parse_args()
+
+    problems = []
+    for module, (budget, forbidden) in sorted(BUDGETS.items()):
+        problems += check(module, budget, forbidden, args.runs, args.scale)
+    for problem in problems:
+        print(problem)
+    if problems:
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
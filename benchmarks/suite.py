@@ -0,0 +1,190 @@
+# -*- coding: utf-8 -*-
+"""
+benchmark suite of AStarFinder with a regression gate.
+
+Runs AStarFinder on random grids of several sizes and obstacle densities
+with every DiagonalMovement mode and every heuristic of core.heuristic,
+plus the nine maze matrices of pathfinder. Every case reports the best
+wall time of --repeat runs, the expansions, expansions per second, the
+peak memory of the search (tracemalloc) and the memory blocks its search
+state holds.
+
+    python -m benchmarks.suite [--quick] [--save baseline.json]
+    python -m benchmarks.suite --compare baseline.json [--threshold 0.15]
+
+--compare exits with status 1 if the expansions per second of a case
+dropped by more than the threshold (a fraction) against the baseline.
+"""
+import argparse
+import json
+import platform
+import sys
+import tracemalloc
+
+from core import heuristic
+from core.diagonal_movement import DiagonalMovement
+from core.grid import Grid
+from finder.a_star import AStarFinder
+import pathfinder
+from .util import random_matrix, Timer
+
+SIZES = (32, 64, 128)
+QUICK_SIZES = (32, 64)
+DENSITIES = (0.0, 0.2, 0.35)
+MODES = (
+    ('always', DiagonalMovement.always),
+    ('never', DiagonalMovement.never),
+    ('at_most_one', DiagonalMovement.if_at_most_one_obstacle),
+    ('no_obstacle', DiagonalMovement.only_when_no_obstacle),
+)
+HEURISTICS = ('null', 'manhatten', 'euclidean', 'chebyshev', 'octile')
+# start and end cells of the maze queries (maze coordinates as in
+# pathfinder.get_path)
+MAZE_CELLS = ((1, 1), (6, 6), (3, 2), (1, 6), (6, 1), (4, 5))
+DEFAULT_THRESHOLD = 0.15
+
+
+def run_search(finder, start, end, grid):
+    """
+    Finder.find_path, but the SearchState is returned as well
+    so its memory can be measured while it is alive
+    :return: path, runs, state
+    """
+    state = finder.init_search(start, end, grid)
+    while state.open_list:
+        path = finder.expand(start, end, grid, state)
+        if path:
+            return path, state.runs, state
+    return [], state.runs, state
+
+
+def measure(queries, repeat):
+    """
+    run (finder, start, end, grid) queries
+    :return: dict of the measured values
+    """
+    best = None
+    for _ in range(repeat):
+        with Timer() as timer:
+            runs = sum(finder.find_path(start, end, grid)[1]
+                       for finder, start, end, grid in queries)
+        best = timer.elapsed if best is None else min(best, timer.elapsed)
+
+    peak = blocks = 0
+    for finder, start, end, grid in queries:
+        tracemalloc.start()
+        before = sys.getallocatedblocks()
+        path, _, state = run_search(finder, start, end, grid)
+        blocks = max(blocks, sys.getallocatedblocks() - before)
+        peak = max(peak, tracemalloc.get_traced_memory()[1])
+        tracemalloc.stop()
+        del path, state
+
+    return {
+        'time': best,
+        'expansions': runs,
+        'expansions_per_s': runs / best if best else 0.0,
+        'peak_kib': peak / 1024.0,
+        'blocks': blocks,
+    }
+
+
+def grid_cases(sizes):
+    for size in sizes:
+        for density in DENSITIES:
+            grid = Grid(matrix=random_matrix(size, size, density))
+            start = grid.node(0, 0)
+            end = grid.node(size - 1, size - 1)
+            for mode_name, mode in MODES:
+                for name in HEURISTICS:
+                    finder = AStarFinder(
+                        heuristic=getattr(heuristic, name),
+                        diagonal_movement=mode)
+                    yield ('grid-{}-d{:.2f}-{}-{}'.format(
+                        size, density, mode_name, name),
+                        [(finder, start, end, grid)])
+
+
+def maze_cases():
+    finder = AStarFinder(diagonal_movement=DiagonalMovement.never)
+    for number, matrix in enumerate(pathfinder.matrixes):
+        grid = Grid(matrix=matrix)
+        queries = []
+        for s in MAZE_CELLS:
+            for e in MAZE_CELLS:
+                if s != e:
+                    start = grid.node(s[0] * 2 - 1, s[1] * 2 - 1)
+                    end = grid.node(e[0] * 2 - 1, e[1] * 2 - 1)
+                    queries.append((finder, start, end, grid))
+        yield 'maze-{}'.format(number), queries
+
+
+def compare(results, baseline, threshold):
+    """
+    print the change of every case against the baseline
+    :return: names of the cases that regressed
+    """
+    regressed = []
+    for name, result in sorted(results.items()):
+        old = baseline.get(name)
+        if old is None or not old['expansions_per_s']:
+            continue
+        change = result['expansions_per_s'] / old['expansions_per_s'] - 1
+        note = ''
+        if result['expansions'] != old['expansions']:
+            note = ' (expansions {} -> {})'.format(
+                old['expansions'], result['expansions'])
+        if change < -threshold:
+            regressed.append(name)
+            note = ' REGRESSION' + note
+        print('{:<40} {:+7.1%}{}'.format(name, change, note))
+    return regressed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('--quick', action='store_true',
+                        help='smaller grids only')
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--filter', default='',
+                        help='only run cases whose name contains this')
+    parser.add_argument('--save', help='write the results to this file')
+    parser.add_argument('--compare', help='baseline file to compare with')
+    parser.add_argument('--threshold', type=float, default=DEFAULT_THRESHOLD,
+                        help='allowed drop of expansions per second')
+    args = parser.parse_args()
+
+    cases = list(grid_cases(QUICK_SIZES if args.quick else SIZES))
+    cases += list(maze_cases())
+    results = {}
+    for name, queries in cases:
+        if args.filter not in name:
+            continue
+        result = results[name] = measure(queries, args.repeat)
+        print('{:<40} {:9.2f}ms {:8d} exp {:10.0f} exp/s {:9.1f}KiB '
+              '{:7d} blocks'.format(
+                  name, result['time'] * 1000, result['expansions'],
+                  result['expansions_per_s'], result['peak_kib'],
+                  result['blocks']))
+
+    if args.save:
+        with open(args.save, 'w') as f:
+            json.dump({
+                'python': platform.python_version(),
+                'platform': platform.platform(),
+                'cases': results,
+            }, f, indent=2, sort_keys=True)
+
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)['cases']
+        print()
+        regressed = compare(results, baseline, args.threshold)
+        if regressed:
+            print('{} of {} cases regressed by more than {:.0%}'.format(
+                len(regressed), len(results), args.threshold))
+            sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,40 @@
+# -*- coding: utf-8 -*-
+"""
+helpers shared by the benchmark scripts (run them from the repository root,
+e.g. `python -m benchmarks.async_latency`)
+"""
+import random
+import time
+
+
+def random_matrix(width, height, density=0.2, seed=0):
+    """
+    create a matrix for core.grid.Grid with roughly `density` of the cells
+    blocked. The corners are always kept walkable.
+    """
+    rnd = random.Random(seed)
+    matrix = [[0 if rnd.random() < density else 1 for _ in range(width)]
+              for _ in range(height)]
+    matrix[0][0] = matrix[-1][-1] = 1
+    matrix[0][-1] = matrix[-1][0] = 1
+    return matrix
+
+
+def percentile(values, pct):
+    """nearest-rank percentile of a list of numbers"""
+    if not values:
+        return 0.0
+    values = sorted(values)
+    index = min(len(values) - 1, max(0, int(round(pct / 100.0 * len(values))) - 1))
+    return values[index]
+
+
+class Timer(object):
+    """context manager measuring wall time in seconds"""
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.elapsed = time.perf_counter() - self.start
+        return False
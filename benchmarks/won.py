@@ -0,0 +1,103 @@
+# -*- coding: utf-8 -*-
+"""
+per-call latency of parse_won_module (precomputed WON_RANKS) against the
+former version that built its tables on every call.
+
+Both run over every label and random option sets, the answers are checked
+to be the same.
+
+    python -m benchmarks.won [--count 2000] [--repeat 5]
+"""
+import argparse
+import random
+import sys
+import timeit
+
+import keeptalkingandnobodyexplodes as ktane
+
+
+def legacy_parse_won_module(label, options, state):
+    """parse_won_module before WON_RANKS (the tables are built per call)"""
+    read = {"yes": 2, "first": 1, "display": 5, "okay": 1, "says": 5, "nothing": 2, "-": 4,
+            "blank": 3, "no": 5, "led": 2, "lead": 5, "read": 3, "red": 3, "reed": 4, "leed": 4,
+            "holdon": 5, "you": 3, "youare": 5, "your": 3, "you're": 3, "ur": 0, "there": 5,
+            "they're": 4, "their": 3, "theyare": 2, "see": 5, "c": 1, "cee": 5}
+
+    choose = {'ready': ['yes', 'okay', 'what', 'middle', 'left', 'press', 'right', 'blank', 'ready', 'no', 'first', 'uhhh', 'nothing', 'wait'],
+              'first': ['left', 'okay', 'yes', 'middle', 'no', 'right', 'nothing', 'uhhh', 'wait', 'ready', 'blank', 'what', 'press', 'first'],
+              'no': ['blank', 'uhhh', 'wait', 'first', 'what', 'ready', 'right', 'yes', 'nothing', 'left', 'press', 'okay', 'no', 'middle'],
+              'blank': ['wait', 'right', 'okay', 'middle', 'blank', 'press', 'ready', 'nothing', 'no', 'what', 'left', 'uhhh', 'yes', 'first'],
+              'nothing': ['uhhh', 'right', 'okay', 'middle', 'yes', 'blank', 'no', 'press', 'left', 'what', 'wait', 'first', 'nothing', 'ready'],
+              'yes': ['okay', 'right', 'uhhh', 'middle', 'first', 'what', 'press', 'ready', 'nothing', 'yes', 'left', 'blank', 'no', 'wait'],
+              'what': ['uhhh', 'what', 'left', 'nothing', 'ready', 'blank', 'middle', 'no', 'okay', 'first', 'wait', 'yes', 'press', 'right'],
+              'uhhh': ['ready', 'nothing', 'left', 'what', 'okay', 'yes', 'right', 'no', 'press', 'blank', 'uhhh', 'middle', 'wait', 'first'],
+              'left': ['right', 'left', 'first', 'no', 'middle', 'yes', 'blank', 'what', 'uhhh', 'wait', 'press', 'ready', 'okay', 'nothing'],
+              'right': ['yes', 'nothing', 'ready', 'press', 'no', 'wait', 'what', 'right', 'middle', 'left', 'uhhh', 'blank', 'okay', 'first'],
+              'middle': ['blank', 'ready', 'okay', 'what', 'nothing', 'press', 'no', 'wait', 'left', 'middle', 'right', 'first', 'uhhh', 'yes'],
+              'okay': ['middle', 'no', 'first', 'yes', 'uhhh', 'nothing', 'wait', 'okay', 'left', 'ready', 'blank', 'press', 'what', 'right'],
+              'wait': ['uhhh', 'no', 'blank', 'okay', 'yes', 'left', 'first', 'press', 'what', 'wait', 'nothing', 'ready', 'right', 'middle'],
+              'press': ['right', 'middle', 'yes', 'ready', 'press', 'okay', 'nothing', 'uhhh', 'blank', 'left', 'first', 'what', 'no', 'wait'],
+              'you': ['sure', 'youare', 'your', "you're", 'next', 'uhhuh', 'ur', 'hold', 'what?', 'you', 'uhuh', 'like', 'done', 'u'],
+              'youare': ['your', 'next', 'like', 'uhhuh', 'what?', 'done', 'uhuh', 'hold', 'you', 'u', "you're", 'sure', 'ur', 'youare'],
+              'your': ['uhuh', 'youare', 'uhhuh', 'your', 'next', 'ur', 'sure', 'u', "you're", 'you', 'what?', 'hold', 'like', 'done'],
+              "you're": ['you', "you're", 'ur', 'next', 'uhuh', 'youare', 'u', 'your', 'what?', 'uhhuh', 'sure', 'done', 'like', 'hold'],
+              'ur': ['done', 'u', 'ur', 'uhhuh', 'what?', 'sure', 'your', 'hold', "you're", 'like', 'next', 'uhuh', 'youare', 'you'],
+              'u': ['uhhuh', 'sure', 'next', 'what?', "you're", 'ur', 'uhuh', 'done', 'u', 'you', 'like', 'hold', 'youare', 'your'],
+              'uhhuh': ['uhhuh', 'your', 'youare', 'you', 'done', 'hold', 'uhuh', 'next', 'sure', 'like', "you're", 'ur', 'u', 'what?'],
+              'uhuh': ['ur', 'u', 'youare', "you're", 'next', 'uhuh', 'done', 'you', 'uhhuh', 'like', 'your', 'sure', 'hold', 'what?'],
+              'what?': ['you', 'hold', "you're", 'your', 'u', 'done', 'uhuh', 'like', 'youare', 'uhhuh', 'ur', 'next', 'what?', 'sure'],
+              'done': ['sure', 'uhhuh', 'next', 'what?', 'your', 'ur', "you're", 'hold', 'like', 'you', 'u', 'youare', 'uhuh', 'done'],
+              'next': ['what?', 'uhhuh', 'uhuh', 'your', 'hold', 'sure', 'next', 'like', 'done', 'youare', 'ur', "you're", 'u', 'you'],
+              'hold': ['youare', 'u', 'done', 'uhuh', 'you', 'ur', 'sure', 'what?', "you're", 'next', 'hold', 'uhhuh', 'your', 'like'],
+              'sure': ['youare', 'done', 'like', "you're", 'you', 'hold', 'uhhuh', 'ur', 'sure', 'u', 'what?', 'next', 'your', 'uhuh'],
+              'like': ["you're", 'next', 'u', 'ur', 'hold', 'done', 'uhuh', 'what?', 'uhhuh', 'you', 'like', 'sure', 'youare', 'your']}
+
+    order = choose[options[read[label]]]
+    correct = []
+    for i in order:
+        for j in options:
+            if i == j:
+                return j
+
+
+def queries(count, seed=0):
+    """
+    (label, options) pairs, options are 6 words of one priority list group
+    """
+    rnd = random.Random(seed)
+    groups = [[], []]
+    for label in ktane.WON_CHOOSE:
+        groups[label in ktane.WON_CHOOSE['you']].append(label)
+    labels = sorted(ktane.WON_READ)
+    return [(rnd.choice(labels), rnd.sample(rnd.choice(groups), 6))
+            for _ in range(count)]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('--count', type=int, default=2000)
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    state = ktane.GameState()
+    cases = queries(args.count)
+    for label, options in cases:
+        old = legacy_parse_won_module(label, options, state)
+        new = ktane.parse_won_module(label, options, state)
+        if old != new:
+            print('answers differ for {} {}: {} != {}'.format(
+                label, options, old, new))
+            sys.exit(1)
+
+    for name, function in (('legacy', legacy_parse_won_module),
+                           ('ranks', ktane.parse_won_module)):
+        best = min(timeit.repeat(
+            lambda: [function(label, options, state)
+                     for label, options in cases],
+            number=1, repeat=args.repeat))
+        print('{:<8} {:8.3f}us per call'.format(
+            name, best / len(cases) * 1e6))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,118 @@
+# -*- coding: utf-8 -*-
+# largest agent size the clearance is computed for by default
+MAX_AGENT_SIZE = 8
+
+_numpy = []
+
+
+def numpy():
+    """
+    NumPy module (or None if it is not installed), imported the first time
+    a clearance map is built so importing the grid stays cheap
+    """
+    if not _numpy:
+        try:
+            import numpy as np
+        except ImportError:
+            np = None
+        _numpy.append(np)
+    return _numpy[0]
+
+
+class ClearanceMap(object):
+    """
+    size of the largest free square anchored (with its top left corner) at
+    each cell, capped at max_size. An agent of size n fits on a cell if its
+    clearance is at least n.
+    """
+    def __init__(self, grid, max_size=MAX_AGENT_SIZE):
+        self.grid = grid
+        self.max_size = max_size
+        self.values = []
+        self.build()
+
+    def build(self):
+        """
+        compute the clearance of all cells. With NumPy the walkable plane is
+        eroded once per size, otherwise a dynamic program runs from the
+        bottom right corner.
+        """
+        grid = self.grid
+        width, height = grid.width, grid.height
+        np = numpy()
+        if np is not None and width and height:
+            free = np.array([[node.walkable for node in row]
+                             for row in grid.nodes], dtype=bool)
+            values = free.astype(np.int32)
+            for _ in range(1, self.max_size):
+                # a square of size k is free if the four squares of size
+                # k - 1 at its corners are free
+                shrunk = np.zeros_like(free)
+                shrunk[:-1, :-1] = free[:-1, :-1] & free[1:, :-1] & \
+                    free[:-1, 1:] & free[1:, 1:]
+                free = shrunk
+                if not free.any():
+                    break
+                values += free
+            self.values = values.tolist()
+            return
+
+        self.values = [[0] * width for _ in range(height)]
+        self._update_rect(0, 0, width, height)
+
+    def _update_rect(self, x0, y0, x1, y1):
+        """
+        recompute the cells of a rectangle from the bottom right, cells
+        right of and below the rectangle have to be up to date
+        """
+        self._update_spans({y: [(x0, x1)] for y in range(y0, y1)})
+
+    def _update_spans(self, spans):
+        """
+        recompute cells given as {y: [(x0, x1), ..]}, row by row from the
+        bottom and each row from the right, so every cell sees its updated
+        right and lower neighbors
+        """
+        grid = self.grid
+        values = self.values
+        width, height = grid.width, grid.height
+        max_size = self.max_size
+        for y in sorted(spans, reverse=True):
+            row = values[y]
+            below = values[y + 1] if y + 1 < height else None
+            nodes = grid.nodes[y]
+            for x0, x1 in sorted(spans[y], reverse=True):
+                for x in range(x1 - 1, x0 - 1, -1):
+                    if not nodes[x].walkable:
+                        row[x] = 0
+                    elif below is None or x + 1 >= width:
+                        row[x] = 1
+                    else:
+                        row[x] = min(max_size, 1 + min(
+                            row[x + 1], below[x], below[x + 1]))
+
+    def update(self, x, y):
+        """
+        update the clearance after the walkability of cell (x, y) changed
+        """
+        self.update_rects([(x, y, x + 1, y + 1)])
+
+    def update_rects(self, rects):
+        """
+        update the clearance after cells inside the (x0, y0, x1, y1)
+        rectangles changed. Only squares anchored up and left of a changed
+        cell can contain it.
+        """
+        size = self.max_size
+        spans = {}
+        for x0, y0, x1, y1 in rects:
+            for y in range(max(0, y0 - size + 1), y1):
+                spans.setdefault(y, []).append((max(0, x0 - size + 1), x1))
+        self._update_spans(spans)
+
+    def fits(self, x, y, agent_size):
+        """
+        check, if an agent of agent_size cells fits with its top left
+        corner on (x, y)
+        """
+        return self.values[y][x] >= agent_size
@@ -0,0 +1,204 @@
+# -*- coding: utf-8 -*-
+from collections import deque
+from .diagonal_movement import DiagonalMovement
+
+# neighbor offsets for 4- and 8-connected grids
+OFFSETS_4 = ((0, -1), (1, 0), (0, 1), (-1, 0))
+OFFSETS_8 = OFFSETS_4 + ((-1, -1), (1, -1), (1, 1), (-1, 1))
+# the union-find labels are renumbered once there are this many times more
+# labels than after the last renumbering
+COMPACT_FACTOR = 4
+# renumbering takes one pass over the cells, so there are at least
+# width * height / COMPACT_CELLS (and MIN_LABELS) labels in between
+COMPACT_CELLS = 256
+MIN_LABELS = 64
+
+
+def connectivity(diagonal_movement):
+    """
+    amount of neighbors that decide if two cells are connected.
+    If a diagonal step needs at least one free orthogonal cell, that cell
+    connects both ends already, so only DiagonalMovement.always differs
+    from a 4-connected grid.
+    """
+    return 8 if diagonal_movement == DiagonalMovement.always else 4
+
+
+class ComponentIndex(object):
+    """
+    labels the connected components of the walkable cells of a grid, so
+    a finder can reject a query between two components in O(1).
+
+    Every cell stores a label, labels are merged using union-find when a
+    cell becomes walkable and split by a local flood fill when a cell gets
+    blocked.
+    """
+    def __init__(self, grid, diagonal_movement=DiagonalMovement.never):
+        self.grid = grid
+        self.width = grid.width
+        self.height = grid.height
+        self.offsets = OFFSETS_8 \
+            if connectivity(diagonal_movement) == 8 else OFFSETS_4
+        # label per cell (y * width + x), -1 for blocked cells
+        self.labels = []
+        # union-find parent per label
+        self.parent = []
+        # amount of labels after which they are renumbered (see compact)
+        self.limit = 0
+        self.build()
+
+    def _new_label(self):
+        self.parent.append(len(self.parent))
+        return len(self.parent) - 1
+
+    def find(self, label):
+        """
+        representative label of the component label belongs to
+        """
+        parent = self.parent
+        root = label
+        while parent[root] != root:
+            root = parent[root]
+        while parent[label] != root:
+            parent[label], label = root, parent[label]
+        return root
+
+    def build(self):
+        """
+        label all cells of the grid using a flood fill
+        """
+        width, height = self.width, self.height
+        walkable = self.grid.walkable
+        self.labels = labels = [-1] * (width * height)
+        self.parent = []
+        for y in range(height):
+            for x in range(width):
+                if labels[y * width + x] == -1 and walkable(x, y):
+                    self._fill(x, y, self._new_label())
+        self._set_limit()
+
+    def _set_limit(self):
+        self.limit = COMPACT_FACTOR * max(
+            len(self.parent), MIN_LABELS,
+            self.width * self.height // COMPACT_CELLS)
+
+    def compact(self):
+        """
+        renumber the labels to one label per component. Merges and splits
+        only ever add labels, so without this the union-find array keeps
+        growing while the grid changes.
+        """
+        labels = self.labels
+        find = self.find
+        renumbered = {}
+        for index, label in enumerate(labels):
+            if label != -1:
+                root = find(label)
+                label = renumbered.get(root)
+                if label is None:
+                    label = renumbered[root] = len(renumbered)
+                labels[index] = label
+        self.parent = list(range(len(renumbered)))
+        self._set_limit()
+
+    def _fill(self, x, y, label, targets=None):
+        """
+        flood fill the component of (x, y) with label.
+        If targets (a set of cell indices) is given, stop as soon as all of
+        them were reached.
+        :return: True if all targets were reached
+        """
+        width, height = self.width, self.height
+        walkable = self.grid.walkable
+        labels = self.labels
+        offsets = self.offsets
+        labels[y * width + x] = label
+        queue = deque([(x, y)])
+        if targets is not None:
+            targets.discard(y * width + x)
+        while queue:
+            if targets is not None and not targets:
+                return True
+            cx, cy = queue.popleft()
+            for dx, dy in offsets:
+                nx, ny = cx + dx, cy + dy
+                if not (0 <= nx < width and 0 <= ny < height):
+                    continue
+                index = ny * width + nx
+                if labels[index] != label and walkable(nx, ny):
+                    labels[index] = label
+                    queue.append((nx, ny))
+                    if targets is not None:
+                        targets.discard(index)
+        return targets is None or not targets
+
+    def label(self, x, y):
+        """
+        component of a cell (None for blocked cells)
+        """
+        label = self.labels[y * self.width + x]
+        return None if label == -1 else self.find(label)
+
+    def connected(self, node_a, node_b):
+        """
+        check, if there can be a path from node_a to node_b.
+        :return: True or False, None if node_a is blocked (a search may
+            still leave a blocked start node)
+        """
+        label_a = self.label(node_a.x, node_a.y)
+        if label_a is None:
+            return None
+        return label_a == self.label(node_b.x, node_b.y)
+
+    def _neighbor_cells(self, x, y):
+        width, height = self.width, self.height
+        labels = self.labels
+        cells = []
+        for dx, dy in self.offsets:
+            nx, ny = x + dx, y + dy
+            if 0 <= nx < width and 0 <= ny < height and \
+                    labels[ny * width + nx] != -1:
+                cells.append((nx, ny))
+        return cells
+
+    def update(self, x, y):
+        """
+        update the labels after the walkability of cell (x, y) changed.
+        Has to be called right after each single change.
+        """
+        index = y * self.width + x
+        walkable = self.grid.walkable(x, y)
+        if walkable == (self.labels[index] != -1):
+            return
+        if len(self.parent) > self.limit:
+            self.compact()
+        neighbors = self._neighbor_cells(x, y)
+
+        if walkable:
+            roots = {self.label(nx, ny) for nx, ny in neighbors}
+            if not roots:
+                self.labels[index] = self._new_label()
+                return
+            root = roots.pop()
+            for other in roots:
+                self.parent[other] = root
+            self.labels[index] = root
+            return
+
+        # the cell got blocked, its component might fall apart
+        root = self.find(self.labels[index])
+        self.labels[index] = -1
+        width = self.width
+        pending = [ny * width + nx for nx, ny in neighbors]
+        # flood fill from one neighbor after another with a fresh label.
+        # A fill that reaches all remaining neighbors stops early and is
+        # merged back into the old component, every fill that runs dry
+        # split off a component of its own.
+        while len(pending) > 1:
+            start = pending.pop(0)
+            targets = set(pending)
+            label = self._new_label()
+            if self._fill(start % width, start // width, label, targets):
+                self.parent[label] = root
+                return
+            pending = [cell for cell in pending if cell in targets]
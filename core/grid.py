@@ -1,12 +1,56 @@
 # -*- coding: utf-8 -*-
+import collections
+import sys
+import weakref
 from .node import Node
-try:
-    import numpy as np
-    USE_NUMPY = True
-except ImportError:
-    USE_NUMPY = False
+from .components import ComponentIndex, connectivity
+from .clearance import ClearanceMap, MAX_AGENT_SIZE
 from core.diagonal_movement import DiagonalMovement
 
+# dirty rectangles of a patch are recorded per tile of this size
+DIRTY_TILE = 16
+# amount of patches whose dirty rectangles are kept (see changes_since)
+HISTORY_SIZE = 64
+
+
+def rect_cells(rect):
+    """
+    all (x, y) positions of a (x0, y0, x1, y1) rectangle (x1/y1 exclusive)
+    """
+    x0, y0, x1, y1 = rect
+    return [(x, y) for y in range(y0, y1) for x in range(x0, x1)]
+
+
+def dirty_rects(cells, tile=DIRTY_TILE):
+    """
+    bounding rectangles of the given (x, y) cells, one per tile of the grid
+    """
+    tiles = {}
+    for x, y in cells:
+        key = (x // tile, y // tile)
+        rect = tiles.get(key)
+        if rect is None:
+            tiles[key] = [x, y, x + 1, y + 1]
+        else:
+            rect[0] = min(rect[0], x)
+            rect[1] = min(rect[1], y)
+            rect[2] = max(rect[2], x + 1)
+            rect[3] = max(rect[3], y + 1)
+    return [tuple(rect) for key, rect in sorted(tiles.items())]
+
+
+def is_matrix(matrix):
+    """
+    check, if matrix is a non-empty 2D-list/tuple or NumPy array.
+    NumPy is not imported for this, an array can only exist if somebody
+    imported it already.
+    """
+    if isinstance(matrix, (tuple, list)):
+        return True
+    np = sys.modules.get('numpy')
+    return np is not None and isinstance(matrix, np.ndarray) and \
+        matrix.size > 0
+
 
 def build_nodes(width, height, matrix=None, inverse=False):
     """
@@ -15,8 +59,7 @@ def build_nodes(width, height, matrix=None, inverse=False):
     :rtype : list
     """
     nodes = []
-    use_matrix = (isinstance(matrix, (tuple, list))) or \
-        (USE_NUMPY and isinstance(matrix, np.ndarray) and matrix.size > 0)
+    use_matrix = is_matrix(matrix)
 
     for y in range(height):
         nodes.append([])
@@ -39,11 +82,26 @@ class Grid(object):
         """
         self.width = width
         self.height = height
-        if isinstance(matrix, (tuple, list)) or (
-                USE_NUMPY and isinstance(matrix, np.ndarray) and
-                matrix.size > 0):
+        if is_matrix(matrix):
             self.height = len(matrix)
             self.width = self.width = len(matrix[0]) if self.height > 0 else 0
+        self._build(matrix, inverse)
+        # component indices by diagonal movement (see build_component_index)
+        self.components = {}
+        # largest free square per cell (see build_clearance)
+        self.clearance = None
+        # bumped by every apply_patch
+        self.version = 0
+        # (version, dirty rectangles) of the last patches
+        self.history = collections.deque(maxlen=HISTORY_SIZE)
+        self._subscribers = []
+        # (key, cells, lines) of the last base layer grid_str rendered
+        self._render_cache = None
+
+    def _build(self, matrix, inverse):
+        """
+        create the storage of the tiles (a Node per tile)
+        """
         if self.width > 0 and self.height > 0:
             self.nodes = build_nodes(self.width, self.height, matrix, inverse)
         else:
@@ -73,31 +131,192 @@ class Grid(object):
         """
         return self.inside(x, y) and self.nodes[y][x].walkable
 
-    def neighbors(self, node, diagonal_movement=DiagonalMovement.never):
+    def set_walkable(self, x, y, walkable, weight=None):
+        """
+        change if a tile is walkable (and optionally its weight),
+        see apply_patch
+        """
+        self.apply_patch([(x, y, walkable, weight)])
+
+    def apply_patch(self, changes):
+        """
+        change tiles of the grid. This is the only way to change the grid
+        that keeps the structures derived from it (component indices,
+        clearance map, subscribers) up to date.
+        Every patch bumps the version of the grid and records the
+        rectangles that changed.
+        :param changes: iterable of (x, y, walkable) or
+            (x, y, walkable, weight) tuples, a weight of None keeps the
+            current weight
+        :return: list of dirty (x0, y0, x1, y1) rectangles (x1/y1 exclusive)
+        """
+        indices = list({id(index): index
+                        for index in self.components.values()}.values())
+        changed = []
+        for change in changes:
+            x, y, walkable = change[:3]
+            weight = change[3] if len(change) > 3 else None
+            if not self._set_cell(x, y, bool(walkable), weight):
+                continue
+            changed.append((x, y))
+            # the component index splits and merges one tile at a time
+            for index in indices:
+                index.update(x, y)
+        if not changed:
+            return []
+
+        rects = dirty_rects(changed)
+        self.version += 1
+        self.history.append((self.version, rects))
+        if self.clearance is not None:
+            self.clearance.update_rects(rects)
+        for subscriber in list(self._subscribers):
+            callback = subscriber()
+            if callback is None:
+                self._subscribers.remove(subscriber)
+            else:
+                callback(self, rects)
+        return rects
+
+    def _set_cell(self, x, y, walkable, weight=None):
+        """
+        store walkable (and weight, unless it is None) of a tile
+        :return: True if the tile changed
+        """
+        node = self.nodes[y][x]
+        if node.walkable == walkable and \
+                (weight is None or node.weight == weight):
+            return False
+        node.walkable = walkable
+        if weight is not None:
+            node.weight = weight
+        return True
+
+    def changes_since(self, version):
+        """
+        dirty rectangles of all patches after the given version
+        :return: list of rectangles or None if the history does not reach
+            back far enough (rebuild everything in that case)
+        """
+        if version == self.version:
+            return []
+        if not self.history or self.history[0][0] > version + 1:
+            return None
+        return [rect for patch_version, rects in self.history
+                if patch_version > version for rect in rects]
+
+    def subscribe(self, callback):
+        """
+        call callback(grid, rects) after every apply_patch.
+        Bound methods are only referenced weakly, so a derived structure
+        does not stay alive because it watches a grid.
+        """
+        if hasattr(callback, '__self__'):
+            ref = weakref.WeakMethod(callback)
+        else:
+            def ref():
+                return callback
+            ref.callback = callback
+        self._subscribers.append(ref)
+
+    def unsubscribe(self, callback):
+        for subscriber in list(self._subscribers):
+            if subscriber() == callback:
+                self._subscribers.remove(subscriber)
+
+    def build_clearance(self, max_size=MAX_AGENT_SIZE):
+        """
+        precompute the clearance map used for agents larger than one tile.
+        It is kept up to date by set_walkable.
+        :param max_size: largest agent size the map has to answer for
+        :return: ClearanceMap
+        """
+        if self.clearance is None or self.clearance.max_size < max_size:
+            self.clearance = ClearanceMap(self, max_size)
+        return self.clearance
+
+    def fits(self, x, y, agent_size=1):
+        """
+        check, if an agent of agent_size x agent_size tiles can stand with
+        its top left corner on the tile
+        """
+        if agent_size <= 1:
+            return self.walkable(x, y)
+        return self.inside(x, y) and \
+            self.build_clearance(max(agent_size, MAX_AGENT_SIZE)).fits(
+                x, y, agent_size)
+
+    def build_component_index(self,
+                              diagonal_movement=DiagonalMovement.never):
+        """
+        label the connected areas of the grid, so finders can reject
+        queries between two areas without searching.
+        The index has to be kept up to date by changing the grid with
+        set_walkable only.
+        :return: ComponentIndex
+        """
+        index = self.components.get(diagonal_movement)
+        if index is None:
+            for mode, other in self.components.items():
+                if connectivity(mode) == connectivity(diagonal_movement):
+                    index = other
+                    break
+            else:
+                index = ComponentIndex(self, diagonal_movement)
+            self.components[diagonal_movement] = index
+        return index
+
+    def connected(self, node_a, node_b,
+                  diagonal_movement=DiagonalMovement.never):
+        """
+        check, if node_b can be reached from node_a.
+        :return: True or False, None if it is unknown (no component index
+            was built for the diagonal movement or node_a is blocked)
+        """
+        index = self.components.get(diagonal_movement)
+        if index is None:
+            return None
+        return index.connected(node_a, node_b)
+
+    def neighbors(self, node, diagonal_movement=DiagonalMovement.never,
+                  agent_size=1):
         """
         get all neighbors of one node
         :param node: node
+        :param agent_size: only return neighbors an agent of this size (in
+            tiles, anchored at its top left corner) fits on
         """
         x = node.x
         y = node.y
+        if agent_size > 1:
+            values = self.build_clearance(
+                max(agent_size, MAX_AGENT_SIZE)).values
+            width, height = self.width, self.height
+
+            def walkable(x, y):
+                return 0 <= x < width and 0 <= y < height and \
+                    values[y][x] >= agent_size
+        else:
+            walkable = self.walkable
+        node_at = self.node
         neighbors = []
         s0 = d0 = s1 = d1 = s2 = d2 = s3 = d3 = False
 
         # ↑
-        if self.walkable(x, y - 1):
-            neighbors.append(self.nodes[y - 1][x])
+        if walkable(x, y - 1):
+            neighbors.append(node_at(x, y - 1))
             s0 = True
         # →
-        if self.walkable(x + 1, y):
-            neighbors.append(self.nodes[y][x + 1])
+        if walkable(x + 1, y):
+            neighbors.append(node_at(x + 1, y))
             s1 = True
         # ↓
-        if self.walkable(x, y + 1):
-            neighbors.append(self.nodes[y + 1][x])
+        if walkable(x, y + 1):
+            neighbors.append(node_at(x, y + 1))
             s2 = True
         # ←
-        if self.walkable(x - 1, y):
-            neighbors.append(self.nodes[y][x - 1])
+        if walkable(x - 1, y):
+            neighbors.append(node_at(x - 1, y))
             s3 = True
 
         if diagonal_movement == DiagonalMovement.never:
@@ -117,20 +336,20 @@ class Grid(object):
             d0 = d1 = d2 = d3 = True
 
         # ↖
-        if d0 and self.walkable(x - 1, y - 1):
-            neighbors.append(self.nodes[y - 1][x - 1])
+        if d0 and walkable(x - 1, y - 1):
+            neighbors.append(node_at(x - 1, y - 1))
 
         # ↗
-        if d1 and self.walkable(x + 1, y - 1):
-            neighbors.append(self.nodes[y - 1][x + 1])
+        if d1 and walkable(x + 1, y - 1):
+            neighbors.append(node_at(x + 1, y - 1))
 
         # ↘
-        if d2 and self.walkable(x + 1, y + 1):
-            neighbors.append(self.nodes[y + 1][x + 1])
+        if d2 and walkable(x + 1, y + 1):
+            neighbors.append(node_at(x + 1, y + 1))
 
         # ↙
-        if d3 and self.walkable(x - 1, y + 1):
-            neighbors.append(self.nodes[y + 1][x - 1])
+        if d3 and walkable(x - 1, y + 1):
+            neighbors.append(node_at(x - 1, y + 1))
 
         return neighbors
 
@@ -139,10 +358,35 @@ class Grid(object):
             for node in y_nodes:
                 node.cleanup()
 
+    def _render_base(self, border, empty_chr, block_chr, show_weight):
+        """
+        the static layer of grid_str: one string per tile and the lines
+        made from them (with border if wanted)
+        """
+        cells = []
+        for y_nodes in self.nodes:
+            row = []
+            for node in y_nodes:
+                if node.walkable:
+                    # empty field
+                    if show_weight:
+                        row.append(
+                            str(node.weight) if node.weight < 10 else '+')
+                    else:
+                        row.append(empty_chr)
+                else:
+                    row.append(block_chr)  # blocked field
+            cells.append(row)
+        lines = [''.join(row) for row in cells]
+        if border:
+            edge = '+{}+'.format('-' * len(cells[0] if cells else ()))
+            lines = [edge] + ['|' + line + '|' for line in lines] + [edge]
+        return cells, lines
+
     def grid_str(self, path=None, start=None, end=None,
                  border=True, start_chr='s', end_chr='e',
                  path_chr='x', empty_chr=' ', block_chr='#',
-                 show_weight=False):
+                 show_weight=False, cache=False):
         """
         create a printable string from the grid using ASCII characters
 
@@ -157,32 +401,42 @@ class Grid(object):
         :param block_chr: character for blocking elements (default "#")
         :param show_weight: instead of empty_chr show the cost of each empty
                             field (shows a + if the value of weight is > 10)
+        :param cache: keep the rendered tiles until the grid version changes,
+                      so the next call only draws path, start and end (only
+                      use it if the grid is changed with apply_patch)
         :return:
         """
-        data = ''
-        if border:
-            data = '+{}+'.format('-'*len(self.nodes[0]))
-        for y in range(len(self.nodes)):
-            line = ''
-            for x in range(len(self.nodes[y])):
-                node = self.nodes[y][x]
-                if node == start:
-                    line += start_chr
-                elif node == end:
-                    line += end_chr
-                elif path and ((node.x, node.y) in path or node in path):
-                    line += path_chr
-                elif node.walkable:
-                    # empty field
-                    weight = str(node.weight) if node.weight < 10 else '+'
-                    line += weight if show_weight else empty_chr
-                else:
-                    line += block_chr  # blocked field
-            if border:
-                line = '|'+line+'|'
-            if data:
-                data += '\n'
-            data += line
-        if border:
-            data += '\n+{}+'.format('-'*len(self.nodes[0]))
-        return data
+        key = (self.version, border, empty_chr, block_chr, show_weight)
+        if cache and self._render_cache is not None and \
+                self._render_cache[0] == key:
+            cells, lines = self._render_cache[1:]
+        else:
+            cells, lines = self._render_base(
+                border, empty_chr, block_chr, show_weight)
+            if cache:
+                self._render_cache = (key, cells, lines)
+
+        # characters drawn over the base layer, start wins over end and
+        # both win over the path
+        overlay = {}
+        for step in path or ():
+            pos = (step.x, step.y) if isinstance(step, Node) else tuple(step)
+            overlay[pos] = path_chr
+        if end is not None:
+            overlay[(end.x, end.y)] = end_chr
+        if start is not None:
+            overlay[(start.x, start.y)] = start_chr
+
+        rows = {}
+        for (x, y), char in overlay.items():
+            if 0 <= y < len(cells) and 0 <= x < len(cells[y]):
+                rows.setdefault(y, []).append((x, char))
+        lines = list(lines)
+        for y, changes in rows.items():
+            row = list(cells[y])
+            for x, char in changes:
+                row[x] = char
+            line = ''.join(row)
+            lines[y + 1 if border else y] = \
+                '|' + line + '|' if border else line
+        return '\n'.join(lines)
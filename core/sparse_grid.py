@@ -0,0 +1,171 @@
+# -*- coding: utf-8 -*-
+import weakref
+from .grid import Grid
+from .node import Node
+
+# width and height of a chunk of the obstacle bitsets
+CHUNK_SIZE = 64
+
+
+class NodeRows(object):
+    """
+    read-only stand-in for Grid.nodes of a SparseGrid, so code walking the
+    rows (grid_str, snapshots, ...) keeps working. Every row is
+    materialised when it is accessed.
+    """
+    def __init__(self, grid):
+        self.grid = grid
+
+    def __len__(self):
+        return self.grid.height
+
+    def __getitem__(self, y):
+        grid = self.grid
+        if y < 0:
+            y += grid.height
+        if not 0 <= y < grid.height:
+            if grid.height == 0 and y == 0:
+                return []
+            raise IndexError('row {} is outside the grid'.format(y))
+        return [grid.node(x, y) for x in range(grid.width)]
+
+    def __iter__(self):
+        for y in range(self.grid.height):
+            yield self[y]
+
+
+class SparseGrid(Grid):
+    """
+    grid for huge, mostly open maps. Only obstacles (as one bitset per
+    chunk of CHUNK_SIZE x CHUNK_SIZE tiles) and tiles with a non-default
+    weight are stored, so memory grows with the content of the map instead
+    of its area. Nodes are created when they are asked for and cached as
+    long as somebody (e.g. a running search) holds them, which makes a
+    search slower than on a Grid (see benchmarks/sparse_grid.py).
+
+    A walkable tile has the weight 1 and a blocked tile the weight 0
+    unless another weight is set (like Grid with a matrix).
+    """
+    def __init__(self, width=0, height=0, matrix=None, inverse=False,
+                 obstacles=None, chunk_size=CHUNK_SIZE):
+        """
+        :param width: width of the grid (ignored if a matrix is given)
+        :param height: height of the grid (ignored if a matrix is given)
+        :param matrix: 2D-list like for Grid
+        :param inverse: see Grid
+        :param obstacles: iterable of (x, y) positions of blocked tiles
+        :param chunk_size: width and height of a chunk (a power of two)
+        """
+        if chunk_size < 8 or chunk_size & (chunk_size - 1):
+            raise ValueError('chunk_size has to be a power of two >= 8')
+        self.chunk_size = chunk_size
+        self._shift = chunk_size.bit_length() - 1
+        super(SparseGrid, self).__init__(width=width, height=height,
+                                         matrix=matrix, inverse=inverse)
+        for x, y in obstacles or ():
+            self._set_cell(x, y, False, 0)
+
+    def _build(self, matrix, inverse):
+        # blocked bits per chunk, (cx, cy) -> bytearray
+        self.chunks = {}
+        # weights that differ from the default of the tile, (x, y) -> weight
+        self.weights = {}
+        self._cache = weakref.WeakValueDictionary()
+        if matrix is None or not self.width or not self.height:
+            return
+        for y in range(self.height):
+            row = matrix[y]
+            for x in range(self.width):
+                weight = int(row[x])
+                walkable = weight <= 0 if inverse else weight >= 1
+                if weight != 1 or not walkable:
+                    self._set_cell(x, y, walkable, weight)
+
+    @property
+    def nodes(self):
+        return NodeRows(self)
+
+    def _bit(self, x, y):
+        shift = self._shift
+        mask = self.chunk_size - 1
+        return (x >> shift, y >> shift), ((y & mask) << shift) | (x & mask)
+
+    def _blocked(self, x, y):
+        shift = self._shift
+        bits = self.chunks.get((x >> shift, y >> shift))
+        if bits is None:
+            return False
+        mask = self.chunk_size - 1
+        index = ((y & mask) << shift) | (x & mask)
+        return bool(bits[index >> 3] >> (index & 7) & 1)
+
+    def walkable(self, x, y):
+        """
+        check, if the tile is inside grid and if it is set as walkable
+        """
+        if not (0 <= x < self.width and 0 <= y < self.height):
+            return False
+        shift = self._shift
+        bits = self.chunks.get((x >> shift, y >> shift))
+        if bits is None:
+            return True
+        mask = self.chunk_size - 1
+        index = ((y & mask) << shift) | (x & mask)
+        return not bits[index >> 3] >> (index & 7) & 1
+
+    def weight(self, x, y):
+        """
+        weight of a tile
+        """
+        weight = self.weights.get((x, y))
+        if weight is None:
+            return 0 if self._blocked(x, y) else 1
+        return weight
+
+    def node(self, x, y):
+        """
+        get node at position (created on demand)
+        :param x: x pos
+        :param y: y pos
+        :return:
+        """
+        pos = (x, y)
+        node = self._cache.get(pos)
+        if node is None:
+            walkable = not self._blocked(x, y)
+            weight = self.weights.get(pos, 1 if walkable else 0)
+            node = self._cache[pos] = Node(
+                x=x, y=y, walkable=walkable, weight=weight)
+        return node
+
+    def _set_cell(self, x, y, walkable, weight=None):
+        blocked = self._blocked(x, y)
+        old_weight = self.weight(x, y)
+        if weight is None:
+            weight = old_weight
+        if blocked != walkable and weight == old_weight:
+            return False
+
+        key, index = self._bit(x, y)
+        if blocked == walkable:
+            bits = self.chunks.get(key)
+            if bits is None:
+                size = self.chunk_size
+                bits = self.chunks[key] = bytearray(size * size // 8)
+            bits[index >> 3] ^= 1 << (index & 7)
+            if walkable and not any(bits):
+                del self.chunks[key]
+        if weight == (1 if walkable else 0):
+            self.weights.pop((x, y), None)
+        else:
+            self.weights[(x, y)] = weight
+
+        node = self._cache.get((x, y))
+        if node is not None:
+            node.walkable = walkable
+            node.weight = weight
+        return True
+
+    def cleanup(self):
+        for node in list(self._cache.values()):
+            node.cleanup()
@@ -7,12 +7,22 @@ import copy
 SQRT2 = math.sqrt(2)
 
 
-def backtrace(node):
+def backtrace(node, parents=None):
     """
     Backtrace according to the parent records and return the path.
     (including both start and end nodes)
+    :param parents: mapping from the (x, y) position of a node to the
+        position of its parent (see finder.search_state.SearchState).
+        If not given node.parent is followed.
     """
     path = [(node.x, node.y)]
+    if parents is not None:
+        pos = path[0]
+        while pos in parents:
+            pos = parents[pos]
+            path.append(pos)
+        path.reverse()
+        return path
     while node.parent:
         node = node.parent
         path.append((node.x, node.y))
@@ -20,13 +30,13 @@ def backtrace(node):
     return path
 
 
-def bi_backtrace(node_a, node_b):
+def bi_backtrace(node_a, node_b, parents=None):
     """
     Backtrace from start and end node, returns the path for bi-directional A*
     (including both start and end nodes)
     """
-    path_a = backtrace(node_a)
-    path_b = backtrace(node_b)
+    path_a = backtrace(node_a, parents)
+    path_b = backtrace(node_b, parents)
     path_b.reverse()
     return path_a + path_b
 
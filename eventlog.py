@@ -0,0 +1,133 @@
+"""Structured event log, written by a background thread.
+
+EventLog.event() only appends the event to a ring buffer of recent events
+and, if its level is high enough, puts it on a queue. A daemon thread
+formats the events and writes them, so the solver never waits for the
+console. The ring buffer keeps the last events of every level for crash
+reports (see EventLog.dump).
+
+    events = EventLog(level=INFO)
+    events.event("solve", module="wires", inputs=["red", "blue", "red"],
+                 outputs=2, latency=0.00002)
+"""
+
+import atexit
+import collections
+import sys
+import time
+
+DEBUG = 10
+INFO = 20
+WARNING = 30
+ERROR = 40
+OFF = 100
+
+LEVELS = {"debug": DEBUG, "info": INFO, "warning": WARNING, "error": ERROR, "off": OFF}
+LEVEL_NAMES = {level: name.upper() for name, level in LEVELS.items()}
+
+# amount of recent events kept for crash reports
+CAPACITY = 200
+# seconds the writer collects events before it writes them
+FLUSH_INTERVAL = 0.05
+
+
+def format_event(event):
+    """One line of text of an event."""
+
+    created, level, message, fields = event
+    line = (f"LOG {time.strftime('%Y-%m-%d %H:%M:%S', time.gmtime(created))}"
+            f".{int(created % 1 * 1000000):06d} {LEVEL_NAMES.get(level, level)}: {message}")
+    for key, value in fields.items():
+        if isinstance(value, (list, tuple)):
+            value = " ".join(str(i) for i in value)
+        if isinstance(value, str):
+            line += f" {key}={value!r}"
+        elif isinstance(value, float):
+            line += f" {key}={value:.6g}"
+        else:
+            line += f" {key}={value}"
+    return line
+
+
+class EventLog:
+    def __init__(self, stream=None, level=INFO, capacity=CAPACITY):
+        """
+        Arguments:
+        stream (file object): Where the events are written, sys.stderr
+        if not given.
+        level (int): Events below this level are only kept in the ring buffer.
+        capacity (int): Amount of recent events kept.
+        """
+
+        self.stream = stream
+        self.level = level
+        self.recent = collections.deque(maxlen=capacity)
+        self.queue = None
+        self.thread = None
+
+    def event(self, message, level=INFO, **fields):
+        """Logs an event with structured fields (module, inputs, outputs, latency...)."""
+
+        for key, value in fields.items():
+            # the caller may change its lists later, keep them as they are now
+            if isinstance(value, (list, set)):
+                fields[key] = tuple(value)
+            elif isinstance(value, dict):
+                fields[key] = dict(value)
+        event = (time.time(), level, message, fields)
+        self.recent.append(event)
+        if level >= self.level:
+            if self.thread is None:
+                self.start()
+            self.queue.put(event)
+
+    def start(self):
+        """Starts the writer thread, done by the first event that is written.
+
+        threading is only imported here, most runs never write an event.
+        """
+
+        import queue
+        import threading
+
+        if self.queue is None:
+            self.queue = queue.SimpleQueue()
+            atexit.register(self.close)
+        self.thread = threading.Thread(target=self.write, args=(self.queue,),
+                                       name="eventlog", daemon=True)
+        self.thread.start()
+
+    def write(self, events):
+        stream = self.stream or sys.stderr
+        while True:
+            batch = [events.get()]
+            if batch[0] is not None:
+                # leave the interpreter to the solver for a moment and
+                # write everything queued meanwhile at once
+                time.sleep(FLUSH_INTERVAL)
+            while not events.empty() and batch[-1] is not None:
+                batch.append(events.get())
+            stop = batch[-1] is None
+            if stop:
+                batch.pop()
+            try:
+                stream.write("".join(format_event(event) + "\n" for event in batch))
+                stream.flush()
+            except (OSError, ValueError):
+                # the stream is gone (closed pipe), drop the events
+                pass
+            if stop:
+                break
+
+    def close(self):
+        """Writes the queued events and stops the writer thread."""
+
+        thread, self.thread = self.thread, None
+        if thread is not None:
+            self.queue.put(None)
+            thread.join()
+
+    def dump(self):
+        """The recent events as text, oldest first."""
+
+        return "\n".join(format_event(event) for event in list(self.recent))
@@ -1,16 +1,18 @@
 # -*- coding: utf-8 -*-
-import heapq  # used for the so colled "open list" that stores known nodes
 from core.heuristic import manhatten, octile
-from core.util import backtrace, bi_backtrace
 from core.diagonal_movement import DiagonalMovement
 from .finder import Finder, TIME_LIMIT, MAX_RUNS, BY_END
+from .goal_set import GoalSet
 
 
 class AStarFinder(Finder):
     def __init__(self, heuristic=None, weight=1,
                  diagonal_movement=DiagonalMovement.never,
                  time_limit=TIME_LIMIT,
-                 max_runs=MAX_RUNS):
+                 max_runs=MAX_RUNS,
+                 agent_size=1,
+                 recorder=None,
+                 compact=False):
         """
         find shortest path using A* algorithm
         :param heuristic: heuristic used to calculate distance of 2 points
@@ -23,13 +25,22 @@ class AStarFinder(Finder):
             (optional, only if we enter huge grids and have time constrains)
             <=0 means there are no constrains and the code might run on any
             large map.
+        :param agent_size: width and height of the agent in tiles
+            (see Grid.build_clearance)
+        :param recorder: finder.trace.TraceRecorder that records every
+            expanded node (optional)
+        :param compact: memory-bounded search state for huge grids
+            (see finder.compact_state)
         """
         super(AStarFinder, self).__init__(
             heuristic=heuristic,
             weight=weight,
             diagonal_movement=diagonal_movement,
             time_limit=time_limit,
-            max_runs=max_runs)
+            max_runs=max_runs,
+            agent_size=agent_size,
+            recorder=recorder,
+            compact=compact)
 
         if not heuristic:
             if diagonal_movement == DiagonalMovement.never:
@@ -39,51 +50,46 @@ class AStarFinder(Finder):
                 # not admissible it should be octile instead
                 self.heuristic = octile
 
-    def check_neighbors(self, start, end, grid, open_list,
+    def check_neighbors(self, start, end, grid, state,
                         open_value=True, backtrace_by=None):
         """
         find next path segment based on given node
         (or return path if we found the end)
         """
         # pop node with minimum 'f' value
-        node = heapq.nsmallest(1, open_list)[0]
-        open_list.remove(node)
-        node.closed = True
+        node = state.pop()
+        if self.recorder is not None:
+            # a CompactSearchState does not keep h, it is computed again
+            # like process_node does
+            h = self.apply_heuristic(node, end) * self.weight \
+                if self.compact else None
+            self.recorder.record(state, node, h)
 
         # if reached the end position, construct the path and return it
         # (ignored for bi-directional a*, there we look for a neighbor that is
-        #  part of the oncoming path)
-        if not backtrace_by and node == end:
-            return backtrace(end)
+        #  part of the oncoming path). end can be a GoalSet of several goals.
+        if not backtrace_by and (
+                node == end or isinstance(end, GoalSet) and node in end):
+            return state.backtrace(node)
 
+        closed = state.closed
         # get neighbors of the current node
         neighbors = self.find_neighbors(grid, node)
         for neighbor in neighbors:
-            if neighbor.closed:
+            pos = (neighbor.x, neighbor.y)
+            if pos in closed:
                 # already visited last minimum f value
                 continue
-            if backtrace_by and neighbor.opened == backtrace_by:
+            if backtrace_by and state.opened.get(pos) == backtrace_by:
                 # found the oncoming path
                 if backtrace_by == BY_END:
-                    return bi_backtrace(node, neighbor)
+                    return state.bi_backtrace(node, neighbor)
                 else:
-                    return bi_backtrace(neighbor, node)
+                    return state.bi_backtrace(neighbor, node)
 
             # check if the neighbor has not been inspected yet, or
             # can be reached with smaller cost from the current node
-            self.process_node(neighbor, node, end, open_list, open_value)
+            self.process_node(neighbor, node, end, state, open_value)
 
         # the end has not been reached (yet) keep the find_path loop running
         return None
-
-    def find_path(self, start, end, grid):
-        """
-        find a path from start to end node on grid using the A* algorithm
-        :param start: start node
-        :param end: end node
-        :param grid: grid that stores all possible steps/tiles as 2D-list
-        :return:
-        """
-        start.g = 0
-        start.f = 0
-        return super(AStarFinder, self).find_path(start, end, grid)
@@ -0,0 +1,131 @@
+# -*- coding: utf-8 -*-
+"""
+answer many independent start/end queries on one grid in parallel.
+
+The walkability and weight planes of the grid are published once through
+multiprocessing.shared_memory; every worker process attaches to them and
+builds its own grid a single time, so no Node lists are pickled per query.
+"""
+import concurrent.futures
+import os
+from multiprocessing import shared_memory
+from core.grid import Grid
+from .a_star import AStarFinder
+
+# amount of queries sent to a worker in one task
+CHUNK_SIZE = 64
+# amount of tasks kept in flight per worker
+TASKS_PER_WORKER = 4
+
+# per-process state of the worker, set by _init_worker
+_worker = {}
+
+
+def publish_grid(grid):
+    """
+    copy the walkability (1 byte per cell) and weight (4 byte per cell)
+    planes of the grid into a new shared memory block.
+    The caller is responsible for close() and unlink() on the result.
+    :return: SharedMemory
+    """
+    size = grid.width * grid.height
+    shm = shared_memory.SharedMemory(create=True, size=max(1, size * 5))
+    walkable = shm.buf[:size]
+    weights = shm.buf[size:size * 5].cast('i')
+    for y in range(grid.height):
+        row = y * grid.width
+        for x, node in enumerate(grid.nodes[y]):
+            walkable[row + x] = 1 if node.walkable else 0
+            weights[row + x] = node.weight
+    weights.release()
+    walkable.release()
+    return shm
+
+
+def attach_grid(name, width, height):
+    """
+    build a grid from planes published by publish_grid
+    :return: (Grid, SharedMemory)
+    """
+    shm = shared_memory.SharedMemory(name=name)
+    size = width * height
+    grid = Grid(width=width, height=height)
+    walkable = shm.buf[:size]
+    weights = shm.buf[size:size * 5].cast('i')
+    for y in range(height):
+        row = y * width
+        for x, node in enumerate(grid.nodes[y]):
+            node.walkable = bool(walkable[row + x])
+            node.weight = weights[row + x]
+    weights.release()
+    walkable.release()
+    return grid, shm
+
+
+def _init_worker(name, width, height, finder_class, finder_kwargs):
+    grid, shm = attach_grid(name, width, height)
+    _worker['grid'] = grid
+    _worker['shm'] = shm
+    _worker['finder'] = finder_class(**finder_kwargs)
+
+
+def _solve_chunk(queries):
+    grid = _worker['grid']
+    finder = _worker['finder']
+    results = []
+    for start, end in queries:
+        path, runs = finder.find_path(
+            grid.node(*start), grid.node(*end), grid)
+        results.append((start, end, path, runs))
+    return results
+
+
+def _chunks(queries, size):
+    chunk = []
+    for start, end in queries:
+        chunk.append((tuple(start), tuple(end)))
+        if len(chunk) >= size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+def find_paths(grid, queries, finder_class=AStarFinder, finder_kwargs=None,
+               max_workers=None, chunk_size=CHUNK_SIZE):
+    """
+    find paths for many (start, end) coordinate pairs on one grid using a
+    process pool. Results are yielded in completion order (not in the order
+    of the queries) as (start, end, path, runs) tuples.
+    :param grid: grid all queries are run on
+    :param queries: iterable of ((x, y), (x, y)) start/end pairs
+    :param finder_class: finder used by the workers
+    :param finder_kwargs: keyword arguments for finder_class
+    :param max_workers: amount of worker processes (defaults to cpu count)
+    :param chunk_size: amount of queries sent to a worker at once
+    """
+    max_workers = max_workers or os.cpu_count() or 1
+    shm = publish_grid(grid)
+    try:
+        with concurrent.futures.ProcessPoolExecutor(
+                max_workers=max_workers,
+                initializer=_init_worker,
+                initargs=(shm.name, grid.width, grid.height,
+                          finder_class, finder_kwargs or {})) as pool:
+            in_flight = set()
+            max_in_flight = max_workers * TASKS_PER_WORKER
+            for chunk in _chunks(queries, chunk_size):
+                in_flight.add(pool.submit(_solve_chunk, chunk))
+                if len(in_flight) < max_in_flight:
+                    continue
+                done, in_flight = concurrent.futures.wait(
+                    in_flight, return_when=concurrent.futures.FIRST_COMPLETED)
+                for future in done:
+                    for result in future.result():
+                        yield result
+            for future in concurrent.futures.as_completed(in_flight):
+                for result in future.result():
+                    yield result
+    finally:
+        shm.close()
+        shm.unlink()
@@ -0,0 +1,190 @@
+# -*- coding: utf-8 -*-
+"""
+memory-bounded bookkeeping for searches over huge grids.
+
+SearchState keeps a dict entry (and a tuple key) per touched node, which
+costs a few hundred bytes per node. CompactSearchState stores the same
+values in flat arrays over all cells of the grid instead:
+
+    closed      1 bit per cell
+    opened      2 bits per cell (True, BY_START or BY_END)
+    g           float32 per cell
+    parent      1 byte per cell (direction code of the parent)
+    open list   (f, key) entries, key packs insertion order and cell
+
+h is not stored, it is recomputed when a node is improved. g is rounded
+to float32, so costs that only differ beyond that precision compare as
+equal. The parent of a node has to be one of its 8 neighbors, which is
+true for AStarFinder.
+"""
+import heapq
+from array import array
+from .search_state import SearchState
+
+
+class PositionBits(object):
+    """
+    set of (x, y) positions as bitset over the cells of a grid
+    """
+    def __init__(self, width, height):
+        self.width = width
+        self.bits = bytearray((width * height + 7) // 8)
+
+    def add(self, pos):
+        index = pos[1] * self.width + pos[0]
+        self.bits[index >> 3] |= 1 << (index & 7)
+
+    def __contains__(self, pos):
+        index = pos[1] * self.width + pos[0]
+        return bool(self.bits[index >> 3] >> (index & 7) & 1)
+
+
+class OpenValues(object):
+    """
+    open value (1 to 3, see Finder.process_node) of every cell, 2 bits each
+    """
+    def __init__(self, width, height):
+        self.width = width
+        self.bits = bytearray((width * height + 3) // 4)
+
+    def get(self, pos, default=None):
+        index = pos[1] * self.width + pos[0]
+        value = self.bits[index >> 2] >> ((index & 3) << 1) & 3
+        return value or default
+
+    def __getitem__(self, pos):
+        value = self.get(pos)
+        if value is None:
+            raise KeyError(pos)
+        return value
+
+    def __setitem__(self, pos, value):
+        index = pos[1] * self.width + pos[0]
+        shift = (index & 3) << 1
+        byte = self.bits[index >> 2] & ~(3 << shift)
+        self.bits[index >> 2] = byte | (int(value) & 3) << shift
+
+    def __contains__(self, pos):
+        return self.get(pos) is not None
+
+
+class Costs(object):
+    """
+    float32 value of every cell, NaN marks cells without a value
+    """
+    def __init__(self, width, height):
+        self.width = width
+        self.values = array('f', [float('nan')]) * (width * height)
+
+    def get(self, pos, default=None):
+        value = self.values[pos[1] * self.width + pos[0]]
+        return default if value != value else value
+
+    def __getitem__(self, pos):
+        value = self.values[pos[1] * self.width + pos[0]]
+        if value != value:
+            raise KeyError(pos)
+        return value
+
+    def __setitem__(self, pos, value):
+        self.values[pos[1] * self.width + pos[0]] = value
+
+    def __contains__(self, pos):
+        return self.get(pos) is not None
+
+
+class NoValues(object):
+    """
+    mapping that forgets everything stored in it
+    """
+    def get(self, pos, default=None):
+        return default
+
+    def __setitem__(self, pos, value):
+        pass
+
+    def __contains__(self, pos):
+        return False
+
+
+class ParentCodes(object):
+    """
+    parent position of every cell, stored as the direction (1 to 9, 0 for
+    no parent) from the cell to its parent
+    """
+    def __init__(self, width, height):
+        self.width = width
+        self.codes = bytearray(width * height)
+
+    def __setitem__(self, pos, parent):
+        dx, dy = parent[0] - pos[0], parent[1] - pos[1]
+        if not (-1 <= dx <= 1 and -1 <= dy <= 1):
+            raise ValueError('parent {} is no neighbor of {}'.format(
+                parent, pos))
+        self.codes[pos[1] * self.width + pos[0]] = (dy + 1) * 3 + dx + 2
+
+    def __getitem__(self, pos):
+        code = self.codes[pos[1] * self.width + pos[0]]
+        if not code:
+            raise KeyError(pos)
+        code -= 1
+        return (pos[0] + code % 3 - 1, pos[1] + code // 3 - 1)
+
+    def get(self, pos, default=None):
+        try:
+            return self[pos]
+        except KeyError:
+            return default
+
+    def __contains__(self, pos):
+        return bool(self.codes[pos[1] * self.width + pos[0]])
+
+
+class CompactSearchState(SearchState):
+    """
+    SearchState backed by bitsets and typed arrays (see module docstring),
+    its memory depends on the size of the grid, not on the amount of
+    touched nodes
+    """
+    def __init__(self, grid):
+        super(CompactSearchState, self).__init__(grid)
+        width, height = grid.width, grid.height
+        self.size = width * height
+        self.g = Costs(width, height)
+        self.h = NoValues()
+        self.opened = OpenValues(width, height)
+        self.closed = PositionBits(width, height)
+        self.parent = ParentCodes(width, height)
+
+    def push(self, node, f):
+        """
+        put node into the open list with the estimated total cost f
+        """
+        heapq.heappush(self.open_list, (
+            f, next(self._order) * self.size +
+            node.y * self.grid.width + node.x))
+
+    def _node(self, key):
+        index = key % self.size
+        width = self.grid.width
+        return self.grid.node(index % width, index // width)
+
+    def pop(self):
+        """
+        remove the node with minimum f value from the open list and mark it
+        as closed
+        """
+        open_list = self.open_list
+        closed_bits = self.closed.bits
+        size = self.size
+        node = self._node(heapq.heappop(open_list)[1])
+        index = node.y * self.grid.width + node.x
+        closed_bits[index >> 3] |= 1 << (index & 7)
+        # drop outdated entries, so open_list is empty once there is
+        # nothing left to expand
+        while open_list:
+            index = open_list[0][1] % size
+            if not closed_bits[index >> 3] >> (index & 7) & 1:
+                break
+            heapq.heappop(open_list)
+        return node
@@ -0,0 +1,251 @@
+# -*- coding: utf-8 -*-
+import heapq
+import time  # for time limitation
+from core.heuristic import manhatten, octile
+from core.diagonal_movement import DiagonalMovement
+from core.grid import rect_cells
+from .finder import Finder, TIME_LIMIT, MAX_RUNS
+from .search_state import SearchState
+
+INF = float('inf')
+# keys are rounded to this many digits, so sums of diagonal steps that are
+# equal on paper compare as equal
+KEY_DIGITS = 9
+
+
+class DStarLiteState(SearchState):
+    """
+    search state of D* Lite. The search runs backwards from the goal, so
+    g and rhs are the costs from a node to the goal. The open list holds
+    (key, node) entries, outdated entries are skipped using `queued`.
+    """
+    def __init__(self, grid, start, end):
+        super(DStarLiteState, self).__init__(grid)
+        self.rhs = {}
+        # current key of every node that is in the open list
+        self.queued = {}
+        # key modifier, grows when the start moves
+        self.km = 0
+        self.start = start
+        self.end = end
+        # start position the heuristic of the queued keys is based on
+        self.last = start
+
+
+class DStarLiteFinder(Finder):
+    def __init__(self, heuristic=None, weight=1,
+                 diagonal_movement=DiagonalMovement.never,
+                 time_limit=TIME_LIMIT,
+                 max_runs=MAX_RUNS):
+        """
+        incremental planner using D* Lite (Koenig & Likhachev).
+        After the first find_path the search tree is kept, cells that
+        changed can be reported with notify_changed and replan only repairs
+        the part of the tree they affect.
+        The planner keeps its state on the finder, so use one instance per
+        start/goal pair.
+        :param heuristic: heuristic used to calculate distance of 2 points
+            (defaults to manhatten)
+        :param weight: weight for the edges
+        :param diagonal_movement: if diagonal movement is allowed
+            (see enum in diagonal_movement)
+        :param time_limit: max. runtime in seconds (per find_path/replan)
+        :param max_runs: max. amount of expanded nodes (per find_path/replan)
+        """
+        super(DStarLiteFinder, self).__init__(
+            heuristic=heuristic,
+            weight=weight,
+            diagonal_movement=diagonal_movement,
+            time_limit=time_limit,
+            max_runs=max_runs)
+
+        if not heuristic:
+            if diagonal_movement == DiagonalMovement.never:
+                self.heuristic = manhatten
+            else:
+                # When diagonal movement is allowed the manhattan heuristic is
+                # not admissible it should be octile instead
+                self.heuristic = octile
+
+        self.state = None
+
+    def edge_cost(self, node_a, node_b):
+        """
+        cost of the step from node_a to node_b (infinite if it is blocked)
+        """
+        if not node_b.walkable:
+            return INF
+        return self.calc_cost(node_a, node_b)
+
+    def calculate_key(self, state, node):
+        pos = (node.x, node.y)
+        k2 = min(state.g.get(pos, INF), state.rhs.get(pos, INF))
+        k1 = k2 + self.apply_heuristic(state.start, node) * self.weight + \
+            state.km
+        return (round(k1, KEY_DIGITS), round(k2, KEY_DIGITS))
+
+    def update_vertex(self, state, node):
+        pos = (node.x, node.y)
+        if node is not state.end:
+            rhs = INF
+            g = state.g
+            for neighbor in self.find_neighbors(state.grid, node):
+                cost = self.edge_cost(node, neighbor) + \
+                    g.get((neighbor.x, neighbor.y), INF)
+                if cost < rhs:
+                    rhs = cost
+            state.rhs[pos] = rhs
+        if state.g.get(pos, INF) != state.rhs.get(pos, INF):
+            key = self.calculate_key(state, node)
+            state.queued[pos] = key
+            heapq.heappush(state.open_list, (key, next(state._order), node))
+        else:
+            state.queued.pop(pos, None)
+
+    def _top(self, state):
+        """
+        drop outdated entries and return the smallest valid one (or None)
+        """
+        open_list = state.open_list
+        while open_list:
+            key, _, node = open_list[0]
+            if state.queued.get((node.x, node.y)) == key:
+                return open_list[0]
+            heapq.heappop(open_list)
+        return None
+
+    def compute_shortest_path(self, state):
+        start_pos = (state.start.x, state.start.y)
+        while True:
+            top = self._top(state)
+            if top is None:
+                break
+            start_key = self.calculate_key(state, state.start)
+            if top[0] >= start_key and \
+                    state.rhs.get(start_pos, INF) == \
+                    state.g.get(start_pos, INF):
+                break
+
+            state.runs += 1
+            self.keep_running(state)
+
+            k_old, _, node = heapq.heappop(state.open_list)
+            pos = (node.x, node.y)
+            k_new = self.calculate_key(state, node)
+            if k_old < k_new:
+                state.queued[pos] = k_new
+                heapq.heappush(state.open_list,
+                               (k_new, next(state._order), node))
+                continue
+            del state.queued[pos]
+
+            g = state.g.get(pos, INF)
+            rhs = state.rhs.get(pos, INF)
+            if g > rhs:
+                state.g[pos] = rhs
+                # the grid is undirected: everything that can be reached
+                # from node can reach node
+                for neighbor in self.find_neighbors(state.grid, node):
+                    self.update_vertex(state, neighbor)
+            else:
+                state.g[pos] = INF
+                self.update_vertex(state, node)
+                for neighbor in self.find_neighbors(state.grid, node):
+                    self.update_vertex(state, neighbor)
+
+    def extract_path(self, state):
+        """
+        follow the cheapest successors from the start to the goal
+        """
+        node = state.start
+        if state.g.get((node.x, node.y), INF) == INF:
+            return []
+        path = [(node.x, node.y)]
+        visited = set(path)
+        while node is not state.end:
+            best = None
+            best_cost = INF
+            for neighbor in self.find_neighbors(state.grid, node):
+                cost = self.edge_cost(node, neighbor) + \
+                    state.g.get((neighbor.x, neighbor.y), INF)
+                if cost < best_cost:
+                    best, best_cost = neighbor, cost
+            if best is None or (best.x, best.y) in visited:
+                return []
+            node = best
+            path.append((node.x, node.y))
+            visited.add(path[-1])
+        return path
+
+    def find_path(self, start, end, grid):
+        """
+        plan a path from start to end node on grid from scratch
+        :param start: start node
+        :param end: end node
+        :param grid: grid that stores all possible steps/tiles as 2D-list
+        :return:
+        """
+        if self.state is not None:
+            unsubscribe = getattr(self.state.grid, 'unsubscribe', None)
+            if unsubscribe is not None:
+                unsubscribe(self.on_patch)
+        state = self.state = DStarLiteState(grid, start, end)
+        subscribe = getattr(grid, 'subscribe', None)
+        if subscribe is not None:
+            # changes made with Grid.apply_patch are noticed by themselves
+            subscribe(self.on_patch)
+        state.rhs[(end.x, end.y)] = 0
+        key = self.calculate_key(state, end)
+        state.queued[(end.x, end.y)] = key
+        heapq.heappush(state.open_list, (key, next(state._order), end))
+
+        self.compute_shortest_path(state)
+        return self.extract_path(state), state.runs
+
+    def planned_state(self, method):
+        """
+        the state of the last plan
+        :param method: name of the method that needs it, for the error
+        :raises RuntimeError: if find_path was never called
+        """
+        if self.state is None:
+            raise RuntimeError(
+                '{}.{} needs a plan, call find_path first'.format(
+                    self.__class__.__name__, method))
+        return self.state
+
+    def notify_changed(self, cells):
+        """
+        report cells whose walkability or weight changed since the last
+        plan (not needed for changes made with Grid.apply_patch).
+        The change is applied with the next replan.
+        :param cells: iterable of (x, y) positions
+        """
+        state = self.planned_state('notify_changed')
+        grid = state.grid
+        for x, y in cells:
+            # diagonal moves depend on the orthogonal cells, so every
+            # node around a changed cell may have changed edges
+            for ny in range(y - 1, y + 2):
+                for nx in range(x - 1, x + 2):
+                    if grid.inside(nx, ny):
+                        self.update_vertex(state, grid.node(nx, ny))
+
+    def on_patch(self, grid, rects):
+        self.notify_changed(
+            [cell for rect in rects for cell in rect_cells(rect)])
+
+    def replan(self, start=None):
+        """
+        repair the search after notify_changed and return the updated path
+        :param start: new start node, if the agent moved along the path
+        :return: path, runs
+        """
+        state = self.planned_state('replan')
+        if start is not None and start is not state.start:
+            state.km += self.apply_heuristic(state.last, start) * self.weight
+            state.last = state.start = start
+        state.runs = 0
+        state.start_time = time.time()
+        self.compute_shortest_path(state)
+        return self.extract_path(state), state.runs
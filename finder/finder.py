@@ -1,14 +1,18 @@
 # -*- coding: utf-8 -*-
-import heapq  # used for the so colled "open list" that stores known nodes
 import time  # for time limitation
 from core.util import SQRT2
 from core.diagonal_movement import DiagonalMovement
+from .search_state import SearchState
+from .compact_state import CompactSearchState
+from .goal_set import GoalSet
 
 
 # max. amount of tries we iterate until we abort the search
 MAX_RUNS = float('inf')
 # max. time after we until we abort the search (in seconds)
 TIME_LIMIT = float('inf')
+# amount of iterations find_path_async runs before yielding to the event loop
+YIELD_EVERY = 100
 
 # used for backtrace of bi-directional A*
 BY_START = 1
@@ -16,13 +20,17 @@ BY_END = 2
 
 
 class ExecutionTimeException(Exception):
-    def __init__(self, message):
+    def __init__(self, message, state=None):
         super(ExecutionTimeException, self).__init__(message)
+        # SearchState of the aborted search, can be passed to find_path
+        # (or finder.snapshot) to resume it
+        self.state = state
 
 
 class ExecutionRunsException(Exception):
-    def __init__(self, message):
+    def __init__(self, message, state=None):
         super(ExecutionRunsException, self).__init__(message)
+        self.state = state
 
 
 class Finder(object):
@@ -30,7 +38,10 @@ class Finder(object):
                  diagonal_movement=DiagonalMovement.never,
                  weighted=True,
                  time_limit=TIME_LIMIT,
-                 max_runs=MAX_RUNS):
+                 max_runs=MAX_RUNS,
+                 agent_size=1,
+                 recorder=None,
+                 compact=False):
         """
         find shortest path
         :param heuristic: heuristic used to calculate distance of 2 points
@@ -45,6 +56,12 @@ class Finder(object):
             (optional, only if we enter huge grids and have time constrains)
             <=0 means there are no constrains and the code might run on any
             large map.
+        :param agent_size: width and height of the agent in tiles, the
+            position of a node is its top left corner
+        :param recorder: finder.trace.TraceRecorder that records every
+            expanded node (optional)
+        :param compact: keep the search state in bitsets and typed arrays
+            (see finder.compact_state) to bound the memory of huge searches
         """
         self.time_limit = time_limit
         self.max_runs = max_runs
@@ -53,12 +70,15 @@ class Finder(object):
         self.diagonal_movement = diagonal_movement
         self.weight = weight
         self.heuristic = heuristic
+        self.agent_size = agent_size
+        self.recorder = recorder
+        self.compact = compact
 
-    def calc_cost(self, node_a, node_b):
+    def calc_cost(self, node_a, node_b, ng=0.0):
         """
         get the distance between current node and the neighbor (cost)
+        :param ng: cost from the start to node_a
         """
-        ng = node_a.g
         if node_b.x - node_a.x == 0 or node_b.y - node_a.y == 0:
             # direct neighbor - distance is 1
             ng += 1
@@ -78,6 +98,8 @@ class Finder(object):
         """
         if not heuristic:
             heuristic = self.heuristic
+        if isinstance(node_b, GoalSet):
+            return node_b.estimate(node_a, heuristic)
         return heuristic(
             abs(node_a.x - node_b.x),
             abs(node_a.y - node_b.y))
@@ -88,25 +110,29 @@ class Finder(object):
         '''
         if not diagonal_movement:
             diagonal_movement = self.diagonal_movement
+        if self.agent_size > 1:
+            return grid.neighbors(node, diagonal_movement=diagonal_movement,
+                                  agent_size=self.agent_size)
         return grid.neighbors(node, diagonal_movement=diagonal_movement)
 
-    def keep_running(self):
+    def keep_running(self, state):
         """
         check, if we run into time or iteration constrains.
+        :param state: SearchState of the running search
         :returns: True if we keep running and False if we run into a constraint
         """
-        if self.runs >= self.max_runs:
+        if state.runs >= self.max_runs:
             raise ExecutionRunsException(
                 '{} run into barrier of {} iterations without '
                 'finding the destination'.format(
-                    self.__class__.__name__, self.max_runs))
+                    self.__class__.__name__, self.max_runs), state)
 
-        if time.time() - self.start_time >= self.time_limit:
+        if time.time() - state.start_time >= self.time_limit:
             raise ExecutionTimeException(
                 '{} took longer than {} seconds, aborting!'.format(
-                    self.__class__.__name__, self.time_limit))
+                    self.__class__.__name__, self.time_limit), state)
 
-    def process_node(self, node, parent, end, open_list, open_value=True):
+    def process_node(self, node, parent, end, state, open_value=True):
         '''
         we check if the given node is path of the path by calculating its
         cost and add or remove it from our path
@@ -114,54 +140,190 @@ class Finder(object):
             (the neighbor in A* or jump-node in JumpPointSearch)
         :param parent: the parent node (the current node we like to test)
         :param end: the end point to calculate the cost of the path
-        :param open_list: the list that keeps track of our current path
+        :param state: SearchState that keeps track of our current path
         :param open_value: needed if we like to set the open list to something
             else than True (used for bi-directional algorithms)
 
         '''
+        pos = (node.x, node.y)
+        parent_pos = (parent.x, parent.y)
         # calculate cost from current node (parent) to the next node (neighbor)
-        ng = self.calc_cost(parent, node)
-
-        if not node.opened or ng < node.g:
-            node.g = ng
-            node.h = node.h or \
-                self.apply_heuristic(node, end) * self.weight
-            # f is the estimated total cost from start to goal
-            node.f = node.g + node.h
-            node.parent = parent
-
-            if not node.opened:
-                heapq.heappush(open_list, node)
-                node.opened = open_value
-            else:
-                # the node can be reached with smaller cost.
-                # Since its f value has been updated, we have to
-                # update its position in the open list
-                open_list.remove(node)
-                heapq.heappush(open_list, node)
-
-    def find_path(self, start, end, grid):
+        ng = self.calc_cost(parent, node, state.g[parent_pos])
+
+        opened = state.opened.get(pos)
+        if not opened or ng < state.g[pos]:
+            state.g[pos] = ng
+            h = state.h.get(pos)
+            if not h:
+                h = state.h[pos] = \
+                    self.apply_heuristic(node, end) * self.weight
+            state.parent[pos] = parent_pos
+
+            # f is the estimated total cost from start to goal.
+            # If the node can be reached with smaller cost it is pushed
+            # again, the outdated entry is skipped by the open list.
+            state.push(node, ng + h)
+            if not opened:
+                state.opened[pos] = open_value
+
+    def unreachable(self, start, end, grid):
+        """
+        check the component index of the grid (if one was built, see
+        Grid.build_component_index) to reject a query without searching
+        """
+        if start is end:
+            return False
+        return grid.connected(
+            start, end, diagonal_movement=self.diagonal_movement) is False
+
+    def new_state(self, grid):
+        """
+        create an empty SearchState (a CompactSearchState in compact mode)
+        """
+        if self.compact:
+            return CompactSearchState(grid)
+        return SearchState(grid)
+
+    def init_search(self, start, end, grid):
+        """
+        create the SearchState for a new search with start in the open list
+        :param start: start node
+        :param end: end node
+        :param grid: grid that stores all possible steps/tiles as 2D-list
+        :return: SearchState
+        """
+        state = self.new_state(grid)
+        pos = (start.x, start.y)
+        state.g[pos] = 0
+        state.opened[pos] = True
+        state.push(start, 0)
+        if self.recorder is not None:
+            self.recorder.begin(grid)
+        return state
+
+    def resume_search(self, state):
+        """
+        continue a search from a SearchState (e.g. the state of an
+        ExecutionTimeException or one loaded with finder.snapshot).
+        The run counter goes on, the time limit starts again.
+        """
+        state.start_time = time.time()
+        if self.recorder is not None:
+            self.recorder.begin(state.grid)
+        return state
+
+    def start_search(self, start, end, grid, state=None):
+        """
+        the SearchState find_path starts with: a new one (see init_search)
+        or the given one resumed (see resume_search)
+        :return: SearchState, None if end is unreachable from start
+        """
+        if state is not None:
+            return self.resume_search(state)
+        if self.unreachable(start, end, grid):
+            return None
+        return self.init_search(start, end, grid)
+
+    def expand(self, start, end, grid, state):
+        """
+        one iteration of the search loop: count it, check the time and
+        iteration constraints and expand the best node of the open list
+        (see check_neighbors)
+        :param start: start node
+        :param end: end node (or a GoalSet)
+        :param grid: grid that stores all possible steps/tiles as 2D-list
+        :param state: SearchState of the running search
+        :return: the path if the end was reached, else None
+        """
+        state.runs += 1
+        try:
+            self.keep_running(state)
+        except (ExecutionRunsException, ExecutionTimeException):
+            # the iteration does not run, a resumed search counts it again
+            state.runs -= 1
+            raise
+        return self.check_neighbors(start, end, grid, state)
+
+    def find_path(self, start, end, grid, state=None):
         """
         find a path from start to end node on grid by iterating over
-        all neighbors of a node (see check_neighbors)
+        all neighbors of a node (see check_neighbors).
+        All search state is kept in a SearchState, the grid is only read,
+        so one grid can be used by concurrent searches.
         :param start: start node
         :param end: end node
         :param grid: grid that stores all possible steps/tiles as 2D-list
+        :param state: SearchState of an interrupted search to resume
         :return:
         """
-        self.start_time = time.time()  # execution time limitation
-        self.runs = 0  # count number of iterations
-        start.opened = True
+        state = self.start_search(start, end, grid, state)
+        if state is None:
+            return [], 0
+
+        while state.open_list:
+            path = self.expand(start, end, grid, state)
+            if path:
+                return path, state.runs
 
-        open_list = [start]
+        # failed to find path
+        return [], state.runs
 
-        while len(open_list) > 0:
-            self.runs += 1
-            self.keep_running()
+    def find_path_to_any(self, start, goals, grid, bucket_size=None):
+        """
+        find a path from start to the closest of several goals with a single
+        search. The heuristic is the minimum over all goals and the search
+        stops at the first goal it expands.
+        :param start: start node
+        :param goals: iterable of goal nodes (or a GoalSet)
+        :param grid: grid that stores all possible steps/tiles as 2D-list
+        :param bucket_size: bucket size of the goal index (see GoalSet)
+        :return: path, runs, reached goal (None if no goal was reached)
+        """
+        if not isinstance(goals, GoalSet):
+            goals = GoalSet(goals, bucket_size)
+        if all(self.unreachable(start, goal, grid) for goal in goals):
+            return [], 0, None
+        state = self.init_search(start, goals, grid)
 
-            path = self.check_neighbors(start, end, grid, open_list)
+        while state.open_list:
+            path = self.expand(start, goals, grid, state)
             if path:
-                return path, self.runs
+                return path, state.runs, goals.goal(*path[-1])
+
+        # failed to find path
+        return [], state.runs, None
+
+    async def find_path_async(self, start, end, grid, yield_every=YIELD_EVERY,
+                              state=None):
+        """
+        same as find_path, but hands control back to the asyncio event loop
+        every `yield_every` iterations, so a long search does not stall it.
+        The search can be aborted by cancelling the task (or by wrapping it
+        in asyncio.wait_for to get a timeout).
+        :param start: start node
+        :param end: end node
+        :param grid: grid that stores all possible steps/tiles as 2D-list
+        :param yield_every: iterations between two yields to the event loop
+        :param state: SearchState of an interrupted search to resume
+        :return:
+        """
+        # imported here, asyncio takes longer to import than the finders
+        import asyncio
+
+        if yield_every < 1:
+            raise ValueError('yield_every has to be at least 1')
+
+        state = self.start_search(start, end, grid, state)
+        if state is None:
+            return [], 0
+
+        while state.open_list:
+            path = self.expand(start, end, grid, state)
+            if path:
+                return path, state.runs
+
+            if state.runs % yield_every == 0:
+                await asyncio.sleep(0)
 
         # failed to find path
-        return [], self.runs
+        return [], state.runs
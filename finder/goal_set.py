@@ -0,0 +1,108 @@
+# -*- coding: utf-8 -*-
+INF = float('inf')
+# use the bucket index once a goal set has more goals than this
+INDEX_THRESHOLD = 16
+# default width and height of a bucket of the index
+BUCKET_SIZE = 16
+
+
+class GoalSet(object):
+    """
+    the targets of a search that looks for the closest of several goals
+    (see Finder.find_path_to_any).
+
+    The heuristic of a node is the minimum of the heuristic to every goal,
+    which stays admissible (and consistent) if the heuristic is. Large
+    sets are put into square buckets, so only buckets close to a node are
+    checked. That needs a heuristic that does not shrink if dx or dy grows
+    and that is at least heuristic(max(dx, dy), 0), which is true for all
+    heuristics in core.heuristic.
+    """
+    def __init__(self, goals, bucket_size=None):
+        """
+        :param goals: iterable of goal nodes
+        :param bucket_size: width and height of the index buckets, 0 turns
+            the index off (default: BUCKET_SIZE for more than
+            INDEX_THRESHOLD goals)
+        """
+        self.goals = {}
+        for goal in goals:
+            self.goals[(goal.x, goal.y)] = goal
+        if bucket_size is None:
+            bucket_size = BUCKET_SIZE \
+                if len(self.goals) > INDEX_THRESHOLD else 0
+        self.bucket_size = bucket_size
+        self.buckets = {}
+        if bucket_size:
+            for goal in self.goals.values():
+                key = (goal.x // bucket_size, goal.y // bucket_size)
+                self.buckets.setdefault(key, []).append(goal)
+            keys = list(self.buckets)
+            self.bounds = (min(key[0] for key in keys),
+                           min(key[1] for key in keys),
+                           max(key[0] for key in keys),
+                           max(key[1] for key in keys)) if keys else None
+
+    def __len__(self):
+        return len(self.goals)
+
+    def __iter__(self):
+        return iter(self.goals.values())
+
+    def __contains__(self, node):
+        return (node.x, node.y) in self.goals
+
+    def goal(self, x, y):
+        """
+        goal node at position (None if there is no goal)
+        """
+        return self.goals.get((x, y))
+
+    def estimate(self, node, heuristic):
+        """
+        smallest heuristic from node to any of the goals
+        :param heuristic: heuristic(dx, dy) (see core.heuristic)
+        """
+        x, y = node.x, node.y
+        if not self.bucket_size:
+            best = INF
+            for goal in self.goals.values():
+                h = heuristic(abs(x - goal.x), abs(y - goal.y))
+                if h < best:
+                    best = h
+            return best
+
+        size = self.bucket_size
+        buckets = self.buckets
+        if not buckets:
+            return INF
+        bx, by = x // size, y // size
+        min_x, min_y, max_x, max_y = self.bounds
+        # rings of buckets around the bucket of the node, ring r can only
+        # hold goals at least (r - 1) * size + 1 tiles away
+        rings = max(bx - min_x, max_x - bx, by - min_y, max_y - by)
+        best = INF
+        for ring in range(rings + 1):
+            if ring and heuristic((ring - 1) * size + 1, 0) >= best:
+                break
+            for key in self._ring(bx, by, ring):
+                for goal in buckets.get(key, ()):
+                    h = heuristic(abs(x - goal.x), abs(y - goal.y))
+                    if h < best:
+                        best = h
+        return best
+
+    def _ring(self, bx, by, ring):
+        """
+        bucket keys at chebyshev distance ring from (bx, by)
+        """
+        if ring == 0:
+            return [(bx, by)]
+        keys = []
+        for dx in range(-ring, ring + 1):
+            keys.append((bx + dx, by - ring))
+            keys.append((bx + dx, by + ring))
+        for dy in range(-ring + 1, ring):
+            keys.append((bx - ring, by + dy))
+            keys.append((bx + ring, by + dy))
+        return keys
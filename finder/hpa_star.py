@@ -0,0 +1,565 @@
+# -*- coding: utf-8 -*-
+"""
+hierarchical path finding (HPA*, Botea, Müller & Schaeffer).
+
+The grid is split into square clusters. Entrances between neighboring
+clusters become nodes of a small abstract graph whose edges are the
+distances through a cluster (precomputed with AStarFinder). A query
+searches the abstract graph and only refines the segments of the abstract
+path into cells.
+"""
+import heapq
+import itertools
+import json
+from core.heuristic import manhatten, octile
+from core.diagonal_movement import DiagonalMovement
+from .a_star import AStarFinder
+from .finder import Finder, TIME_LIMIT, MAX_RUNS
+from .search_state import SearchState
+
+# default width and height of a cluster in cells
+CLUSTER_SIZE = 16
+# entrances up to this length get one transition, longer ones two
+MAX_ENTRANCE_WIDTH = 6
+
+
+class ClusterView(object):
+    """
+    read-only view of the part of a grid inside one cluster, so a finder
+    run on it does not leave the cluster
+    """
+    def __init__(self, grid, x0, y0, x1, y1):
+        self.grid = grid
+        self.x0, self.y0, self.x1, self.y1 = x0, y0, x1, y1
+        self.width = grid.width
+        self.height = grid.height
+
+    def node(self, x, y):
+        return self.grid.node(x, y)
+
+    def inside(self, x, y):
+        return self.x0 <= x < self.x1 and self.y0 <= y < self.y1
+
+    def walkable(self, x, y):
+        return self.inside(x, y) and self.grid.walkable(x, y)
+
+    def connected(self, node_a, node_b,
+                  diagonal_movement=DiagonalMovement.never):
+        # the component index covers the whole grid, not only the cluster
+        return None
+
+    def neighbors(self, node, diagonal_movement=DiagonalMovement.never,
+                  agent_size=1):
+        x0, y0, x1, y1 = self.x0, self.y0, self.x1, self.y1
+        return [n for n in self.grid.neighbors(
+                    node, diagonal_movement, agent_size)
+                if x0 <= n.x < x1 and y0 <= n.y < y1]
+
+
+class Abstraction(object):
+    def __init__(self, grid, cluster_size=CLUSTER_SIZE,
+                 diagonal_movement=DiagonalMovement.never, finder=None):
+        """
+        abstract graph of a grid for HPA*
+        :param grid: grid to abstract
+        :param cluster_size: width and height of a cluster
+        :param diagonal_movement: movement used inside the clusters
+        :param finder: finder used for intra-cluster distances
+            (defaults to an AStarFinder with the same diagonal_movement)
+        """
+        self.grid = grid
+        self.cluster_size = cluster_size
+        self.diagonal_movement = diagonal_movement
+        self.finder = finder or AStarFinder(
+            diagonal_movement=diagonal_movement)
+        self.columns = -(-grid.width // cluster_size)
+        self.rows = -(-grid.height // cluster_size)
+
+        # abstract nodes ((x, y) positions) of each cluster
+        self.cluster_nodes = {}
+        # edges between two abstract nodes of the same cluster
+        # {pos: {pos: cost}}
+        self.intra = {}
+        # edges crossing the border of two clusters {pos: {pos: cost}}
+        self.inter = {}
+        # the transitions found on each border {(cluster, cluster): [..]}
+        self.borders = {}
+        self.build()
+        self.watch()
+
+    def watch(self):
+        """
+        follow the patches applied to the grid (see Grid.apply_patch)
+        """
+        subscribe = getattr(self.grid, 'subscribe', None)
+        if subscribe is not None:
+            subscribe(self.on_patch)
+
+    def on_patch(self, grid, rects):
+        clusters = set()
+        for x0, y0, x1, y1 in rects:
+            cx0, cy0 = self.cluster_of(x0, y0)
+            cx1, cy1 = self.cluster_of(x1 - 1, y1 - 1)
+            clusters.update((cx, cy) for cy in range(cy0, cy1 + 1)
+                            for cx in range(cx0, cx1 + 1))
+        for cluster in sorted(clusters):
+            self.update_cluster(cluster)
+
+    def cluster_of(self, x, y):
+        return (x // self.cluster_size, y // self.cluster_size)
+
+    def cluster_rect(self, cluster):
+        cx, cy = cluster
+        size = self.cluster_size
+        return (cx * size, cy * size,
+                min((cx + 1) * size, self.grid.width),
+                min((cy + 1) * size, self.grid.height))
+
+    def view(self, cluster):
+        return ClusterView(self.grid, *self.cluster_rect(cluster))
+
+    def step_cost(self, node_a, node_b):
+        return self.finder.calc_cost(node_a, node_b)
+
+    def path_cost(self, path):
+        grid = self.grid
+        cost = 0
+        for (ax, ay), (bx, by) in zip(path, path[1:]):
+            cost += self.step_cost(grid.node(ax, ay), grid.node(bx, by))
+        return cost
+
+    def build(self):
+        """
+        (re)build the complete abstraction
+        """
+        self.cluster_nodes = {}
+        self.intra = {}
+        self.inter = {}
+        self.borders = {}
+        for cy in range(self.rows):
+            for cx in range(self.columns):
+                self.cluster_nodes[(cx, cy)] = set()
+        for cluster in self.cluster_nodes:
+            for cluster_a, cluster_b in self._border_pairs(cluster):
+                if cluster_a == cluster:
+                    self._build_border(cluster_a, cluster_b)
+        for cluster in self.cluster_nodes:
+            self._collect_nodes(cluster)
+            self._build_intra(cluster)
+
+    def _crossable(self, pos_a, pos_b):
+        """
+        check, if there is a direct step from cell pos_a to cell pos_b
+        """
+        grid = self.grid
+        if not grid.walkable(*pos_a) or not grid.walkable(*pos_b):
+            return False
+        return any((n.x, n.y) == pos_b for n in grid.neighbors(
+            grid.node(*pos_a), self.diagonal_movement))
+
+    def _transitions(self, cluster_a, cluster_b):
+        """
+        pairs of cells ((x, y) in a, (x, y) in b) the border between two
+        neighboring clusters can be crossed at
+        """
+        ax0, ay0, ax1, ay1 = self.cluster_rect(cluster_a)
+        dx = cluster_b[0] - cluster_a[0]
+        dy = cluster_b[1] - cluster_a[1]
+        if dx and dy:
+            # clusters touching at a corner, b is below a
+            if dx > 0:
+                pair = ((ax1 - 1, ay1 - 1), (ax1, ay1))
+            else:
+                pair = ((ax0, ay1 - 1), (ax0 - 1, ay1))
+            return [pair] if self._crossable(*pair) else []
+        if dx:
+            # vertical border, a is left of b
+            cells = [((ax1 - 1, y), (ax1, y)) for y in range(ay0, ay1)]
+            step = (0, 1)
+        else:
+            # horizontal border, a is above b
+            cells = [((x, ay1 - 1), (x, ay1)) for x in range(ax0, ax1)]
+            step = (1, 0)
+
+        transitions = []
+        run = []
+        covered = set()
+        for pair in cells + [None]:
+            if pair and self._crossable(*pair):
+                run.append(pair)
+                covered.update(pair)
+                continue
+            if len(run) >= MAX_ENTRANCE_WIDTH:
+                transitions += [run[0], run[-1]]
+            elif run:
+                transitions.append(run[len(run) // 2])
+            run = []
+
+        if self.diagonal_movement != DiagonalMovement.never:
+            # cells that can only be crossed diagonally
+            for (ax, ay), (bx, by) in cells:
+                for sign in (-1, 1):
+                    pair = ((ax, ay), (bx + sign * step[0],
+                                       by + sign * step[1]))
+                    if pair[0] in covered or pair[1] in covered or \
+                            not self.inside_cluster(cluster_b, *pair[1]):
+                        continue
+                    if self._crossable(*pair):
+                        transitions.append(pair)
+                        covered.update(pair)
+        return transitions
+
+    def inside_cluster(self, cluster, x, y):
+        x0, y0, x1, y1 = self.cluster_rect(cluster)
+        return x0 <= x < x1 and y0 <= y < y1
+
+    def _build_border(self, cluster_a, cluster_b):
+        grid = self.grid
+        transitions = self._transitions(cluster_a, cluster_b)
+        self.borders[(cluster_a, cluster_b)] = transitions
+        for pos_a, pos_b in transitions:
+            node_a, node_b = grid.node(*pos_a), grid.node(*pos_b)
+            self.inter.setdefault(pos_a, {})[pos_b] = \
+                self.step_cost(node_a, node_b)
+            self.inter.setdefault(pos_b, {})[pos_a] = \
+                self.step_cost(node_b, node_a)
+
+    def _clear_border(self, cluster_a, cluster_b):
+        for pos_a, pos_b in self.borders.pop((cluster_a, cluster_b), []):
+            for pos, other in ((pos_a, pos_b), (pos_b, pos_a)):
+                edges = self.inter.get(pos)
+                if edges is not None:
+                    edges.pop(other, None)
+                    if not edges:
+                        del self.inter[pos]
+
+    def _border_pairs(self, cluster):
+        """
+        the (upper/left, lower/right) cluster pairs sharing a border with
+        cluster. With diagonal movement clusters touching at a corner count
+        as well.
+        """
+        cx, cy = cluster
+        offsets = [(-1, 0), (1, 0), (0, -1), (0, 1)]
+        if self.diagonal_movement != DiagonalMovement.never:
+            offsets += [(-1, -1), (1, -1), (-1, 1), (1, 1)]
+        pairs = []
+        for dx, dy in offsets:
+            other = (cx + dx, cy + dy)
+            if not (0 <= other[0] < self.columns and
+                    0 <= other[1] < self.rows):
+                continue
+            if (dy, dx) < (0, 0):
+                pairs.append((other, cluster))
+            else:
+                pairs.append((cluster, other))
+        return pairs
+
+    def _collect_nodes(self, cluster):
+        """
+        gather the abstract nodes of a cluster from the transitions on its
+        borders (a corner cell can be part of two borders)
+        """
+        nodes = set()
+        for cluster_a, cluster_b in self._border_pairs(cluster):
+            side = 0 if cluster_a == cluster else 1
+            for pair in self.borders.get((cluster_a, cluster_b), ()):
+                nodes.add(pair[side])
+        self.cluster_nodes[cluster] = nodes
+
+    def connect(self, cluster, pos_a, pos_b):
+        """
+        path and cost between two cells of a cluster (([], None) if there is
+        no path inside the cluster)
+        """
+        view = self.view(cluster)
+        path, runs = self.finder.find_path(
+            self.grid.node(*pos_a), self.grid.node(*pos_b), view)
+        if not path:
+            return [], None
+        return path, self.path_cost(path)
+
+    def _build_intra(self, cluster):
+        nodes = sorted(self.cluster_nodes[cluster])
+        for pos in nodes:
+            self.intra[pos] = {}
+        for i, pos_a in enumerate(nodes):
+            for pos_b in nodes[i + 1:]:
+                path, cost = self.connect(cluster, pos_a, pos_b)
+                if cost is None:
+                    continue
+                self.intra[pos_a][pos_b] = cost
+                path.reverse()
+                self.intra[pos_b][pos_a] = self.path_cost(path)
+
+    def _clear_intra(self, cluster):
+        for pos in self.cluster_nodes[cluster]:
+            self.intra.pop(pos, None)
+
+    def _corner_pairs(self, cluster):
+        """
+        pairs of clusters touching at a corner whose crossing depends on
+        cells of cluster (the diagonal step passes its corner)
+        """
+        if self.diagonal_movement == DiagonalMovement.never:
+            return []
+        cx, cy = cluster
+        pairs = [((cx - 1, cy), (cx, cy + 1)), ((cx, cy - 1), (cx + 1, cy)),
+                 ((cx + 1, cy), (cx, cy + 1)), ((cx, cy - 1), (cx - 1, cy))]
+        return [(a, b) for a, b in pairs
+                if 0 <= a[0] < self.columns and 0 <= a[1] < self.rows and
+                0 <= b[0] < self.columns and 0 <= b[1] < self.rows]
+
+    def update_cluster(self, cluster):
+        """
+        rebuild the entrances and distances around one cluster after cells
+        inside of it changed
+        """
+        pairs = self._border_pairs(cluster) + self._corner_pairs(cluster)
+        touched = {cluster}
+        for cluster_a, cluster_b in pairs:
+            touched.update((cluster_a, cluster_b))
+        for other in touched:
+            self._clear_intra(other)
+        for cluster_a, cluster_b in pairs:
+            self._clear_border(cluster_a, cluster_b)
+            self._build_border(cluster_a, cluster_b)
+        for other in sorted(touched):
+            self._collect_nodes(other)
+            self._build_intra(other)
+
+    def update_cells(self, cells):
+        """
+        update the abstraction after the given (x, y) cells changed (not
+        needed for changes made with Grid.apply_patch)
+        """
+        for cluster in {self.cluster_of(x, y) for x, y in cells}:
+            self.update_cluster(cluster)
+
+    def abstract_neighbors(self, pos):
+        edges = dict(self.intra.get(pos, ()))
+        edges.update(self.inter.get(pos, ()))
+        return edges
+
+    def to_dict(self):
+        def edges(table):
+            return [[a[0], a[1], b[0], b[1], cost]
+                    for a, targets in sorted(table.items())
+                    for b, cost in sorted(targets.items())]
+        return {
+            'width': self.grid.width,
+            'height': self.grid.height,
+            'cluster_size': self.cluster_size,
+            'diagonal_movement': self.diagonal_movement,
+            'borders': [[list(a), list(b),
+                         [[list(pa), list(pb)] for pa, pb in transitions]]
+                        for (a, b), transitions in sorted(
+                            self.borders.items())],
+            'intra': edges(self.intra),
+        }
+
+    def save(self, fp):
+        """
+        write the abstraction as JSON to a file object
+        """
+        json.dump(self.to_dict(), fp)
+
+    @classmethod
+    def load(cls, fp, grid, finder=None):
+        """
+        read an abstraction written by save for the given grid
+        """
+        data = json.load(fp)
+        if (data['width'], data['height']) != (grid.width, grid.height):
+            raise ValueError(
+                'abstraction was built for a {}x{} grid, got {}x{}'.format(
+                    data['width'], data['height'], grid.width, grid.height))
+        self = cls.__new__(cls)
+        self.grid = grid
+        self.cluster_size = data['cluster_size']
+        self.diagonal_movement = data['diagonal_movement']
+        self.finder = finder or AStarFinder(
+            diagonal_movement=self.diagonal_movement)
+        self.columns = -(-grid.width // self.cluster_size)
+        self.rows = -(-grid.height // self.cluster_size)
+        self.cluster_nodes = {(cx, cy): set() for cy in range(self.rows)
+                              for cx in range(self.columns)}
+        self.intra = {}
+        self.inter = {}
+        self.borders = {}
+        for a, b, transitions in data['borders']:
+            a, b = tuple(a), tuple(b)
+            self.borders[(a, b)] = []
+            for pos_a, pos_b in transitions:
+                pos_a, pos_b = tuple(pos_a), tuple(pos_b)
+                self.borders[(a, b)].append((pos_a, pos_b))
+                node_a, node_b = grid.node(*pos_a), grid.node(*pos_b)
+                self.inter.setdefault(pos_a, {})[pos_b] = \
+                    self.step_cost(node_a, node_b)
+                self.inter.setdefault(pos_b, {})[pos_a] = \
+                    self.step_cost(node_b, node_a)
+        for cluster in self.cluster_nodes:
+            self._collect_nodes(cluster)
+            for pos in self.cluster_nodes[cluster]:
+                self.intra[pos] = {}
+        for ax, ay, bx, by, cost in data['intra']:
+            self.intra.setdefault((ax, ay), {})[(bx, by)] = cost
+        self.watch()
+        return self
+
+
+class HPAStarFinder(Finder):
+    def __init__(self, heuristic=None, weight=1,
+                 diagonal_movement=DiagonalMovement.never,
+                 time_limit=TIME_LIMIT,
+                 max_runs=MAX_RUNS,
+                 cluster_size=CLUSTER_SIZE,
+                 abstraction=None):
+        """
+        find near-optimal paths on large grids using HPA*
+        :param heuristic: heuristic used to calculate distance of 2 points
+            (defaults to manhatten)
+        :param weight: weight for the edges
+        :param diagonal_movement: if diagonal movement is allowed
+            (see enum in diagonal_movement)
+        :param time_limit: max. runtime in seconds
+        :param max_runs: max. amount of expanded abstract nodes
+        :param cluster_size: width and height of a cluster, used when the
+            abstraction is built on the first find_path
+        :param abstraction: prebuilt (or loaded) Abstraction of the grid
+        """
+        super(HPAStarFinder, self).__init__(
+            heuristic=heuristic,
+            weight=weight,
+            diagonal_movement=diagonal_movement,
+            time_limit=time_limit,
+            max_runs=max_runs)
+
+        if not heuristic:
+            if diagonal_movement == DiagonalMovement.never:
+                self.heuristic = manhatten
+            else:
+                # When diagonal movement is allowed the manhattan heuristic is
+                # not admissible it should be octile instead
+                self.heuristic = octile
+
+        self.cluster_size = cluster_size
+        self.abstraction = abstraction
+
+    def get_abstraction(self, grid):
+        if self.abstraction is None or self.abstraction.grid is not grid:
+            self.abstraction = Abstraction(
+                grid, self.cluster_size, self.diagonal_movement)
+        return self.abstraction
+
+    def _endpoint_edges(self, abstraction, pos, reverse=False):
+        """
+        temporary edges connecting a start (or goal if reverse) cell to the
+        abstract nodes of its cluster
+        """
+        cluster = abstraction.cluster_of(*pos)
+        edges = {}
+        for other in abstraction.cluster_nodes[cluster]:
+            if other == pos:
+                edges[other] = 0
+                continue
+            if reverse:
+                path, cost = abstraction.connect(cluster, other, pos)
+            else:
+                path, cost = abstraction.connect(cluster, pos, other)
+            if cost is not None:
+                edges[other] = cost
+        return edges
+
+    def abstract_path(self, abstraction, start, end, state):
+        """
+        A* on the abstract graph extended by the start and end cells
+        """
+        start_pos, end_pos = (start.x, start.y), (end.x, end.y)
+        start_edges = self._endpoint_edges(abstraction, start_pos)
+        into_end = self._endpoint_edges(abstraction, end_pos, reverse=True)
+        if abstraction.cluster_of(*start_pos) == \
+                abstraction.cluster_of(*end_pos):
+            path, cost = abstraction.connect(
+                abstraction.cluster_of(*start_pos), start_pos, end_pos)
+            if cost is not None:
+                start_edges[end_pos] = cost
+
+        grid = abstraction.grid
+        order = itertools.count()
+        g = {start_pos: 0}
+        parent = {}
+        open_list = [(0, next(order), start_pos)]
+        closed = set()
+        while open_list:
+            f, _, pos = heapq.heappop(open_list)
+            if pos in closed:
+                continue
+            closed.add(pos)
+            state.runs += 1
+            self.keep_running(state)
+            if pos == end_pos:
+                path = [pos]
+                while pos in parent:
+                    pos = parent[pos]
+                    path.append(pos)
+                path.reverse()
+                return path
+
+            if pos == start_pos:
+                edges = dict(start_edges)
+                if pos in abstraction.intra or pos in abstraction.inter:
+                    edges.update(abstraction.abstract_neighbors(pos))
+            else:
+                edges = abstraction.abstract_neighbors(pos)
+            if pos in into_end:
+                edges[end_pos] = into_end[pos]
+
+            for other, cost in edges.items():
+                if other in closed:
+                    continue
+                ng = g[pos] + cost
+                if ng < g.get(other, float('inf')):
+                    g[other] = ng
+                    parent[other] = pos
+                    h = self.apply_heuristic(
+                        grid.node(*other), end) * self.weight
+                    heapq.heappush(open_list, (ng + h, next(order), other))
+        return []
+
+    def refine(self, abstraction, abstract_path):
+        """
+        turn an abstract path into a path of neighboring cells
+        """
+        if not abstract_path:
+            return []
+        path = [abstract_path[0]]
+        for pos_a, pos_b in zip(abstract_path, abstract_path[1:]):
+            cluster = abstraction.cluster_of(*pos_a)
+            if pos_a == pos_b:
+                continue
+            if cluster != abstraction.cluster_of(*pos_b):
+                # inter-cluster edge, the cells are neighbors
+                path.append(pos_b)
+                continue
+            segment, cost = abstraction.connect(cluster, pos_a, pos_b)
+            path += segment[1:]
+        return path
+
+    def find_path(self, start, end, grid):
+        """
+        find a path from start to end node on grid using HPA*.
+        The abstraction of the grid is built on the first call.
+        :param start: start node
+        :param end: end node
+        :param grid: grid that stores all possible steps/tiles as 2D-list
+        :return:
+        """
+        abstraction = self.get_abstraction(grid)
+        state = SearchState(grid)
+        if start is end:
+            return [(start.x, start.y)], 0
+        if self.unreachable(start, end, grid):
+            return [], 0
+        abstract_path = self.abstract_path(abstraction, start, end, state)
+        return self.refine(abstraction, abstract_path), state.runs
@@ -0,0 +1,70 @@
+# -*- coding: utf-8 -*-
+import heapq  # used for the so colled "open list" that stores known nodes
+import itertools
+import time  # for time limitation
+from core.util import backtrace, bi_backtrace
+
+
+class SearchState(object):
+    """
+    bookkeeping of a single search: g, h, opened, closed and parent of every
+    node the search has touched, the open list and the iteration counter.
+
+    It is kept apart from the nodes, so a finder only reads the grid and
+    one grid can serve several searches at the same time (e.g. from a
+    thread pool). All values are keyed by the (x, y) position of a node.
+    """
+    def __init__(self, grid):
+        self.grid = grid
+
+        # cost from the start node to a node
+        self.g = {}
+        # estimated cost from a node to the goal
+        self.h = {}
+        # open value of a node (True, BY_START or BY_END)
+        self.opened = {}
+        self.closed = set()
+        # used for backtracking to the start point
+        self.parent = {}
+
+        # heap of (f, insertion order, node). Entries of nodes that got
+        # reinserted with a smaller cost stay in the heap and are skipped
+        # once the node is closed.
+        self.open_list = []
+        self._order = itertools.count()
+
+        self.runs = 0  # count number of iterations
+        self.start_time = time.time()  # execution time limitation
+
+    def push(self, node, f):
+        """
+        put node into the open list with the estimated total cost f
+        """
+        heapq.heappush(self.open_list, (f, next(self._order), node))
+
+    def pop(self):
+        """
+        remove the node with minimum f value from the open list and mark it
+        as closed
+        """
+        open_list = self.open_list
+        closed = self.closed
+        node = heapq.heappop(open_list)[2]
+        closed.add((node.x, node.y))
+        # drop outdated entries, so open_list is empty once there is
+        # nothing left to expand
+        while open_list and (open_list[0][2].x, open_list[0][2].y) in closed:
+            heapq.heappop(open_list)
+        return node
+
+    def backtrace(self, node):
+        """
+        path from the start to node (including both)
+        """
+        return backtrace(node, self.parent)
+
+    def bi_backtrace(self, node_a, node_b):
+        """
+        path for bi-directional searches that met between node_a and node_b
+        """
+        return bi_backtrace(node_a, node_b, self.parent)
@@ -0,0 +1,308 @@
+# -*- coding: utf-8 -*-
+"""
+compact binary snapshots of a grid and an in-progress search.
+
+A search interrupted by ExecutionTimeException (or ExecutionRunsException)
+carries its SearchState; dumps() turns grid and state into bytes and
+loads() restores both, so find_path(..., state=state) can continue the
+search in another process or after a restart.
+
+Layout (little endian):
+    header   magic, format version, flags, width, height
+    grid     walkable bitset, weights (uint8 or int32 per cell)
+    search   start, end, runs, next insertion order,
+             touched cells (index, g, h, parent index, opened, closed),
+             open list (f, insertion order, index)
+    or, for a CompactSearchState (flag COMPACT_SEARCH):
+             start, end, runs, next insertion order,
+             g (float32 per cell), opened, closed and parent planes as
+             stored by finder.compact_state, open list (f, key)
+"""
+import itertools
+import struct
+from array import array
+from core.grid import Grid
+from .search_state import SearchState
+from .compact_state import CompactSearchState
+
+MAGIC = b'PFSN'
+FORMAT_VERSION = 1
+
+HAS_GRID = 1
+HAS_SEARCH = 2
+SMALL_WEIGHTS = 4
+COMPACT_SEARCH = 8
+
+HEADER = struct.Struct('<4sHHII')
+SEARCH_HEADER = struct.Struct('<IIIIQQII')
+NO_PARENT = 0xffffffff
+
+
+class SnapshotError(Exception):
+    pass
+
+
+class Snapshot(object):
+    """
+    result of loads: the grid, the search state and its start/end nodes
+    (state, start and end are None if no search was stored)
+    """
+    def __init__(self, grid, state=None, start=None, end=None):
+        self.grid = grid
+        self.state = state
+        self.start = start
+        self.end = end
+
+
+def _pack_bits(flags):
+    bits = bytearray((len(flags) + 7) // 8)
+    for i, flag in enumerate(flags):
+        if flag:
+            bits[i >> 3] |= 1 << (i & 7)
+    return bytes(bits)
+
+
+def _unpack_bits(data, amount):
+    return [bool(data[i >> 3] >> (i & 7) & 1) for i in range(amount)]
+
+
+def _typed(typecode, data):
+    values = array(typecode)
+    values.frombytes(data)
+    if struct.pack('=H', 1) != struct.pack('<H', 1):
+        values.byteswap()
+    return values
+
+
+def _bytes(values):
+    if struct.pack('=H', 1) != struct.pack('<H', 1):
+        values = array(values.typecode, values)
+        values.byteswap()
+    return values.tobytes()
+
+
+def _next_order(state):
+    """
+    peek at the insertion counter of a search state without losing a value
+    """
+    next_order = next(state._order)
+    state._order = itertools.count(next_order)
+    return next_order
+
+
+def _dump_compact(state, start, end):
+    """
+    search section of a CompactSearchState: its planes are stored as they
+    are, the open list as (f, key) pairs
+    """
+    open_list = state.open_list
+    return b''.join((
+        SEARCH_HEADER.pack(start.x, start.y, end.x, end.y, state.runs,
+                           _next_order(state), state.size, len(open_list)),
+        _bytes(state.g.values),
+        bytes(state.opened.bits),
+        bytes(state.closed.bits),
+        bytes(state.parent.codes),
+        _bytes(array('d', [entry[0] for entry in open_list])),
+        _bytes(array('Q', [entry[1] for entry in open_list]))))
+
+
+def dumps(grid, state=None, start=None, end=None, include_grid=True):
+    """
+    serialize grid and (optionally) a search state
+    :param grid: grid the search runs on
+    :param state: SearchState of the search
+    :param start: start node of the search
+    :param end: end node of the search
+    :param include_grid: store the grid planes, leave this out if the grid
+        is restored by other means (loads then needs the grid)
+    :return: bytes
+    """
+    width, height = grid.width, grid.height
+    flags = 0
+    chunks = []
+    if include_grid:
+        flags |= HAS_GRID
+        nodes = [node for row in grid.nodes for node in row] \
+            if width and height else []
+        weights = [node.weight for node in nodes]
+        small = all(0 <= weight < 256 for weight in weights)
+        if small:
+            flags |= SMALL_WEIGHTS
+        chunks.append(_pack_bits([node.walkable for node in nodes]))
+        chunks.append(bytes(weights) if small
+                      else _bytes(array('i', weights)))
+
+    if isinstance(state, CompactSearchState):
+        flags |= HAS_SEARCH | COMPACT_SEARCH
+        chunks.append(_dump_compact(state, start, end))
+    elif state is not None:
+        flags |= HAS_SEARCH
+        cells = sorted(set(state.g) | set(state.h) | set(state.opened) |
+                       state.closed | set(state.parent),
+                       key=lambda pos: (pos[1], pos[0]))
+        open_list = state.open_list
+        chunks.append(SEARCH_HEADER.pack(
+            start.x, start.y, end.x, end.y, state.runs, _next_order(state),
+            len(cells), len(open_list)))
+        nan = float('nan')
+        chunks.append(_bytes(array('I', [y * width + x for x, y in cells])))
+        chunks.append(_bytes(array('d', [state.g.get(pos, nan)
+                                         for pos in cells])))
+        chunks.append(_bytes(array('d', [state.h.get(pos, nan)
+                                         for pos in cells])))
+        parents = []
+        for pos in cells:
+            parent = state.parent.get(pos)
+            parents.append(NO_PARENT if parent is None
+                           else parent[1] * width + parent[0])
+        chunks.append(_bytes(array('I', parents)))
+        chunks.append(bytes(int(state.opened.get(pos) or 0)
+                            for pos in cells))
+        chunks.append(_pack_bits([pos in state.closed for pos in cells]))
+        chunks.append(_bytes(array('d', [entry[0] for entry in open_list])))
+        chunks.append(_bytes(array('Q', [entry[1] for entry in open_list])))
+        chunks.append(_bytes(array('I', [entry[2].y * width + entry[2].x
+                                         for entry in open_list])))
+
+    return HEADER.pack(MAGIC, FORMAT_VERSION, flags, width, height) + \
+        b''.join(chunks)
+
+
+def loads(data, grid=None):
+    """
+    restore a snapshot written by dumps
+    :param data: bytes
+    :param grid: grid to attach the search to if the snapshot was written
+        without include_grid
+    :return: Snapshot
+    """
+    view = memoryview(data)
+    magic, version, flags, width, height = HEADER.unpack_from(view, 0)
+    if magic != MAGIC or version != FORMAT_VERSION:
+        raise SnapshotError('not a path finding snapshot (version {})'
+                            .format(FORMAT_VERSION))
+    offset = HEADER.size
+    size = width * height
+
+    if flags & HAS_GRID:
+        walkable_bytes = (size + 7) // 8
+        walkable = _unpack_bits(view[offset:offset + walkable_bytes], size)
+        offset += walkable_bytes
+        if flags & SMALL_WEIGHTS:
+            weights = view[offset:offset + size].tolist()
+            offset += size
+        else:
+            weights = _typed('i', view[offset:offset + size * 4])
+            offset += size * 4
+        grid = Grid(width=width, height=height)
+        i = 0
+        for row in grid.nodes if size else []:
+            for node in row:
+                node.walkable = walkable[i]
+                node.weight = weights[i]
+                i += 1
+    elif grid is None:
+        raise SnapshotError('the snapshot holds no grid, pass one to loads')
+    elif (grid.width, grid.height) != (width, height):
+        raise SnapshotError('snapshot is for a {}x{} grid, got {}x{}'.format(
+            width, height, grid.width, grid.height))
+
+    if not flags & HAS_SEARCH:
+        return Snapshot(grid)
+
+    (start_x, start_y, end_x, end_y, runs, next_order,
+     amount, open_amount) = SEARCH_HEADER.unpack_from(view, offset)
+    offset += SEARCH_HEADER.size
+
+    def take(typecode, itemsize, count):
+        nonlocal offset
+        values = _typed(typecode, view[offset:offset + itemsize * count])
+        offset += itemsize * count
+        return values
+
+    if flags & COMPACT_SEARCH:
+        if amount != size:
+            raise SnapshotError('compact search state is for {} cells, '
+                                'the grid has {}'.format(amount, size))
+        state = CompactSearchState(grid)
+        state.g.values = take('f', 4, size)
+        for plane, length in ((state.opened, (size + 3) // 4),
+                              (state.closed, (size + 7) // 8)):
+            plane.bits = bytearray(view[offset:offset + length])
+            offset += length
+        state.parent.codes = bytearray(view[offset:offset + size])
+        offset += size
+        open_f = take('d', 8, open_amount)
+        open_keys = take('Q', 8, open_amount)
+        # stored in heap order, so the list is a heap already
+        state.open_list = list(zip(open_f, open_keys))
+    else:
+        state = _load_search(view, offset, grid, amount, open_amount)
+    state.runs = runs
+    state._order = itertools.count(next_order)
+    return Snapshot(grid, state, grid.node(start_x, start_y),
+                    grid.node(end_x, end_y))
+
+
+def _load_search(view, offset, grid, amount, open_amount):
+    """
+    SearchState of the search section of a snapshot
+    """
+    width = grid.width
+
+    def take(typecode, itemsize, count):
+        nonlocal offset
+        values = _typed(typecode, view[offset:offset + itemsize * count])
+        offset += itemsize * count
+        return values
+
+    indices = take('I', 4, amount)
+    g_values = take('d', 8, amount)
+    h_values = take('d', 8, amount)
+    parents = take('I', 4, amount)
+    opened = view[offset:offset + amount].tolist()
+    offset += amount
+    closed_bytes = (amount + 7) // 8
+    closed = _unpack_bits(view[offset:offset + closed_bytes], amount)
+    offset += closed_bytes
+    open_f = take('d', 8, open_amount)
+    open_order = take('Q', 8, open_amount)
+    open_index = take('I', 4, open_amount)
+
+    state = SearchState(grid)
+    for i, index in enumerate(indices):
+        pos = (index % width, index // width)
+        g, h = g_values[i], h_values[i]
+        if g == g:  # not NaN
+            state.g[pos] = g
+        if h == h:
+            state.h[pos] = h
+        if parents[i] != NO_PARENT:
+            state.parent[pos] = (parents[i] % width, parents[i] // width)
+        if opened[i]:
+            state.opened[pos] = True if opened[i] == 1 else opened[i]
+        if closed[i]:
+            state.closed.add(pos)
+    # the entries are stored in heap order, so the list is a heap already
+    state.open_list = [
+        (open_f[i], open_order[i],
+         grid.node(open_index[i] % width, open_index[i] // width))
+        for i in range(open_amount)]
+    return state
+
+
+def save(path, grid, state=None, start=None, end=None, include_grid=True):
+    """
+    write a snapshot (see dumps) to a file
+    """
+    with open(path, 'wb') as f:
+        f.write(dumps(grid, state, start, end, include_grid))
+
+
+def load(path, grid=None):
+    """
+    read a snapshot (see loads) from a file
+    """
+    with open(path, 'rb') as f:
+        return loads(f.read(), grid)
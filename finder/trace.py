@@ -0,0 +1,248 @@
+# -*- coding: utf-8 -*-
+"""
+binary trace of the nodes a finder expands, to see which cells a heuristic
+or tie-breaking rule makes the search visit.
+
+Pass a TraceRecorder as `recorder` to a finder. Every expansion is packed
+as a fixed-size record into a preallocated buffer that is written to the
+trace file whenever it is full. Without a recorder the finder only checks
+for None once per expansion.
+
+File layout (little endian):
+    header   magic, format version, grid width, grid height
+    records  search, run, x, y, g, h, f  (one per expanded node)
+
+Read a trace with read_trace and render it with heatmap_str, or dump one
+value per cell as raw array (e.g. for numpy.fromfile) with dump_array:
+
+    python -m finder.trace search.trace [--search 1] [--value count]
+        [--raw out.bin]
+"""
+import argparse
+import struct
+from array import array
+
+MAGIC = b'PFTR'
+FORMAT_VERSION = 1
+
+HEADER = struct.Struct('<4sHII')
+RECORD = struct.Struct('<IIIIfff')
+# records kept in memory before they are written to the file
+DEFAULT_CAPACITY = 4096
+
+# characters of the heatmap, from few to many expansions
+SHADES = ' .:-=+*%@'
+# values to_array can compute per cell
+VALUES = ('count', 'order', 'g', 'h', 'f')
+# position of the g, h and f value in a record
+FIELDS = {'g': 4, 'h': 5, 'f': 6}
+
+
+class TraceError(Exception):
+    pass
+
+
+class TraceRecorder(object):
+    """
+    collects expanded nodes of one or more searches on grids of the same
+    size into a trace file
+    """
+    def __init__(self, path, capacity=DEFAULT_CAPACITY):
+        """
+        :param path: trace file, it is created with the first search
+        :param capacity: amount of records buffered before a write
+        """
+        self.path = path
+        self.capacity = capacity
+        self.buffer = bytearray(RECORD.size * capacity)
+        self.offset = 0
+        self.search = 0
+        self.size = None
+        self.file = None
+
+    def begin(self, grid):
+        """
+        start a new search (called by Finder.init_search/resume_search)
+        """
+        size = (grid.width, grid.height)
+        if self.file is None:
+            self.file = open(self.path, 'wb')
+            self.file.write(HEADER.pack(MAGIC, FORMAT_VERSION, *size))
+            self.size = size
+        elif size != self.size:
+            raise TraceError('trace is for a {}x{} grid, got {}x{}'.format(
+                self.size[0], self.size[1], size[0], size[1]))
+        self.search += 1
+
+    def record(self, state, node, h=None):
+        """
+        append the expansion of node to the buffer
+        :param h: heuristic of node, taken from the state if not given
+            (a CompactSearchState does not store it)
+        """
+        pos = (node.x, node.y)
+        g = state.g.get(pos, 0.0)
+        if h is None:
+            h = state.h.get(pos, 0.0)
+        RECORD.pack_into(self.buffer, self.offset, self.search, state.runs,
+                         node.x, node.y, g, h, g + h)
+        self.offset += RECORD.size
+        if self.offset == len(self.buffer):
+            self.flush()
+
+    def flush(self):
+        """
+        write the buffered records to the trace file
+        """
+        if self.file is not None and self.offset:
+            self.file.write(memoryview(self.buffer)[:self.offset])
+            self.offset = 0
+        if self.file is not None:
+            self.file.flush()
+
+    def close(self):
+        self.flush()
+        if self.file is not None:
+            self.file.close()
+            self.file = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+        return False
+
+
+class Trace(object):
+    """
+    content of a trace file, records are (search, run, x, y, g, h, f)
+    """
+    def __init__(self, width, height, records):
+        self.width = width
+        self.height = height
+        self.records = records
+
+    def searches(self):
+        return sorted({record[0] for record in self.records})
+
+    def select(self, search=None):
+        """
+        records of one search (all if search is None)
+        """
+        if search is None:
+            return self.records
+        return [record for record in self.records if record[0] == search]
+
+
+def read_trace(path):
+    """
+    load a trace file written by TraceRecorder
+    :return: Trace
+    """
+    with open(path, 'rb') as f:
+        data = f.read()
+    if len(data) < HEADER.size:
+        raise TraceError('{} is not a trace file'.format(path))
+    magic, version, width, height = HEADER.unpack_from(data, 0)
+    if magic != MAGIC or version != FORMAT_VERSION:
+        raise TraceError('{} is not a trace file (version {})'.format(
+            path, FORMAT_VERSION))
+    body = memoryview(data)[HEADER.size:]
+    # a trace of a crashed process can end with a partial record
+    body = body[:len(body) - len(body) % RECORD.size]
+    return Trace(width, height, list(RECORD.iter_unpack(body)))
+
+
+def to_array(trace, value='count', search=None):
+    """
+    one value per cell in row major order
+    :param value: 'count' (expansions of the cell), 'order' (first
+        expansion, 1 based, 0 if never expanded) or the 'g', 'h' or 'f'
+        value of its last expansion
+    :return: array ('I' for count/order, 'f' otherwise)
+    """
+    if value not in VALUES:
+        raise ValueError('value has to be one of {}'.format(VALUES))
+    width = trace.width
+    size = width * trace.height
+    if value in ('count', 'order'):
+        values = array('I', bytes(4 * size))
+    else:
+        values = array('f', bytes(4 * size))
+        field = FIELDS[value]
+    for number, record in enumerate(trace.select(search), 1):
+        index = record[3] * width + record[2]
+        if value == 'count':
+            values[index] += 1
+        elif value == 'order':
+            if not values[index]:
+                values[index] = number
+        else:
+            values[index] = record[field]
+    return values
+
+
+def dump_array(trace, path, value='count', search=None):
+    """
+    write to_array as raw little endian values (no header)
+    """
+    values = to_array(trace, value, search)
+    if struct.pack('=H', 1) != struct.pack('<H', 1):
+        values.byteswap()
+    with open(path, 'wb') as f:
+        f.write(values.tobytes())
+
+
+def heatmap_str(trace, search=None, grid=None, border=True):
+    """
+    render the amount of expansions per cell like Grid.grid_str, blocked
+    cells of grid (optional) are shown as '#'
+    """
+    width, height = trace.width, trace.height
+    counts = to_array(trace, 'count', search)
+    most = max(counts) if counts else 0
+    steps = len(SHADES) - 1
+    lines = []
+    for y in range(height):
+        line = []
+        for x in range(width):
+            count = counts[y * width + x]
+            if grid is not None and not grid.node(x, y).walkable:
+                line.append('#')
+            elif not count:
+                line.append(SHADES[0])
+            else:
+                line.append(SHADES[1 + (count - 1) * (steps - 1) //
+                                    max(1, most - 1)])
+        lines.append(''.join(line))
+    if border:
+        edge = '+' + '-' * width + '+'
+        lines = [edge] + ['|' + line + '|' for line in lines] + [edge]
+    return '\n'.join(lines)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='render a finder trace')
+    parser.add_argument('path')
+    parser.add_argument('--search', type=int, default=None,
+                        help='only this search (1 based)')
+    parser.add_argument('--value', choices=VALUES, default='count',
+                        help='value per cell for --raw')
+    parser.add_argument('--raw', help='write the values as raw array here '
+                        'instead of printing a heatmap')
+    args = parser.parse_args()
+
+    trace = read_trace(args.path)
+    if args.raw:
+        dump_array(trace, args.raw, args.value, args.search)
+        print('{}x{} {} values written to {}'.format(
+            trace.width, trace.height, args.value, args.raw))
+        return
+    print(heatmap_str(trace, args.search))
+    print('{} expansions in {} searches'.format(
+        len(trace.select(args.search)), len(trace.searches())))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,238 @@
+"""Generates tables.py, the answers of the rules of rules.py for every input.
+
+Every table below is solved with rules.compile_rules for every input on
+every game state of states(). Game states are told apart by the values of
+the state conditions of the table (their fingerprint, see
+rules.fingerprint), so a table has one row of answers per fingerprint.
+Two game states with the same fingerprint always give the same answers,
+the generator checks it. Answers take one byte each, all rows are stored
+zlib compressed in tables.py.
+
+The generator is an oracle as well: --check compares the answers in
+tables.py with the rules and lists every answer that changed.
+
+    python generate_tables.py            writes tables.py
+    python generate_tables.py --check    exits with status 1 if tables.py is outdated
+"""
+
+import argparse
+import base64
+import itertools
+import sys
+import zlib
+
+import eventlog
+import keeptalkingandnobodyexplodes as ktane
+import rules
+
+OUTPUT = "tables.py"
+
+
+def wire_table(amount):
+    inputs = list(itertools.product(rules.WIRE_COLORS, repeat=amount))
+    conditions = rules.state_conditions(rules.WIRES[amount])
+
+    def solver(state):
+        solve = rules.compile_rules(rules.WIRES[amount], state)
+        return lambda wires: solve(list(wires))
+    return inputs, conditions, solver
+
+
+def button_table():
+    inputs = list(itertools.product(rules.BUTTON_COLORS, rules.BUTTON_TEXTS))
+    conditions = rules.state_conditions(rules.BUTTON)
+
+    def solver(state):
+        return rules.compile_rules(rules.BUTTON, state)
+    return inputs, conditions, solver
+
+
+def complicated_wires_table():
+    inputs = sorted(rules.COMPLICATED_WIRES)
+    conditions = rules.state_conditions(*rules.COMPLICATED_WIRES.values())
+
+    def solver(state):
+        return lambda code: rules.compile_rules(rules.COMPLICATED_WIRES[code], state)(None)
+    return inputs, conditions, solver
+
+
+# name -> (inputs in index order, state conditions, solver(state))
+TABLES = {
+    "wires 3": wire_table(3),
+    "wires 4": wire_table(4),
+    "wires 5": wire_table(5),
+    "wires 6": wire_table(6),
+    "button": button_table(),
+    "complicated wires": complicated_wires_table(),
+}
+
+
+def states():
+    """Every game state the state conditions can tell apart."""
+
+    conditions = rules.state_conditions(
+        *rules.WIRES.values(), rules.BUTTON, *rules.COMPLICATED_WIRES.values())
+    labels = sorted({args[0] for name, *args in conditions
+                     if name in ("indicator", "lit")})
+    batteries = max([args[0] for name, *args in conditions
+                     if name == "batteries over"] or [0]) + 2
+    for serial in ("A0", "A1"):
+        for battery in range(batteries):
+            for kinds in itertools.product((None, "unlit", "lit"), repeat=len(labels)):
+                indicators = [label for label, kind in zip(labels, kinds) if kind]
+                lit = [label for label, kind in zip(labels, kinds) if kind == "lit"]
+                yield ktane.setup_state(battery, 0, indicators, lit, serial)
+
+
+def generate():
+    """Answers of every table.
+
+    Outputs:
+    dict, table name -> {fingerprint: bytes of the answers}
+
+    Throws:
+    ValueError if two game states with the same fingerprint give
+    different answers
+    """
+
+    rows = {name: {} for name in TABLES}
+    for state in states():
+        for name, (inputs, conditions, solver) in TABLES.items():
+            solve = solver(state)
+            row = bytes(int(solve(value)) for value in inputs)
+            key = rules.fingerprint(conditions, state)
+            if rows[name].setdefault(key, row) != row:
+                raise ValueError(f"{name}: the state conditions {conditions} "
+                                 "do not tell all game states apart")
+    return rows
+
+
+def render(rows):
+    """Source of tables.py."""
+
+    data = b""
+    index = {}
+    for name, (inputs, conditions, solver) in TABLES.items():
+        offsets = {}
+        for key, row in sorted(rows[name].items()):
+            offsets[key] = len(data)
+            data += row
+        index[name] = (conditions, offsets)
+    encoded = base64.b64encode(zlib.compress(data, 9)).decode()
+
+    lines = [
+        '"""Generated by generate_tables.py from rules.py, do not edit.',
+        "",
+        "Answers of Simple Wires, The Button and Complicated Wires for every",
+        "input, one row per fingerprint of the game state (see generate_tables.py).",
+        '"""',
+        "",
+        "import base64",
+        "import zlib",
+        "",
+        "import rules",
+        "",
+        f"DIGEST = {rules.digest()!r}",
+        "",
+        f"WIRE_COLORS = {rules.WIRE_COLORS!r}",
+        f"BUTTON_COLORS = {rules.BUTTON_COLORS!r}",
+        f"BUTTON_TEXTS = {rules.BUTTON_TEXTS!r}",
+        f"COMPLICATED_WIRES = {tuple(TABLES['complicated wires'][0])!r}",
+        "",
+        "# table name -> (state conditions, {fingerprint: offset of the row})",
+        "TABLES = {",
+    ]
+    for name, (conditions, offsets) in index.items():
+        lines.append(f"    {name!r}: ({conditions!r},")
+        lines.append(f"        {offsets!r}),")
+    lines += [
+        "}",
+        "",
+        f"SIZES = {({name: len(table[0]) for name, table in TABLES.items()})!r}",
+        "",
+        "DATA = zlib.decompress(base64.b64decode(",
+    ]
+    for start in range(0, len(encoded), 72):
+        lines.append(f'    "{encoded[start:start + 72]}"')
+    lines += [
+        "))",
+        "",
+        "",
+        "# the tables are only used while the rules are the same",
+        "CURRENT = DIGEST == rules.digest()",
+        "",
+        "",
+        "def answers(name, state):",
+        '    """Row of answers of a table for the game state, indexed by input number.',
+        "",
+        "    None if the rules changed since the tables were generated or the",
+        "    generator never saw a game state with this fingerprint.",
+        '    """',
+        "",
+        "    if not CURRENT:",
+        "        return None",
+        "    conditions, offsets = TABLES[name]",
+        "    offset = offsets.get(rules.fingerprint(conditions, state))",
+        "    if offset is None:",
+        "        return None",
+        "    return DATA[offset:offset + SIZES[name]]",
+        "",
+    ]
+    return "\n".join(lines)
+
+
+def check(rows):
+    """Lists the answers of tables.py that differ from the rules.
+
+    Outputs:
+    int, amount of differences
+    """
+
+    import tables
+
+    if tables.DIGEST != rules.digest():
+        print("rules.py changed since tables.py was generated")
+    differences = 0
+    for name, (inputs, conditions, solver) in TABLES.items():
+        old_conditions, offsets = tables.TABLES.get(name, ((), {}))
+        if old_conditions != conditions:
+            print(f"{name}: state conditions {old_conditions} -> {conditions}")
+            differences += 1
+            continue
+        for key, row in rows[name].items():
+            if key not in offsets:
+                print(f"{name}: fingerprint {key} is missing")
+                differences += 1
+                continue
+            old = tables.DATA[offsets[key]:offsets[key] + len(row)]
+            for value, before, after in zip(inputs, old, row):
+                if before != after:
+                    value = value if isinstance(value, str) else " ".join(value)
+                    print(f"{name}: {value} (fingerprint {key}): "
+                          f"{before} -> {after}")
+                    differences += 1
+    return differences
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--check", action="store_true",
+                        help="compare tables.py with the rules instead of writing it")
+    args = parser.parse_args()
+
+    ktane.events().level = eventlog.OFF
+    rows = generate()
+    if args.check:
+        differences = check(rows)
+        if differences:
+            print(f"{differences} answers differ, run generate_tables.py")
+            sys.exit(1)
+        print("tables.py is up to date")
+        return
+    with open(OUTPUT, "w") as f:
+        f.write(render(rows))
+    print(f"wrote {OUTPUT}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,177 @@
+"""Append-only journal of the bombs being solved, to resume them after a crash.
+
+The journal is a headless script (see run_headless_mode in
+keeptalkingandnobodyexplodes.py): a "bomb" line starts every bomb, the
+setup lines and every module line follow as they are solved, each module
+line with a "#= <answer>" comment holding the answer that was given. An
+"# end <how>" comment closes a bomb that is over:
+
+    bomb
+    batteries 2 1
+    indicators FRK
+    lit FRK
+    serial AB3DE4
+    simon red blue
+    #= New order: blue, red
+    strike
+    #= Strike 1
+    # end defused
+
+Lines are flushed to the operating system at once, so they survive a
+crash of the solver. fsync is batched: every SYNC_EVERY lines or after
+SYNC_INTERVAL seconds, and when the journal is closed.
+"""
+
+import os
+import time
+
+SYNC_EVERY = 16
+SYNC_INTERVAL = 1.0
+# bytes read at a time when the journal is read backwards
+BLOCK_SIZE = 4096
+ANSWER = "#= "
+END = "# end"
+
+
+def format_answer(answer):
+    """An answer as it is kept in the journal, on one line.
+
+    Trailing whitespace is dropped, reading the journal strips it anyway.
+    """
+
+    return str(answer).replace("\n", " | ").rstrip()
+
+
+class Journal:
+    def __init__(self, path, sync_every=SYNC_EVERY, sync_interval=SYNC_INTERVAL):
+        """
+        Arguments:
+        path (str): The journal file, created if it does not exist.
+        sync_every (int): Amount of lines after which the file is fsynced.
+        sync_interval (float): Seconds after which the file is fsynced.
+        """
+
+        self.path = path
+        self.file = open(path, "a", encoding="utf-8")
+        self.sync_every = sync_every
+        self.sync_interval = sync_interval
+        self.unsynced = 0
+        self.synced_at = time.monotonic()
+
+    def write(self, lines):
+        self.file.write("".join(line + "\n" for line in lines))
+        self.file.flush()
+        self.unsynced += len(lines)
+        if (self.unsynced >= self.sync_every or
+                time.monotonic() - self.synced_at >= self.sync_interval):
+            self.sync()
+
+    def begin(self):
+        """Starts a new bomb."""
+
+        self.write(["bomb"])
+
+    def record(self, line, answer=None):
+        """Appends a setup or module line and the answer given to it."""
+
+        lines = [line]
+        if answer is not None:
+            lines.append(ANSWER + format_answer(answer))
+        self.write(lines)
+
+    def end(self, how):
+        """Closes the bomb, it will not be resumed."""
+
+        self.write([f"{END} {how}"])
+        self.sync()
+
+    def sync(self):
+        os.fsync(self.file.fileno())
+        self.unsynced = 0
+        self.synced_at = time.monotonic()
+
+    def close(self):
+        if not self.file.closed:
+            self.file.flush()
+            self.sync()
+            self.file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def read(path):
+    """The lines of a journal, none if it does not exist."""
+
+    try:
+        with open(path, encoding="utf-8") as f:
+            return f.read().splitlines()
+    except FileNotFoundError:
+        return []
+
+
+def read_tail(path, block_size=BLOCK_SIZE):
+    """The lines of a journal from its last "bomb" or "# end" line on.
+
+    The journal only grows, so it is read backwards from its end until
+    one of them is found instead of reading it whole. Enough for last_bomb.
+    """
+
+    try:
+        f = open(path, "rb")
+    except FileNotFoundError:
+        return []
+    with f:
+        position = f.seek(0, os.SEEK_END)
+        data = b""
+        while position > 0:
+            size = min(block_size, position)
+            position -= size
+            f.seek(position)
+            data = f.read(size) + data
+            lines = data.splitlines()
+            # the first line may be cut, unless the file starts there
+            for number in range(len(lines) - 1, 0 if position else -1, -1):
+                line = lines[number].strip()
+                if line == b"bomb" or line.startswith(END.encode()):
+                    return [line.decode("utf-8") for line in lines[number:]]
+        return data.decode("utf-8").splitlines()
+
+
+def last_bomb(lines):
+    """The lines of the last bomb if it is not over yet, else None."""
+
+    start = None
+    for number in range(len(lines) - 1, -1, -1):
+        line = lines[number].strip()
+        if line.startswith(END):
+            return None
+        if line == "bomb":
+            start = number
+            break
+    if start is None:
+        return None
+    return lines[start:]
+
+
+def entries(lines):
+    """(line, answer) pairs of the module and setup lines, answer is None if none was recorded."""
+
+    pending = None
+    for line in lines:
+        line = line.strip()
+        if line.startswith(ANSWER):
+            if pending is not None:
+                yield pending, line[len(ANSWER):]
+                pending = None
+            continue
+        if pending is not None:
+            yield pending, None
+            pending = None
+        if line and not line.startswith("#"):
+            pending = line
+    if pending is not None:
+        yield pending, None
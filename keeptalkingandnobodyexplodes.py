@@ -1,10 +1,13 @@
+import os
 import sys
-import datetime
-import pathfinder
-import easygui
+import time
 
-# Whether to log every action you take
-LOG = True
+# Journal of the bombs solved in the GUI, to resume them after a crash
+JOURNAL_PATH = os.path.join(os.path.expanduser("~"), ".ktane-journal")
+
+# Events below this level are not written (a name of eventlog.LEVELS), all
+# of them are kept for the crash report of the GUI
+LOG_LEVEL = "info"
 
 
 ##### V   LONG CONSTS   V
@@ -61,10 +64,106 @@ d  | delta
 s  | sigma
 """
 
-# 1 - cut, 0 - no cut, 2 - serial even, 3 - parallel, 4 - 2 or more batteries
-COMPLICATED_WIRES_DIAGRAM = {"x": 1, "r": 2, "b": 2, "br": 2, "rs": 1, "brs": 3, "blrs": 0,
-                             "blr": 2, "lr": 4, "s": 1, "bl": 3, "bls": 3, "ls": 4, "lrs": 4,
-                             "bs": 0, "l": 0}
+# maze number (see pathfinder.matrixes) by the position of a circle
+MAZE_CIRCLES = {"1 2": 0, "6 3": 0,
+                "2 4": 1, "5 2": 1,
+                "4 4": 2, "6 4": 2,
+                "1 1": 3, "1 4": 3,
+                "5 3": 4, "4 6": 4,
+                "5 1": 5, "3 5": 5,
+                "2 1": 6, "2 6": 6,
+                "4 1": 7, "3 4": 7,
+                "3 2": 8, "1 5": 8}
+
+ORDINALS = {1: "first", 2: "second", 3: "third",
+            4: "fourth", 5: "fifth", 6: "sixth"}
+
+# Who's on First: position of the button to read by the display
+WON_READ = {"yes": 2, "first": 1, "display": 5, "okay": 1, "says": 5, "nothing": 2, "-": 4,
+            "blank": 3, "no": 5, "led": 2, "lead": 5, "read": 3, "red": 3, "reed": 4, "leed": 4,
+            "holdon": 5, "you": 3, "youare": 5, "your": 3, "you're": 3, "ur": 0, "there": 5,
+            "they're": 4, "their": 3, "theyare": 2, "see": 5, "c": 1, "cee": 5}
+
+# Who's on First: priority lists by the label of that button
+WON_CHOOSE = {'ready': ['yes', 'okay', 'what', 'middle', 'left', 'press', 'right', 'blank', 'ready', 'no', 'first', 'uhhh', 'nothing', 'wait'],
+              'first': ['left', 'okay', 'yes', 'middle', 'no', 'right', 'nothing', 'uhhh', 'wait', 'ready', 'blank', 'what', 'press', 'first'],
+              'no': ['blank', 'uhhh', 'wait', 'first', 'what', 'ready', 'right', 'yes', 'nothing', 'left', 'press', 'okay', 'no', 'middle'],
+              'blank': ['wait', 'right', 'okay', 'middle', 'blank', 'press', 'ready', 'nothing', 'no', 'what', 'left', 'uhhh', 'yes', 'first'],
+              'nothing': ['uhhh', 'right', 'okay', 'middle', 'yes', 'blank', 'no', 'press', 'left', 'what', 'wait', 'first', 'nothing', 'ready'],
+              'yes': ['okay', 'right', 'uhhh', 'middle', 'first', 'what', 'press', 'ready', 'nothing', 'yes', 'left', 'blank', 'no', 'wait'],
+              'what': ['uhhh', 'what', 'left', 'nothing', 'ready', 'blank', 'middle', 'no', 'okay', 'first', 'wait', 'yes', 'press', 'right'],
+              'uhhh': ['ready', 'nothing', 'left', 'what', 'okay', 'yes', 'right', 'no', 'press', 'blank', 'uhhh', 'middle', 'wait', 'first'],
+              'left': ['right', 'left', 'first', 'no', 'middle', 'yes', 'blank', 'what', 'uhhh', 'wait', 'press', 'ready', 'okay', 'nothing'],
+              'right': ['yes', 'nothing', 'ready', 'press', 'no', 'wait', 'what', 'right', 'middle', 'left', 'uhhh', 'blank', 'okay', 'first'],
+              'middle': ['blank', 'ready', 'okay', 'what', 'nothing', 'press', 'no', 'wait', 'left', 'middle', 'right', 'first', 'uhhh', 'yes'],
+              'okay': ['middle', 'no', 'first', 'yes', 'uhhh', 'nothing', 'wait', 'okay', 'left', 'ready', 'blank', 'press', 'what', 'right'],
+              'wait': ['uhhh', 'no', 'blank', 'okay', 'yes', 'left', 'first', 'press', 'what', 'wait', 'nothing', 'ready', 'right', 'middle'],
+              'press': ['right', 'middle', 'yes', 'ready', 'press', 'okay', 'nothing', 'uhhh', 'blank', 'left', 'first', 'what', 'no', 'wait'],
+              'you': ['sure', 'youare', 'your', "you're", 'next', 'uhhuh', 'ur', 'hold', 'what?', 'you', 'uhuh', 'like', 'done', 'u'],
+              'youare': ['your', 'next', 'like', 'uhhuh', 'what?', 'done', 'uhuh', 'hold', 'you', 'u', "you're", 'sure', 'ur', 'youare'],
+              'your': ['uhuh', 'youare', 'uhhuh', 'your', 'next', 'ur', 'sure', 'u', "you're", 'you', 'what?', 'hold', 'like', 'done'],
+              "you're": ['you', "you're", 'ur', 'next', 'uhuh', 'youare', 'u', 'your', 'what?', 'uhhuh', 'sure', 'done', 'like', 'hold'],
+              'ur': ['done', 'u', 'ur', 'uhhuh', 'what?', 'sure', 'your', 'hold', "you're", 'like', 'next', 'uhuh', 'youare', 'you'],
+              'u': ['uhhuh', 'sure', 'next', 'what?', "you're", 'ur', 'uhuh', 'done', 'u', 'you', 'like', 'hold', 'youare', 'your'],
+              'uhhuh': ['uhhuh', 'your', 'youare', 'you', 'done', 'hold', 'uhuh', 'next', 'sure', 'like', "you're", 'ur', 'u', 'what?'],
+              'uhuh': ['ur', 'u', 'youare', "you're", 'next', 'uhuh', 'done', 'you', 'uhhuh', 'like', 'your', 'sure', 'hold', 'what?'],
+              'what?': ['you', 'hold', "you're", 'your', 'u', 'done', 'uhuh', 'like', 'youare', 'uhhuh', 'ur', 'next', 'what?', 'sure'],
+              'done': ['sure', 'uhhuh', 'next', 'what?', 'your', 'ur', "you're", 'hold', 'like', 'you', 'u', 'youare', 'uhuh', 'done'],
+              'next': ['what?', 'uhhuh', 'uhuh', 'your', 'hold', 'sure', 'next', 'like', 'done', 'youare', 'ur', "you're", 'u', 'you'],
+              'hold': ['youare', 'u', 'done', 'uhuh', 'you', 'ur', 'sure', 'what?', "you're", 'next', 'hold', 'uhhuh', 'your', 'like'],
+              'sure': ['youare', 'done', 'like', "you're", 'you', 'hold', 'uhhuh', 'ur', 'sure', 'u', 'what?', 'next', 'your', 'uhuh'],
+              'like': ["you're", 'next', 'u', 'ur', 'hold', 'done', 'uhuh', 'what?', 'uhhuh', 'you', 'like', 'sure', 'youare', 'your']}
+
+# Who's on First: rank of every option in the priority list of a label,
+# built by won_ranks on first use
+WON_RANKS = None
+
+# Keypad: the symbol columns of the manual (see KEYPAD_HELP)
+KEYPAD_COLUMNS = [["lp", "tr", "l",  "sh", "cy", "h",  "rc"],
+                  ["e",  "lp", "rc", "lo", "s",  "h",  "q"],
+                  ["co", "w",  "lo", "zh", "r",  "l",  "s"],
+                  ["b",  "p",  "so", "cy", "zh", "q",  "t"],
+                  ["ps", "t",  "so", "c",  "p",  "ks", "bs"],
+                  ["b",  "e",  "pz", "ae", "ps", "i",  "o"]]
+
+# Complicated Keypad: the symbol columns (see COMPLICATED_KEYPAD_HELP)
+COMPLICATED_KEYPAD_COLUMNS = [["a", "e", "th", "ps", "m", "x", "z", "s", "b", "bd"],
+                              ["p", "a", "z", "o", "d", "g", "n", "ho", "ma", "ck"],
+                              ["ph", "ck", "o", "g", "th", "b", "e", "p", "ha", "bd"],
+                              ["ha", "ho", "ph", "e", "m", "o", "a", "s", "ck", "up"],
+                              ["g", "o", "m", "d", "up", "le", "x", "a", "n", "b"]]
+
+# Simon Says: color to press by the flashing color, by the amount of strikes,
+# if the serial number has a vowel
+SIMON_VOWEL = {0: {"red": "blue",
+                   "blue": "red",
+                   "green": "yellow",
+                   "yellow": "green"},
+               1: {"red": "yellow",
+                   "blue": "green",
+                   "green": "blue",
+                   "yellow": "red"},
+               2: {"red": "green",
+                   "blue": "red",
+                   "green": "yellow",
+                   "yellow": "blue"}}
+
+# Simon Says: the same if it has no vowel
+SIMON_NO_VOWEL = {0: {"red": "blue",
+                      "blue": "yellow",
+                      "green": "green",
+                      "yellow": "red"},
+                  1: {"red": "red",
+                      "blue": "blue",
+                      "green": "yellow",
+                      "yellow": "green"},
+                  2: {"red": "yellow",
+                      "blue": "green",
+                      "green": "blue",
+                      "yellow": "red"}}
+
+# Button: the digit to release on by the color of the strip
+BUTTON_RELEASE = {"blue": 4, "white": 1, "yellow": 5}
 
 ##### ^   LONG CONSTS   ^
 
@@ -93,10 +192,98 @@ class GameState:
         self.odd = False
         self.even = False
         self.vowel = False
+        self.profile = None
+
+class KeypadEngine:
+    """Orders the buttons of a keypad by the one column holding all their symbols.
+
+    Every symbol has a bitmask of the columns it is in, so the columns
+    holding all buttons are the AND of their masks. Every column has a map
+    of symbol to position, the order is a sort of the buttons by it.
+    """
 
-def log(msg):
-    if LOG:
-        print(f"LOG {datetime.datetime.utcnow()}: {msg}")
+    def __init__(self, columns):
+        self.columns = columns
+        self.masks = {}
+        for number, column in enumerate(columns):
+            for symbol in column:
+                self.masks[symbol] = self.masks.get(symbol, 0) | 1 << number
+        self.ranks = [{symbol: rank for rank, symbol in enumerate(column)}
+                      for column in columns]
+
+    def solve(self, options):
+        """Orders the buttons.
+
+        Arguments:
+        options (list of str): The symbols of the buttons, in button order.
+
+        Outputs:
+        list of str, the button numbers (from 1) in the order to press them
+
+        Throws:
+        MalformedInput if a symbol is unknown, no column holds all symbols
+        or the columns holding them give different orders
+        """
+
+        mask = (1 << len(self.columns)) - 1
+        for symbol in options:
+            if symbol not in self.masks:
+                raise MalformedInput(f"Unknown keypad symbol {symbol}")
+            mask &= self.masks[symbol]
+        if not mask:
+            raise MalformedInput(f"No keypad column has all of {' '.join(options)}")
+
+        order = None
+        for number, ranks in enumerate(self.ranks):
+            if not mask >> number & 1:
+                continue
+            column_order = sorted(range(len(options)), key=lambda i: ranks[options[i]])
+            if order is not None and column_order != order:
+                raise MalformedInput(f"Keypad symbols {' '.join(options)} "
+                                     "fit several columns, enter more of them")
+            order = column_order
+        return [str(i+1) for i in order]
+
+# built on first use, like EVENTS and WON_RANKS, to keep the start of the GUI fast
+KEYPAD = None
+COMPLICATED_KEYPAD = None
+
+def keypad_engines():
+    """The KeypadEngine of the keypad and of the complicated keypad."""
+
+    global KEYPAD, COMPLICATED_KEYPAD
+    if KEYPAD is None:
+        KEYPAD = KeypadEngine(KEYPAD_COLUMNS)
+        COMPLICATED_KEYPAD = KeypadEngine(COMPLICATED_KEYPAD_COLUMNS)
+    return KEYPAD, COMPLICATED_KEYPAD
+
+def won_ranks():
+    """WON_RANKS, built on first use."""
+
+    global WON_RANKS
+    if WON_RANKS is None:
+        WON_RANKS = {label: {option: rank for rank, option in enumerate(order)}
+                     for label, order in WON_CHOOSE.items()}
+    return WON_RANKS
+
+EVENTS = None
+
+def events():
+    """The event log of the solver (eventlog.EventLog), created on first use."""
+
+    global EVENTS
+    if EVENTS is None:
+        import eventlog
+        EVENTS = eventlog.EventLog(level=eventlog.LEVELS[LOG_LEVEL])
+    return EVENTS
+
+def log(msg, level=None, **fields):
+    """Logs an event, at eventlog.INFO unless another level is given."""
+
+    if level is None:
+        events().event(msg, **fields)
+    else:
+        events().event(msg, level, **fields)
 
 def parse_wire_module(wires, state):
     """Parses the wires and outputs the index of the wire to cut.
@@ -118,58 +305,25 @@ def parse_wire_module(wires, state):
     Page 5, On the Subject of Wires
     """
 
-    def last_occurence(value, iterable):
-        return max(loc for loc, val in enumerate(iterable) if val == value) + 1
-
-    if len(wires) == 3:  # 3 wires:
-        if "red" not in wires:  # If there are no red wires,
-            return 2            # cut the second wire.
-        elif wires[-1] == "white":  # Otherwise, if the last wire is white,
-            return 3                # cut the last wire.
-        elif wires.count("blue") > 1:             # Otherwise, if there is more than one blue wire,
-            return last_occurence("blue", wires)  # cut the last blue wire.
-        else:         # Otherwise,
-            return 3  # cut the last wire.
-    elif len(wires) == 4:  # 4 wires:
-        if wires.count("red") > 1 and state.odd:  # If there is more than one red wire and the last
-                                                  # digit of the serial number is odd, 
-            return last_occurence("red", wires)   # cut the last red wire.
-        elif wires[-1] == "yellow" and "red" not in wires: # Otherwise, if the last wire is yellow
-                                                           # and there are no red wires,
-            return 1                                       # cut the first wire.
-        elif wires.count("blue") == 1:  # Otherwise, if there is exactly one blue wire,
-            return 1                    # cut the first wire.
-        elif wires.count("yellow") > 1:  # Otherwise, if there is more than one yellow wire,
-            return 4                     # cut the last wire.
-        else:         # Otherwise,
-            return 2  # cut the second wire.
-    elif len(wires) == 5:  # 5 wires:
-        if wires[-1] == "black" and state.odd:  # If the last wire is black and the last digit of
-                                                # the serial number is odd,
-            return 4                            # cut the fourth wire.
-        elif (wires.count("red") == 1 and  # Otherwise, if there is exactly one red wire and
-              wires.count("yellow") > 1):  # there is more than one yellow wire,
-            return 1                       # cut the first wire.
-        elif "black" not in wires:  # Otherwise, if there are no black wires,
-            return 2                # cut the second wire.
-        else:         # Otherwise,
-            return 1  # cut the first wire.
-    elif len(wires) == 6:  # 6 wires:
-        if "yellow" not in wires and state.odd:  # If there are no yellow wires and the last digit
-                                                 # of the serial number is odd,
-            return 3                             # cut the third wire.
-        elif (wires.count("yellow") == 1 and  # Otherwise, if there is exactly one yellow wire and
-              wires.count("white") > 1):      # there is more than one white wire,
-            return 4                          # cut the fourth wire.
-        elif "red" not in wires:  # Otherwise, if there are no red wires,
-            return 6              # cut the last wire.
-        else:         # Otherwise,
-            return 4  # cut the fourth wire.
-    else:
+    profile = get_profile(state)
+    solve = profile["wires"].get(len(wires))
+    if solve is None:
         raise MalformedInput(
             "Simple Wires module can only contain 3-6 wires, got {} instead".format(
                 len(wires)))
 
+    table = profile["wire tables"][len(wires)]
+    if table is not None:
+        index = 0
+        for wire in wires:
+            color = profile["wire index"].get(wire)
+            if color is None:
+                break
+            index = index * 5 + color
+        else:
+            return table[index]
+    return solve(wires)
+
 def parse_button_module_initial(color, text, state):
     """Parses the button module based on the information available on the first overlook.
 
@@ -191,101 +345,24 @@ def parse_button_module_initial(color, text, state):
     Page 6, On the Subject of The Button
     """
 
-    if color == "blue" and text == "abort":  # 1. If the button is blue and the button says "Abort",
-        return False                         # hold the button.
-    elif state.battery > 1 and text == "detonate":  # 2. If there is more than 1 battery on the bomb
-                                                    # and the button says "Detonate",
-        return True                                 # press and immediately release the button.
-    elif color == "white" and state.lit.get("CAR"):  # 3. If the button is white and there is a lit
-                                                     # indicator with label CAR,
-        return False                                 # hold the button.
-    elif state.battery > 2 and state.lit.get("FRK"):  # 4. If there are more than 2 batteries on the
-                                                      # bomb and a lit indicator with label FRK
-        return True                                   # press and immediately release the button.
-    elif color == "yellow":  # 5. If the button is yellow,
-        return False         # hold the button.
-    elif color == "red" and text == "hold":  # 6. If the button is red and the button says "Hold",
-        return True                          # press and immediately release the button.
-    else:             # 7. If none of the above apply,
-        return False  # hold the button.
+    profile = get_profile(state)
+    press = profile["button"].get((color, text))
+    if press is None:
+        press = profile["button rules"]((color, text))
+    return press
 
 def parse_button_module_final(color, state):
 
-
-    if color == "blue":
-        return 4
-    elif color == "white":
-        return 1
-    elif color == "yellow":
-        return 5
-    else:
-        return 1
+    return BUTTON_RELEASE.get(color, 1)
 
 def parse_keypad_module(options, state):
 
-
-    columns = [["lp", "tr", "l",  "sh", "cy", "h",  "rc"],
-               ["e",  "lp", "rc", "lo", "s",  "h",  "q"],
-               ["co", "w",  "lo", "zh", "r",  "l",  "s"],
-               ["b",  "p",  "so", "cy", "zh", "q",  "t"],
-               ["ps", "t",  "so", "c",  "p",  "ks", "bs"],
-               ["b",  "e",  "pz", "ae", "ps", "i",  "o"]]
-
-    for i in columns:
-        for j in options:
-            if j not in i:
-                break
-        else:
-            correct = i
-            break
-
-    order = []
-
-    for i in correct:
-        for j in options:
-            if i == j:
-                order.append(str(options.index(j)+1))
-
-    return order
+    return keypad_engines()[0].solve(options)
 
 def parse_simon_says_module(sequence, state):
 
-
-    vowel = {0: {"red": "blue",
-                 "blue": "red",
-                 "green": "yellow",
-                 "yellow": "green"},
-             1: {"red": "yellow",
-                 "blue": "green",
-                 "green": "blue",
-                 "yellow": "red"},
-             2: {"red": "green",
-                 "blue": "red",
-                 "green": "yellow",
-                 "yellow": "blue"}}
-
-    no_vowel = {0: {"red": "blue",
-                    "blue": "yellow",
-                    "green": "green",
-                    "yellow": "red"},
-                1: {"red": "red",
-                    "blue": "blue",
-                    "green": "yellow",
-                    "yellow": "green"},
-                2: {"red": "yellow",
-                    "blue": "green",
-                    "green": "blue",
-                    "yellow": "red"}}
-
-    replaced = []
-    if state.vowel:
-        for i in sequence:
-            replaced.append(vowel[state.strike][i])
-    else:
-        for i in sequence:
-            replaced.append(no_vowel[state.strike][i])
-
-    return replaced
+    colors = get_profile(state)["simon"]
+    return [colors[i] for i in sequence]
 
 def parse_memory_module(stage, label, options, memory, state):
 
@@ -311,8 +388,8 @@ def parse_memory_module(stage, label, options, memory, state):
          3: memory.get(4, [0,0])[0],
          4: memory.get(3, [0,0])[0]}]
 
-    print(stage)
-    print(state.memory)
+    import eventlog
+    log("Memory module", eventlog.DEBUG, stage=stage, memory=dict(state.memory))
     target_label = stages[stage-1][label]
     target_pos = options.index(target_label)+1
 
@@ -324,64 +401,15 @@ def parse_memory_module(stage, label, options, memory, state):
          
 def parse_won_module(label, options, state):
 
-    read = {"yes": 2, "first": 1, "display": 5, "okay": 1, "says": 5, "nothing": 2, "-": 4,
-            "blank": 3, "no": 5, "led": 2, "lead": 5, "read": 3, "red": 3, "reed": 4, "leed": 4,
-            "holdon": 5, "you": 3, "youare": 5, "your": 3, "you're": 3, "ur": 0, "there": 5,
-            "they're": 4, "their": 3, "theyare": 2, "see": 5, "c": 1, "cee": 5}
-
-    choose = {'ready': ['yes', 'okay', 'what', 'middle', 'left', 'press', 'right', 'blank', 'ready', 'no', 'first', 'uhhh', 'nothing', 'wait'],
-              'first': ['left', 'okay', 'yes', 'middle', 'no', 'right', 'nothing', 'uhhh', 'wait', 'ready', 'blank', 'what', 'press', 'first'],
-              'no': ['blank', 'uhhh', 'wait', 'first', 'what', 'ready', 'right', 'yes', 'nothing', 'left', 'press', 'okay', 'no', 'middle'],
-              'blank': ['wait', 'right', 'okay', 'middle', 'blank', 'press', 'ready', 'nothing', 'no', 'what', 'left', 'uhhh', 'yes', 'first'],
-              'nothing': ['uhhh', 'right', 'okay', 'middle', 'yes', 'blank', 'no', 'press', 'left', 'what', 'wait', 'first', 'nothing', 'ready'],
-              'yes': ['okay', 'right', 'uhhh', 'middle', 'first', 'what', 'press', 'ready', 'nothing', 'yes', 'left', 'blank', 'no', 'wait'],
-              'what': ['uhhh', 'what', 'left', 'nothing', 'ready', 'blank', 'middle', 'no', 'okay', 'first', 'wait', 'yes', 'press', 'right'],
-              'uhhh': ['ready', 'nothing', 'left', 'what', 'okay', 'yes', 'right', 'no', 'press', 'blank', 'uhhh', 'middle', 'wait', 'first'],
-              'left': ['right', 'left', 'first', 'no', 'middle', 'yes', 'blank', 'what', 'uhhh', 'wait', 'press', 'ready', 'okay', 'nothing'],
-              'right': ['yes', 'nothing', 'ready', 'press', 'no', 'wait', 'what', 'right', 'middle', 'left', 'uhhh', 'blank', 'okay', 'first'],
-              'middle': ['blank', 'ready', 'okay', 'what', 'nothing', 'press', 'no', 'wait', 'left', 'middle', 'right', 'first', 'uhhh', 'yes'],
-              'okay': ['middle', 'no', 'first', 'yes', 'uhhh', 'nothing', 'wait', 'okay', 'left', 'ready', 'blank', 'press', 'what', 'right'],
-              'wait': ['uhhh', 'no', 'blank', 'okay', 'yes', 'left', 'first', 'press', 'what', 'wait', 'nothing', 'ready', 'right', 'middle'],
-              'press': ['right', 'middle', 'yes', 'ready', 'press', 'okay', 'nothing', 'uhhh', 'blank', 'left', 'first', 'what', 'no', 'wait'],
-              'you': ['sure', 'youare', 'your', "you're", 'next', 'uhhuh', 'ur', 'hold', 'what?', 'you', 'uhuh', 'like', 'done', 'u'],
-              'youare': ['your', 'next', 'like', 'uhhuh', 'what?', 'done', 'uhuh', 'hold', 'you', 'u', "you're", 'sure', 'ur', 'youare'],
-              'your': ['uhuh', 'youare', 'uhhuh', 'your', 'next', 'ur', 'sure', 'u', "you're", 'you', 'what?', 'hold', 'like', 'done'],
-              "you're": ['you', "you're", 'ur', 'next', 'uhuh', 'youare', 'u', 'your', 'what?', 'uhhuh', 'sure', 'done', 'like', 'hold'],
-              'ur': ['done', 'u', 'ur', 'uhhuh', 'what?', 'sure', 'your', 'hold', "you're", 'like', 'next', 'uhuh', 'youare', 'you'],
-              'u': ['uhhuh', 'sure', 'next', 'what?', "you're", 'ur', 'uhuh', 'done', 'u', 'you', 'like', 'hold', 'youare', 'your'],
-              'uhhuh': ['uhhuh', 'your', 'youare', 'you', 'done', 'hold', 'uhuh', 'next', 'sure', 'like', "you're", 'ur', 'u', 'what?'],
-              'uhuh': ['ur', 'u', 'youare', "you're", 'next', 'uhuh', 'done', 'you', 'uhhuh', 'like', 'your', 'sure', 'hold', 'what?'],
-              'what?': ['you', 'hold', "you're", 'your', 'u', 'done', 'uhuh', 'like', 'youare', 'uhhuh', 'ur', 'next', 'what?', 'sure'],
-              'done': ['sure', 'uhhuh', 'next', 'what?', 'your', 'ur', "you're", 'hold', 'like', 'you', 'u', 'youare', 'uhuh', 'done'],
-              'next': ['what?', 'uhhuh', 'uhuh', 'your', 'hold', 'sure', 'next', 'like', 'done', 'youare', 'ur', "you're", 'u', 'you'],
-              'hold': ['youare', 'u', 'done', 'uhuh', 'you', 'ur', 'sure', 'what?', "you're", 'next', 'hold', 'uhhuh', 'your', 'like'],
-              'sure': ['youare', 'done', 'like', "you're", 'you', 'hold', 'uhhuh', 'ur', 'sure', 'u', 'what?', 'next', 'your', 'uhuh'],
-              'like': ["you're", 'next', 'u', 'ur', 'hold', 'done', 'uhuh', 'what?', 'uhhuh', 'you', 'like', 'sure', 'youare', 'your']}
-
-    order = choose[options[read[label]]]
-    correct = []
-    for i in order:
-        for j in options:
-            if i == j:
-                return j
+    ranks = (WON_RANKS or won_ranks())[options[WON_READ[label]]]
+    correct = min(options, key=lambda option: ranks.get(option, len(ranks)))
+    if correct in ranks:
+        return correct
 
 def parse_comp_wires_module(wires, state):
 
-    solved = []
-    for i in wires:
-        i = ''.join(sorted(i))
-        solution = COMPLICATED_WIRES_DIAGRAM[i]
-        if solution == 2:
-            solution = state.even
-        elif solution == 3:
-            solution = state.ind.get("PARALLEL", False)
-        elif solution == 4:
-            solution = (state.battery > 1)
-        else:
-            solution = bool(solution)
-        solved.append(solution)
-
-    return solved
+    cut = get_profile(state)["comp wires"]
+    return [cut[''.join(sorted(i))] for i in wires]
 
 def parse_modded_complex_keypad_initial(state):
 
@@ -392,37 +420,43 @@ def parse_modded_complex_keypad_initial(state):
     return False
 
 def parse_modded_complex_keypad_module(options, reverse, state):
-    
-    columns = [["a", "e", "th", "ps", "m", "x", "z", "s", "b", "bd"],
-               ["p", "a", "z", "o", "d", "g", "n", "ho", "ma", "ck"],
-               ["ph", "ck", "o", "g", "th", "b", "e", "p", "ha", "bd"],
-               ["ha", "ho", "ph", "e", "m", "o", "a", "s", "ck", "up"],
-               ["g", "o", "m", "d", "up", "le", "x", "a", "n", "b"]]
-
-    for i in columns:
-        for j in options:
-            if j not in i:
-                break
-        else:
-            correct = i
-            break
-
-    order = []
-
-    for i in correct:
-        for j in options:
-            if i == j:
-                order.append(str(options.index(j)+1))
 
+    order = keypad_engines()[1].solve(options)
     if reverse:
-        order = reversed(order)
+        order.reverse()
     return order
 
 def parse_modded_caesar_cipher_module(letters, state):
 
-    converted = ""
-    letters = letters.upper()
-    
+    return letters.upper().translate(get_profile(state)["caesar"])
+
+def table_answers(name, state):
+    """Row of answers of a table generated by generate_tables.py, indexed by input number.
+
+    None if tables.py is missing or outdated, the rules have to be used then.
+    """
+
+    try:
+        import tables
+    except ImportError:
+        return None
+    return tables.answers(name, state)
+
+def compile_profile(state):
+    """Precomputes the answers of the modules that depend on the game state.
+
+    Must be called again whenever the game state changes (setup_state and
+    strikes do), the parse_* functions only look the answers up.
+
+    Arguments:
+    state (GameState object): Current game state, its profile is replaced.
+
+    Outputs:
+    dict, the new profile
+    """
+
+    import rules
+
     offset = 0
     offset -= 1 * state.vowel
     offset += state.battery
@@ -430,73 +464,446 @@ def parse_modded_caesar_cipher_module(letters, state):
     offset += 1 * state.ind.get("CAR", False)
     if state.ind.get("PARALLEL") and state.lit.get("NSA"):
         offset = 0
+    caesar = {}
+    for letter in range(ord("A"), ord("Z") + 1):
+        shifted = letter + offset
+        shifted = shifted + 26 if shifted < 65 else shifted
+        shifted = shifted - 26 if shifted > 90 else shifted
+        caesar[letter] = shifted
+
+    button = rules.compile_rules(rules.BUTTON, state)
+    buttons = [(color, text) for color in rules.BUTTON_COLORS
+               for text in rules.BUTTON_TEXTS]
+    button_answers = table_answers("button", state)
+    if button_answers is None:
+        button_answers = [button(i) for i in buttons]
+
+    codes = sorted(rules.COMPLICATED_WIRES)
+    comp_wires = table_answers("complicated wires", state)
+    if comp_wires is None:
+        comp_wires = [rules.compile_rules(rules.COMPLICATED_WIRES[code], state)(None)
+                      for code in codes]
+
+    simon = SIMON_VOWEL if state.vowel else SIMON_NO_VOWEL
+    state.profile = {
+        "wires": {amount: rules.compile_rules(table, state)
+                  for amount, table in rules.WIRES.items()},
+        "wire tables": {amount: table_answers(f"wires {amount}", state)
+                        for amount in rules.WIRES},
+        # index of every color in the generated tables (see tables.py)
+        "wire index": {color: index for index, color in enumerate(rules.WIRE_COLORS)},
+        "button": {i: bool(j) for i, j in zip(buttons, button_answers)},
+        "button rules": button,
+        "comp wires": {i: bool(j) for i, j in zip(codes, comp_wires)},
+        "caesar": caesar,
+        "simon": simon.get(state.strike, {}),
+    }
+    return state.profile
+
+def get_profile(state):
+    """The profile of the game state, compiled if it has none yet."""
+
+    if state.profile is None:
+        compile_profile(state)
+    return state.profile
+
+def setup_state(battery=0, holder=0, indicators=(), lit=(), serial=None):
+    """Creates the game state of a new bomb.
 
-    for letter in letters:
-        letter = ord(letter) + offset
-        letter = letter + 26 if letter < 65 else letter
-        letter = letter - 26 if letter > 90 else letter
-        letter = chr(letter)
-        converted += letter
+    Arguments:
+    battery (int or str): Amount of batteries.
+    holder (int or str): Amount of battery holders.
+    indicators (iterable of str): Labels of the indicators on the bomb.
+    lit (iterable of str): Labels of the lit indicators.
+    serial (str): Serial number, "a0" if not given.
 
-    return converted
-    
+    Outputs:
+    GameState object
 
-def run_gui_mode():
-    playing = True
-    while playing:
-        state = GameState()
-        bat_hold = easygui.enterbox(msg=('Amount of batteries and holders, '
-                                         'seperated by a space'), title='Setup')
-        if not bat_hold:
-            state.battery = 0
-            state.holder = 0
-        else:
-            state.battery, state.holder = bat_hold.split()
-        log("SETUP Batteries: " + str(state.battery))
-        log("SETUP Holders: " + str(state.holder))
-
-        valid_lit = ("FRK", "CAR", "BOB", "NSA")
-        valid_ind = valid_lit + ("", "PARALLEL", "DVI-D")
-        indicators = easygui.multchoicebox(msg='Indicators', title='Setup',
-                                           choices=valid_ind, preselect=len(valid_lit))
-        if not indicators:
-            indicators = {}
-            state.ind = indicators
-        indicators = [i for i in indicators if i != ""]
-        for i in indicators:
+    Throws:
+    MalformedInput if a lit indicator is not on the bomb or the serial
+    number does not end with a digit
+    """
+
+    state = GameState()
+    state.battery = int(battery)
+    state.holder = int(holder)
+    log("SETUP Batteries: " + str(state.battery))
+    log("SETUP Holders: " + str(state.holder))
+
+    for i in indicators:
+        if i:
             state.ind[i] = True
-        log("SETUP Indicators: " + " ".join(state.ind.keys()))
+    log("SETUP Indicators: " + " ".join(state.ind.keys()))
+    for i in lit:
+        if not i:
+            continue
+        if i not in state.ind:
+            raise MalformedInput(f"Lit indicator {i} is not on the bomb")
+        state.lit[i] = True
+
+    state.code = (serial or "a0").upper()
+    log("SETUP Serial Number: " + state.code)
+    if not state.code[-1].isdigit():
+        raise MalformedInput(f"Serial number {state.code} does not end with a digit")
+    state.odd = bool(int(state.code[-1]) % 2 == 1)
+    state.even = not state.odd
+    state.vowel = any(i in state.code for i in "AEIOU")
+    state.play = "waiting"
+    compile_profile(state)
+    return state
+
+##### V   HEADLESS MODE   V
+
+def solve_wires(args, state):
+    result = parse_wire_module(args, state)
+    return f"Cut the {ORDINALS[result]} wire! ({args[result-1]})"
+
+def solve_button(args, state):
+    if len(args) != 2:
+        raise MalformedInput("Button needs a color and a text")
+    if parse_button_module_initial(*args, state):
+        return "Press and release!"
+    return "Hold and report color!"
+
+def solve_button_release(args, state):
+    return f"Release on {parse_button_module_final(args[0], state)}"
+
+def solve_keypad(args, state):
+    if args == ["?"]:
+        return KEYPAD_HELP
+    return f"Order: {', '.join(parse_keypad_module(args, state))}"
+
+def solve_simon_says(args, state):
+    if args and args[0] == "!":
+        args = state.memory.get("simon", []) + args[1:]
+    result = parse_simon_says_module(args, state)
+    state.memory["simon"] = args
+    return f"New order: {', '.join(result)}"
+
+def solve_memory(args, state):
+    if args == ["r"]:
+        state.memory["memory"] = {}
+        state.memory["memory stage"] = 1
+        return "Memory reset"
+    memory = state.memory.get("memory", {})
+    stage = state.memory.get("memory stage", 1)
+    args = [int(x) for x in args]
+    lab, pos, mem = parse_memory_module(stage, args[0], args[1:], memory, state)
+    state.memory["memory stage"] = 1 if stage == 5 else stage + 1
+    state.memory["memory"] = mem
+    return f"Press the button in position {pos} (label {lab})"
+
+def solve_maze(args, state):
+    import pathfinder  # the grid is only needed for mazes
+    argsint = [int(x) for x in args]
+    circle = " ".join(args[0:2])
+    matrix_id = MAZE_CIRCLES.get(circle, None)
+    if matrix_id is None:
+        raise MalformedInput(f"Maze circle {circle} is unknown")
+    result, maze = pathfinder.get_path(matrix_id, argsint[2:4], argsint[4:6])
+    return f"Path: {result}"
+
+def solve_won(args, state):
+    return f"Answer: {parse_won_module(args[0], args[1:], state)}"
+
+def solve_comp_wires(args, state):
+    result = parse_comp_wires_module(args, state)
+    return f"Cut: {' '.join(str(i+1) for i, j in enumerate(result) if j)}"
+
+def solve_complex_keypad(args, state):
+    order = parse_modded_complex_keypad_initial(state)
+    if order == 2:
+        return "Press the keypad in order, left to right, up to down."
+    if args == ["?"]:
+        return COMPLICATED_KEYPAD_HELP
+    result = parse_modded_complex_keypad_module(args, order, state)
+    return f"Order: {', '.join(result)}"
+
+def solve_caesar_cipher(args, state):
+    return f"Next text: {parse_modded_caesar_cipher_module(' '.join(args), state)}"
+
+def solve_strike(args, state):
+    state.strike += 1
+    compile_profile(state)
+    if state.strike == 3:
+        raise GameOver("Blew up due to 3 strikes")
+    return f"Strike {state.strike}"
+
+MODULES.update({
+    "wires": solve_wires,
+    "button": solve_button,
+    "release": solve_button_release,
+    "keypad": solve_keypad,
+    "simon": solve_simon_says,
+    "memory": solve_memory,
+    "maze": solve_maze,
+    "won": solve_won,
+    "compwires": solve_comp_wires,
+    "complexkeypad": solve_complex_keypad,
+    "caesar": solve_caesar_cipher,
+    "strike": solve_strike,
+})
+
+# setup lines of headless mode, by the setup_state argument they set
+SETUP_LINES = {"batteries": "battery", "indicators": "indicators",
+               "lit": "lit", "serial": "serial"}
+
+# modules whose answers change the game state
+STATEFUL_MODULES = ("simon", "memory", "strike")
+
+class HeadlessSession:
+    """The bomb of a headless run, solved one line at a time (see run_headless_mode).
+
+    Every line that was solved is appended to the journal, if there is one.
+    """
 
-        can_be_lit = list(set(valid_lit).intersection(indicators))
-        can_be_lit = [""] + can_be_lit
-        if len(can_be_lit) == 1:
-            state.lit = {}
-        else:
-            lit = easygui.multchoicebox(msg='Which of these are lit?', title='Setup',
-                                        choices=can_be_lit, preselect=0)
-            if not lit:
-                state.lit = {}
+    def __init__(self, journal=None):
+        self.journal = journal
+        self.setup = {}
+        self.setup_lines = {}
+        self.state = None
+        self.errors = 0
+        self.journaled = False  # the journal has a bomb line for this bomb
+
+    def begin(self):
+        """Starts a new bomb in the journal, with the setup so far."""
+
+        self.finish()
+        if self.journal:
+            self.journal.begin()
+            for line in self.setup_lines.values():
+                self.journal.record(line)
+        self.journaled = True
+
+    def finish(self, how="done"):
+        """Closes the bomb in the journal, so it is not offered to be resumed."""
+
+        if self.journal and self.journaled:
+            self.journal.end(how)
+        self.journaled = False
+
+    def solve(self, line):
+        """Solves one line.
+
+        Outputs:
+        str, the output line, None for lines without output
+
+        Throws:
+        GameOver if the bomb blew up, the session is ready for the next one
+        MalformedInput (or any error of the solver) if the line could not be solved
+        """
+
+        words = line.split()
+        if not words or words[0].startswith("#"):
+            return None
+        command, args = words[0].lower(), words[1:]
+        if command == "bomb":
+            self.finish()
+            self.setup = {}
+            self.setup_lines = {}
+            self.state = None
+            return None
+        elif command in SETUP_LINES:
+            if command == "batteries":
+                self.setup["battery"] = args[0] if args else 0
+                self.setup["holder"] = args[1] if len(args) > 1 else 0
+            elif command in ("indicators", "lit"):
+                self.setup[SETUP_LINES[command]] = [i.upper() for i in args]
             else:
-                for i in lit:
-                    if i == "":
-                        continue
-                    state.lit[i] = True
-        
-        serial_code = easygui.enterbox(msg="Serial Number", title='Setup')
-        if not serial_code:
-            serial_code = "a0"
-        state.code = serial_code.upper()
-        log("SETUP Serial Number: " + state.code)
-        state.odd = bool(int(state.code[-1]) % 2 == 1)
-        state.even = not state.odd
-        for i in "AEIOU":
-            if i in state.code:
-                state.vowel = True
-                break
-        else:
-            state.vowel = False
-        state.play = "waiting"
-        state.memory = {}
+                self.setup["serial"] = args[0] if args else None
+            self.setup_lines[command] = " ".join(words)
+            if self.journaled and self.state is None:
+                if self.journal:
+                    self.journal.record(self.setup_lines[command])
+            else:
+                # a changed setup is a new bomb
+                self.begin()
+            self.state = None
+            return None
+        elif command not in MODULES:
+            raise MalformedInput(f"Unknown module {command}")
+
+        if not self.journaled:
+            self.begin()
+        if self.state is None:
+            self.state = setup_state(**self.setup)
+        start = time.perf_counter()
+        try:
+            answer = MODULES[command](args, self.state)
+        except GameOver as e:
+            self.state = None
+            self.journaled = False
+            log("game over", module=command, reason=str(e))
+            if self.journal:
+                self.journal.record(" ".join(words), e)
+                self.journal.end("exploded")
+            raise
+        log("solve", module=command, inputs=args, outputs=answer,
+            latency=time.perf_counter() - start)
+        if self.journal:
+            self.journal.record(" ".join(words), answer)
+        return f"{command}: {answer}"
+
+    def feed(self, line):
+        """Solves one line, like solve, but errors are output lines as well.
+
+        Outputs:
+        str, the output line, None for lines without output
+        """
+
+        try:
+            return self.solve(line)
+        except GameOver as e:
+            return f"{line.split()[0].lower()}: game over: {e}"
+        except Exception as e:  # like the exceptionbox of the GUI
+            import eventlog
+            command, *args = line.split()
+            self.errors += 1
+            log("error", eventlog.ERROR, module=command.lower(), inputs=args, error=repr(e))
+            return f"{command.lower()}: error: {e!r}"
+
+def run_headless_mode(lines, out=sys.stdout, journal=None):
+    """Solves a bomb from text lines without any GUI.
+
+    Setup lines describe the bomb, every other line is a module name
+    (see MODULES) followed by its input, as typed into the GUI:
+
+        batteries 2 1
+        indicators FRK CAR
+        lit FRK
+        serial AB3DE4
+        wires red blue yellow
+        button red hold
+        release blue
+        simon ! green
+        strike
+
+    Changing the setup starts a new bomb, so does a "bomb" line. A bomb
+    is closed in the journal when the next one starts or the input ends.
+    Empty lines and lines starting with # are skipped.
+
+    Arguments:
+    lines (iterable of str): The input, e.g. an open file.
+    out (file object): Where the answers are written, one line per module
+    line ("<module>: <answer>" or "<module>: error: <message>").
+    journal (journal.Journal): Journal the solved lines are appended to.
+
+    Outputs:
+    int, amount of lines that could not be solved
+    """
+
+    session = HeadlessSession(journal)
+    for line in lines:
+        output = session.feed(line)
+        if output is not None:
+            out.write(output + "\n")
+    session.finish()
+    return session.errors
+
+def resume_bomb(path):
+    """Rebuilds the bomb that was being solved when the journal ended.
+
+    The journal is read backwards from its end to the last bomb, and only
+    the setup and the modules that change the game state are replayed, so
+    it takes milliseconds however long the journal has grown.
+
+    Arguments:
+    path (str): The journal file.
+
+    Outputs:
+    HeadlessSession of the bomb, None if the last bomb in the journal is over
+    """
+
+    import journal
+
+    lines = journal.last_bomb(journal.read_tail(path))
+    if lines is None:
+        return None
+    session = HeadlessSession()
+    for line in lines:
+        words = line.split()
+        if words and (words[0] in SETUP_LINES or words[0] in STATEFUL_MODULES):
+            session.feed(line)
+    if session.state is None and session.setup:
+        session.state = setup_state(**session.setup)
+    return session
+
+##### ^   HEADLESS MODE   ^
+
+def setup_lines(state):
+    """The headless setup lines of a bomb (see run_headless_mode)."""
+
+    return [f"batteries {state.battery} {state.holder}",
+            " ".join(["indicators"] + list(state.ind)),
+            " ".join(["lit"] + list(state.lit)),
+            f"serial {state.code}"]
+
+def setup_gui(easygui):
+    """Asks for the setup of a new bomb.
+
+    Outputs:
+    GameState object
+    """
+
+    bat_hold = easygui.enterbox(msg=('Amount of batteries and holders, '
+                                     'seperated by a space'), title='Setup')
+    battery, holder = bat_hold.split() if bat_hold else (0, 0)
+
+    valid_lit = ("FRK", "CAR", "BOB", "NSA")
+    valid_ind = valid_lit + ("", "PARALLEL", "DVI-D")
+    indicators = easygui.multchoicebox(msg='Indicators', title='Setup',
+                                       choices=valid_ind, preselect=len(valid_lit))
+    indicators = [i for i in indicators or [] if i != ""]
+
+    can_be_lit = list(set(valid_lit).intersection(indicators))
+    can_be_lit = [""] + can_be_lit
+    lit = []
+    if len(can_be_lit) > 1:
+        lit = easygui.multchoicebox(msg='Which of these are lit?', title='Setup',
+                                    choices=can_be_lit, preselect=0)
+
+    serial_code = easygui.enterbox(msg="Serial Number", title='Setup')
+    return setup_state(battery, holder, indicators, lit, serial_code)
+
+def run_gui_mode(journal=None):
+    """Solves bombs with dialogs.
+
+    Arguments:
+    journal (journal.Journal): Journal of the bombs, the last bomb is
+    offered to be resumed if it is not over yet.
+    """
+
+    # only the GUI needs easygui (and tkinter behind it)
+    import easygui
+
+    def record(line, answer=None):
+        if journal:
+            journal.record(line, answer)
+
+    def end(how):
+        if journal:
+            journal.end(how)
+
+    playing = True
+    while playing:
+        session = resume_bomb(journal.path) if journal else None
+        state = None
+        if session and session.state:
+            if easygui.ynbox(msg=("The last bomb is not over yet.\n"
+                                  f"{session.state.strike} strike(s), serial {session.state.code}\n"
+                                  "Resume it?"), title="Setup"):
+                state = session.state
+                log("Resumed bomb", strikes=state.strike, serial=state.code)
+            else:
+                end("abandoned")
+
+        if state is None:
+            state = setup_gui(easygui)
+            if journal:
+                journal.begin()
+                for line in setup_lines(state):
+                    record(line)
         lastchoice = 0
         info = ""
 
@@ -530,19 +937,24 @@ def run_gui_mode():
                 log("Chose: " + choice)
                 if choice == "[x]":
                     state.strike += 1
+                    compile_profile(state)
                     log("Got strike number " + str(state.strike))
+                    record("strike", f"Strike {state.strike}")
                     if state.strike == 3:
                         defusing = False
                         log("Game over. Blew up due to 3 strikes")
+                        end("exploded")
                         easygui.msgbox(msg="Not my fault", title="Game over")
                 elif choice == "[time ran out]":
                     defusing = False
                     log("Game over. Blew up due to no time remaining")
+                    end("time ran out")
                     easygui.msgbox(msg=(f"I thought you were supposed to be faster...\n"
                                         f"{state.strike} strike(s)!"), title="Game over")
                 elif choice == "[defused]":
                     defusing = False
                     log("Game over. Bomb was defused")
+                    end("defused")
                     easygui.msgbox(msg=f"Good job!\n{state.strike} strike(s)!", title="Game over")
 
                 if state.play == "waiting":
@@ -553,9 +965,8 @@ def run_gui_mode():
                         wires = wires.split()
                         result = parse_wire_module(wires, state)
                         log("Wires <<< " + str(result))
-                        ordinals = {1: "first", 2: "second", 3: "third",
-                                    4: "fourth", 5: "fifth", 6: "sixth"}
-                        info = f"Cut the {ordinals[result]} wire! ({wires[result-1]})\n"
+                        info = f"Cut the {ORDINALS[result]} wire! ({wires[result-1]})\n"
+                        record("wires " + " ".join(wires), info.strip())
                         
                     elif choice == "Button":
                         log("Button Module")
@@ -565,6 +976,8 @@ def run_gui_mode():
                         args = args.split()
                         result = parse_button_module_initial(*args, state)
                         log(f"Button (Initial) <<<: {result} (True if tap)")
+                        record("button " + " ".join(args),
+                               "Press and release!" if result else "Hold and report color!")
                         if result:
                             info = "Press and release!"
                         else:
@@ -574,6 +987,7 @@ def run_gui_mode():
                             result = parse_button_module_final(followup, state)
                             log("Button (Final) <<<: Release on " + str(result))
                             info = f"Release on {result}"
+                            record("release " + followup, info)
                     elif choice == "Keypad":
                         buttons = easygui.enterbox(msg="Keypad choices", title="Keypad Module")
                         log("Keypad >>>: " + buttons)
@@ -584,11 +998,13 @@ def run_gui_mode():
                             result = parse_keypad_module(buttons, state)
                             log("Keypad <<<: " + ', '.join(result))
                             info = f"Order: {', '.join(result)}"
+                            record("keypad " + " ".join(buttons), info)
                     elif choice == "Simon Says":
                         args = easygui.enterbox(msg=("Enter flashing color.\n"
                                                      "'!' is substituted with the last sequence"),
                                                 title="Simon Says Module")
                         log("Simon Says >>>: " + args)
+                        line = "simon " + args
                         args = args.split()
                         
                         if args[0] == "!":
@@ -600,6 +1016,7 @@ def run_gui_mode():
 
                         info = f"New order: {', '.join(result)}\n"
                         state.memory["simon"] = args
+                        record(line, info.strip())
                     elif choice == "Memory":
 
                         memory = state.memory.get("memory", {})
@@ -612,10 +1029,12 @@ def run_gui_mode():
                                                      "seperated by spaces.\nEnter 'r' to reset"),
                                                 title="Memory Module")
                         log("Memory >>>: " + args)
+                        line = "memory " + args
                         if args == "r":
                             log("Memory Reset!")
                             state.memory["memory"] = {}
                             state.memory["memory stage"] = 1
+                            record("memory r", "Memory reset")
                         else:
                             args = args.split()
                             args = [int(x) for x in args]
@@ -635,6 +1054,7 @@ def run_gui_mode():
                             state.memory["memory"] = mem
 
                             info = f"Press the button in position {pos} (label {lab})"
+                            record(line, info)
                     elif choice == "Maze":
                         args = easygui.enterbox(msg=("Enter a circle location, start location and "
                                                      "end location, seperated by spaces."),
@@ -645,29 +1065,21 @@ def run_gui_mode():
                         circle = " ".join(args[0:2])
                         start = argsint[2:4]
                         end = argsint[4:6]
-                        matrix_circles = { # TODO: Constant
-                            "1 2": 0, "6 3": 0,
-                            "2 4": 1, "5 2": 1,
-                            "4 4": 2, "6 4": 2,
-                            "1 1": 3, "1 4": 3,
-                            "5 3": 4, "4 6": 4,
-                            "5 1": 5, "3 5": 5,
-                            "2 1": 6, "2 6": 6,
-                            "4 1": 7, "3 4": 7,
-                            "3 2": 8, "1 5": 8}
-
-                        matrix_id = matrix_circles.get(circle, None)
+                        matrix_id = MAZE_CIRCLES.get(circle, None)
                         if matrix_id is None:
                             raise MalformedInput(f"Maze circle {circle} is unknown")
                         log("Maze Matrix ID >>>: " + str(matrix_id))
 
+                        import pathfinder  # the grid is only needed for mazes
                         result, maze = pathfinder.get_path(matrix_id, start, end)
                         log(f"Maze <<<: {result}\n{maze}")
                         info = f"Maze:\n{maze}\nPath: {result}"
+                        record("maze " + " ".join(args), f"Path: {result}")
                     elif choice == "Who's on First":
                         args = easygui.enterbox(msg="Enter label and options, seperated by spaces.",
                                                 title="Who's on First Module")
                         log(f"Who's on First >>>: " + args)
+                        line = "won " + args
                         args = args.split()
                         label = args[0]
                         args = args[1:]
@@ -675,6 +1087,7 @@ def run_gui_mode():
                         result = parse_won_module(label, args, state)
                         log(f"Who's on First <<<: " + result)
                         info = f"Answer: {result}"
+                        record(line, info)
                                                 
                     elif choice == "Complicated Wires":
                         args = easygui.enterbox(msg=("Enter wires seperated by spaces.\n"
@@ -687,6 +1100,7 @@ def run_gui_mode():
                         log("Complicated Wires <<<: " + str(result))
                         result = [str(i+1) for i, j in enumerate(result) if j]
                         info = f"Cut: {' '.join(result)}"
+                        record("compwires " + " ".join(args), info)
 
                     elif choice == "Complex Keypad":
                         order = parse_modded_complex_keypad_initial(state)
@@ -696,6 +1110,8 @@ def run_gui_mode():
                             easygui.msgbox(msg=(f"Press the keypad in order, "
                                                 "left to right, up to down."),
                                            title="Complicated Keypad Module")
+                            record("complexkeypad",
+                                   "Press the keypad in order, left to right, up to down.")
                         else:
                             buttons = easygui.enterbox(msg="Keypad choices",
                                                        title="Complicated Keypad Module")
@@ -709,15 +1125,64 @@ def run_gui_mode():
                                     buttons, order, state)
                                 log("Complex Keypad <<<: " + ', '.join(result))
                                 info = f"Order: {', '.join(result)}"
+                                record("complexkeypad " + " ".join(buttons), info)
                     elif choice == "Caesar Cipher":
                         text = easygui.enterbox(msg="Enter original message",
                                                 title="Caesar Cipher Module")
                         text = text.upper()
                         result = parse_modded_caesar_cipher_module(text, state)
                         info = f"Next text: {result}"
+                        record("caesar " + text, info)
             except KeyboardInterrupt:
                 sys.exit(1)
             except:
-                easygui.exceptionbox(msg=aboutbomb)
+                import eventlog
+                log("error", eventlog.ERROR, error=repr(sys.exc_info()[1]))
+                easygui.exceptionbox(msg=f"{aboutbomb}\n\nRecent events:\n{events().dump()}")
+
+def main():
+    import argparse
+
+    import eventlog
+
+    parser = argparse.ArgumentParser(description="Keep Talking and Nobody Explodes solver")
+    parser.add_argument("--headless", nargs="?", const="-", metavar="FILE",
+                        help="solve bombs described in FILE (or stdin) without a GUI")
+    parser.add_argument("--log-level", choices=eventlog.LEVELS,
+                        help=("events written to stderr (default: info, "
+                              "off in headless mode)"))
+    parser.add_argument("--journal", metavar="FILE",
+                        help=(f"journal to resume crashed bombs from (default: {JOURNAL_PATH}, "
+                              "none in headless mode, '' turns it off)"))
+    args = parser.parse_args()
+
+    if args.log_level:
+        events().level = eventlog.LEVELS[args.log_level]
+    if args.headless is None:
+        path = JOURNAL_PATH if args.journal is None else args.journal
+    else:
+        path = args.journal
+        if not args.log_level:
+            events().level = eventlog.OFF
+
+    journal = None
+    if path:
+        import journal as journal_module
+        journal = journal_module.Journal(path)
+    try:
+        if args.headless is None:
+            run_gui_mode(journal)
+            return
+        if args.headless == "-":
+            errors = run_headless_mode(sys.stdin, journal=journal)
+        else:
+            with open(args.headless) as f:
+                errors = run_headless_mode(f, journal=journal)
+    finally:
+        if journal:
+            journal.close()
+    sys.exit(1 if errors else 0)
+
 
-run_gui_mode()
+if __name__ == "__main__":
+    main()
@@ -130,8 +130,14 @@ matrixes = [
         ],
     ]
 
+# the searches only read the grids, so every maze is built once and its
+# rendered walls are kept by grid_str
+grids = {}
+
 def get_path(matrix_id, s, e):
-    grid = Grid(matrix=matrixes[matrix_id])
+    grid = grids.get(matrix_id)
+    if grid is None:
+        grid = grids[matrix_id] = Grid(matrix=matrixes[matrix_id])
 
     s = [x*2-1 for x in s]
     e = [x*2-1 for x in e]
@@ -143,7 +149,7 @@ def get_path(matrix_id, s, e):
     path, runs = finder.find_path(start, end, grid)
 
     #print('operations:', runs, 'path length:', len(path))
-    rep = grid.grid_str(path=path, start=start, end=end)
+    rep = grid.grid_str(path=path, start=start, end=end, cache=True)
     path2 = [j for i, j in enumerate(path+[e]) if i % 2 == 0]
     #print(path2)
     path3 = []
@@ -0,0 +1,180 @@
+"""Rules of the manual pages as data, and a compiler specialising them on a bomb.
+
+A rule table is a list of (conditions, answer) pairs in the order of the
+manual. The answer of the first rule whose conditions all hold is the
+answer of the module. Conditions are tuples:
+
+    ("serial odd",)          the last digit of the serial number is odd
+    ("serial even",)         the last digit of the serial number is even
+    ("batteries over", n)    there are more than n batteries on the bomb
+    ("indicator", label)     there is an indicator with the label
+    ("lit", label)           there is a lit indicator with the label
+    ("count", color, op, n)  the amount of wires of the color, compared
+                             with n by op ("==" or ">")
+    ("last", color)          the last wire is of the color
+    ("color", color)         the button is of the color
+    ("text", text)           the button says the text
+
+An answer is the answer itself, or ("last", color) for the position of
+the last wire of the color.
+
+The first five conditions depend on the game state only. compile_rules
+checks them once for a game state, so the solver it returns only checks
+the conditions on the input.
+"""
+
+# the colors of Simple Wires
+WIRE_COLORS = ("red", "blue", "yellow", "white", "black")
+
+# the colors and texts of The Button
+BUTTON_COLORS = ("blue", "white", "yellow", "red")
+BUTTON_TEXTS = ("abort", "detonate", "hold", "press")
+
+# Simple Wires, by the amount of wires: position of the wire to cut
+# (Page 5, On the Subject of Wires)
+WIRES = {
+    3: [((("count", "red", "==", 0),), 2),
+        ((("last", "white"),), 3),
+        ((("count", "blue", ">", 1),), ("last", "blue")),
+        ((), 3)],
+    4: [((("count", "red", ">", 1), ("serial odd",)), ("last", "red")),
+        ((("last", "yellow"), ("count", "red", "==", 0)), 1),
+        ((("count", "blue", "==", 1),), 1),
+        ((("count", "yellow", ">", 1),), 4),
+        ((), 2)],
+    5: [((("last", "black"), ("serial odd",)), 4),
+        ((("count", "red", "==", 1), ("count", "yellow", ">", 1)), 1),
+        ((("count", "black", "==", 0),), 2),
+        ((), 1)],
+    6: [((("count", "yellow", "==", 0), ("serial odd",)), 3),
+        ((("count", "yellow", "==", 1), ("count", "white", ">", 1)), 4),
+        ((("count", "red", "==", 0),), 6),
+        ((), 4)],
+}
+
+# The Button: True to press and release, False to hold
+# (Page 6, On the Subject of The Button)
+BUTTON = [
+    ((("color", "blue"), ("text", "abort")), False),
+    ((("batteries over", 1), ("text", "detonate")), True),
+    ((("color", "white"), ("lit", "CAR")), False),
+    ((("batteries over", 2), ("lit", "FRK")), True),
+    ((("color", "yellow"),), False),
+    ((("color", "red"), ("text", "hold")), True),
+    ((), False),
+]
+
+CUT = [((), True)]
+DO_NOT_CUT = [((), False)]
+CUT_IF_EVEN = [((("serial even",),), True), ((), False)]
+CUT_IF_PARALLEL = [((("indicator", "PARALLEL"),), True), ((), False)]
+CUT_IF_BATTERIES = [((("batteries over", 1),), True), ((), False)]
+
+# Complicated Wires, by the sorted letters of a wire (b - blue, l - LED,
+# r - red, s - star, x - none of them): True to cut it
+COMPLICATED_WIRES = {
+    "x": CUT, "r": CUT_IF_EVEN, "b": CUT_IF_EVEN, "br": CUT_IF_EVEN,
+    "rs": CUT, "brs": CUT_IF_PARALLEL, "blrs": DO_NOT_CUT,
+    "blr": CUT_IF_EVEN, "lr": CUT_IF_BATTERIES, "s": CUT,
+    "bl": CUT_IF_PARALLEL, "bls": CUT_IF_PARALLEL, "ls": CUT_IF_BATTERIES,
+    "lrs": CUT_IF_BATTERIES, "bs": DO_NOT_CUT, "l": DO_NOT_CUT,
+}
+
+STATE_CONDITIONS = {
+    "serial odd": lambda state: state.odd,
+    "serial even": lambda state: state.even,
+    "batteries over": lambda state, amount: state.battery > amount,
+    "indicator": lambda state, label: bool(state.ind.get(label, False)),
+    "lit": lambda state, label: bool(state.lit.get(label, False)),
+}
+
+# solvers by their source, bombs with the same specialised rules share them
+COMPILED = {}
+
+# source of the input conditions, value is the input of the solver
+INPUT_CONDITIONS = {
+    "count": lambda color, op, amount: f"value.count({color!r}) {op} {amount!r}",
+    "last": lambda color: f"value[-1] == {color!r}",
+    "color": lambda color: f"value[0] == {color!r}",
+    "text": lambda text: f"value[1] == {text!r}",
+}
+
+
+def compile_answer(answer):
+    """Source of the expression of an answer of a rule."""
+
+    if isinstance(answer, tuple) and answer[0] == "last":
+        return f"len(value) - value[::-1].index({answer[1]!r})"
+    return repr(answer)
+
+
+def compile_rules(rules, state):
+    """Specialises a rule table on the game state.
+
+    Rules with a false state condition are dropped, true state conditions
+    are left out, and so are the rules after one that always applies. The
+    rules left are turned into a function of if statements.
+
+    Arguments:
+    rules (list): A rule table (see the module docstring).
+    state (GameState object): Current game state.
+
+    Outputs:
+    function(input) -> answer, None if no rule applies
+    """
+
+    lines = ["def solve(value):"]
+    for conditions, answer in rules:
+        tests = []
+        for name, *args in conditions:
+            if name in STATE_CONDITIONS:
+                if not STATE_CONDITIONS[name](state, *args):
+                    break
+            else:
+                tests.append(INPUT_CONDITIONS[name](*args))
+        else:
+            if not tests:
+                lines.append(f"    return {compile_answer(answer)}")
+                break
+            lines.append(f"    if {' and '.join(tests)}:")
+            lines.append(f"        return {compile_answer(answer)}")
+    else:
+        lines.append("    return None")
+
+    source = "\n".join(lines)
+    if source not in COMPILED:
+        namespace = {}
+        exec(source, namespace)
+        COMPILED[source] = namespace["solve"]
+    return COMPILED[source]
+
+
+def state_conditions(*tables):
+    """The state conditions of rule tables, each once, in order of appearance."""
+
+    conditions = []
+    for rules in tables:
+        for rule_conditions, answer in rules:
+            for condition in rule_conditions:
+                if condition[0] in STATE_CONDITIONS and condition not in conditions:
+                    conditions.append(condition)
+    return tuple(conditions)
+
+
+def fingerprint(conditions, state):
+    """The values of state conditions on the game state, as bits of an int."""
+
+    bits = 0
+    for number, (name, *args) in enumerate(conditions):
+        if STATE_CONDITIONS[name](state, *args):
+            bits |= 1 << number
+    return bits
+
+
+def digest():
+    """Hash of all rule tables, changes whenever a rule does."""
+
+    import hashlib
+    tables = (WIRE_COLORS, BUTTON_COLORS, BUTTON_TEXTS,
+              sorted(WIRES.items()), BUTTON, sorted(COMPLICATED_WIRES.items()))
+    return hashlib.sha1(repr(tables).encode()).hexdigest()
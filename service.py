@@ -0,0 +1,235 @@
+"""Solver service for several expert stations, on localhost.
+
+Every station connects to the service instead of running its own solver.
+The protocol is JSON lines over TCP: one request object per line, one
+response object per line. A connection stays open for as many requests
+as the station likes, and requests may be pipelined: they are answered in
+the order they were sent, the "id" of a request is given back with its
+response.
+
+A request solves either a headless line (see run_headless_mode) or calls a
+parse_* solver or pathfinder.get_path directly:
+
+    {"id": 1, "bomb": "station 1", "line": "batteries 2 1"}
+    {"id": 2, "bomb": "station 1", "line": "wires red blue yellow"}
+    {"id": 3, "bomb": "station 1", "call": "parse_wire_module",
+     "args": [["red", "blue", "yellow"]]}
+    {"id": 4, "call": "get_path", "args": [0, [1, 2], [6, 6]]}
+    {"id": 5, "bomb": "station 1", "call": "close"}
+
+    {"id": 1, "answer": null}
+    {"id": 2, "answer": "wires: Cut the second wire! (blue)"}
+    {"id": 3, "answer": 2}
+    {"id": 4, "answer": ["R D ...", "<maze>"]}
+    {"id": 5, "answer": null}
+    {"id": 6, "error": "MalformedInput('Unknown keypad symbol zz')"}
+
+A line or call that could not be solved gets an "error" instead of an
+"answer", so does the line of the third strike ("GameOver(...)").
+
+Every bomb has its own session (a HeadlessSession and its GameState),
+whichever connection its requests come from, so every line and parse_*
+request names its bomb. A session is kept until it is closed, or until it
+was idle for SESSION_TIMEOUT seconds, or MAX_SESSIONS newer sessions
+pushed it out. The game state is passed to the parse_* solvers as their
+last argument. Requests are solved on the event loop one at a time, so
+the requests of a bomb never see its game state half updated.
+
+    python service.py [--port 7331] [--log-level info] [--session-timeout 3600]
+"""
+
+import argparse
+import asyncio
+import collections
+import json
+import time
+
+import eventlog
+import keeptalkingandnobodyexplodes as ktane
+
+HOST = "127.0.0.1"
+PORT = 7331
+# longest request line, in bytes
+LIMIT = 64 * 1024
+# bytes of unsent responses after which a connection waits for the station
+HIGH_WATER = 64 * 1024
+# seconds after which an unused session is dropped
+SESSION_TIMEOUT = 3600
+# sessions kept at most, the least recently used one is dropped first
+MAX_SESSIONS = 1000
+
+
+def get_path(matrix_id, start, end):
+    import pathfinder  # the grid is only needed for mazes
+    return pathfinder.get_path(matrix_id, start, end)
+
+def parse_memory_module(stage, label, options, memory, state):
+    # JSON object keys are strings, the memory of the earlier stages is keyed by stage number
+    memory = {int(key): value for key, value in memory.items()}
+    return ktane.parse_memory_module(stage, label, options, memory, state)
+
+# functions of "call" requests, the parse_* ones get the game state as last argument
+CALLS = {name: getattr(ktane, name) for name in dir(ktane) if name.startswith("parse_")}
+CALLS["parse_memory_module"] = parse_memory_module
+CALLS["get_path"] = get_path
+
+
+class SolverService:
+    def __init__(self, session_timeout=SESSION_TIMEOUT, max_sessions=MAX_SESSIONS):
+        """
+        Arguments:
+        session_timeout (float): Seconds after which an unused session is dropped.
+        max_sessions (int): Sessions kept at most.
+        """
+
+        self.session_timeout = session_timeout
+        self.max_sessions = max_sessions
+        # bomb -> (session, time of its last request), least recently used first
+        self.sessions = collections.OrderedDict()
+        self.requests = 0
+
+    def session(self, bomb):
+        """The session of a bomb, a new one if there is none.
+
+        Throws:
+        MalformedInput if no bomb is given
+        """
+
+        if bomb is None:
+            raise ktane.MalformedInput("A request needs a bomb")
+        now = time.monotonic()
+        sessions = self.sessions
+        if bomb in sessions:
+            session = sessions.pop(bomb)[0]
+        else:
+            session = ktane.HeadlessSession()
+        # the least recently used sessions come first
+        while sessions:
+            oldest, (_, used) = next(iter(sessions.items()))
+            if now - used < self.session_timeout and len(sessions) < self.max_sessions:
+                break
+            del sessions[oldest]
+            ktane.log("session dropped", bomb=str(oldest), idle=now - used)
+        sessions[bomb] = (session, now)
+        return session
+
+    def call(self, name, args, bomb):
+        """Calls a function of CALLS.
+
+        Throws:
+        MalformedInput if there is no such function
+        """
+
+        if name == "close":
+            self.sessions.pop(bomb, None)
+            return None
+        if name not in CALLS:
+            raise ktane.MalformedInput(f"Unknown call {name}")
+        if not name.startswith("parse_"):
+            return CALLS[name](*args)
+        session = self.session(bomb)
+        if session.state is None:
+            session.state = ktane.setup_state(**session.setup)
+        return CALLS[name](*args, session.state)
+
+    def handle(self, request):
+        """Solves one request.
+
+        Arguments:
+        request (bytes): One request line.
+
+        Outputs:
+        dict, the response
+        """
+
+        self.requests += 1
+        response = {"id": None}
+        try:
+            request = json.loads(request)
+            if not isinstance(request, dict):
+                raise ktane.MalformedInput("A request must be an object")
+            response["id"] = request.get("id")
+            bomb = request.get("bomb")
+            if "line" in request:
+                response["answer"] = self.session(bomb).solve(request["line"])
+            elif "call" in request:
+                start = time.perf_counter()
+                response["answer"] = self.call(request["call"], request.get("args", []), bomb)
+                ktane.log("call", eventlog.DEBUG, call=request["call"],
+                          latency=time.perf_counter() - start)
+            else:
+                raise ktane.MalformedInput("A request needs a line or a call")
+        except Exception as e:  # like the exceptionbox of the GUI
+            ktane.log("error", eventlog.ERROR, request=repr(request), error=repr(e))
+            response.pop("answer", None)
+            response["error"] = repr(e)
+        return response
+
+    async def serve_connection(self, reader, writer):
+        peer = writer.get_extra_info("peername")
+        ktane.log("connected", peer=str(peer))
+        try:
+            while True:
+                try:
+                    line = await reader.readline()
+                except ValueError:  # longer than LIMIT
+                    writer.write(b'{"id": null, "error": "Request too long"}\n')
+                    break
+                if not line:
+                    break
+                if not line.strip():
+                    continue
+                response = self.handle(line)
+                writer.write(json.dumps(response, default=str).encode() + b"\n")
+                # pipelined requests are read from the buffer without
+                # waiting, only a slow reader holds up its connection
+                if writer.transport.get_write_buffer_size() > HIGH_WATER:
+                    await writer.drain()
+        except ConnectionError:
+            pass
+        finally:
+            ktane.log("disconnected", peer=str(peer))
+            writer.close()
+
+    async def start(self, host=HOST, port=PORT):
+        """Starts listening.
+
+        Outputs:
+        asyncio.Server
+        """
+
+        return await asyncio.start_server(self.serve_connection, host, port, limit=LIMIT)
+
+
+async def serve(host, port, session_timeout=SESSION_TIMEOUT, max_sessions=MAX_SESSIONS):
+    server = await SolverService(session_timeout, max_sessions).start(host, port)
+    for sock in server.sockets:
+        # load generators started with --port 0 read the port from this line
+        print("listening on {}:{}".format(*sock.getsockname()[:2]), flush=True)
+    async with server:
+        await server.serve_forever()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--host", default=HOST,
+                        help=f"address to listen on (default: {HOST})")
+    parser.add_argument("--port", type=int, default=PORT,
+                        help=f"port to listen on, 0 for any free one (default: {PORT})")
+    parser.add_argument("--log-level", choices=eventlog.LEVELS, default="warning",
+                        help="events written to stderr (default: warning)")
+    parser.add_argument("--session-timeout", type=float, default=SESSION_TIMEOUT,
+                        help=f"seconds after which an unused bomb is dropped (default: {SESSION_TIMEOUT})")
+    parser.add_argument("--max-sessions", type=int, default=MAX_SESSIONS,
+                        help=f"bombs kept at most (default: {MAX_SESSIONS})")
+    args = parser.parse_args()
+
+    ktane.events().level = eventlog.LEVELS[args.log_level]
+    try:
+        asyncio.run(serve(args.host, args.port, args.session_timeout, args.max_sessions))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,73 @@
+"""Generated by generate_tables.py from rules.py, do not edit.
+
+Answers of Simple Wires, The Button and Complicated Wires for every
+input, one row per fingerprint of the game state (see generate_tables.py).
+"""
+
+import base64
+import zlib
+
+import rules
+
+DIGEST = 'a478fec422a2d960be27f4b019ab68c211744c7e'
+
+WIRE_COLORS = ('red', 'blue', 'yellow', 'white', 'black')
+BUTTON_COLORS = ('blue', 'white', 'yellow', 'red')
+BUTTON_TEXTS = ('abort', 'detonate', 'hold', 'press')
+COMPLICATED_WIRES = ('b', 'bl', 'blr', 'blrs', 'bls', 'br', 'brs', 'bs', 'l', 'lr', 'lrs', 'ls', 'r', 'rs', 's', 'x')
+
+# table name -> (state conditions, {fingerprint: offset of the row})
+TABLES = {
+    'wires 3': ((),
+        {0: 0}),
+    'wires 4': ((('serial odd',),),
+        {0: 125, 1: 750}),
+    'wires 5': ((('serial odd',),),
+        {0: 1375, 1: 4500}),
+    'wires 6': ((('serial odd',),),
+        {0: 7625, 1: 23250}),
+    'button': ((('batteries over', 1), ('lit', 'CAR'), ('batteries over', 2), ('lit', 'FRK')),
+        {0: 38875, 1: 38891, 2: 38907, 3: 38923, 5: 38939, 7: 38955, 8: 38971, 9: 38987, 10: 39003, 11: 39019, 13: 39035, 15: 39051}),
+    'complicated wires': ((('serial even',), ('indicator', 'PARALLEL'), ('batteries over', 1)),
+        {0: 39067, 1: 39083, 2: 39099, 3: 39115, 4: 39131, 5: 39147, 6: 39163, 7: 39179}),
+}
+
+SIZES = {'wires 3': 125, 'wires 4': 625, 'wires 5': 3125, 'wires 6': 15625, 'button': 16, 'complicated wires': 16}
+
+DATA = zlib.decompress(base64.b64decode(
+    "eNrtnAGSgyAMRRdlvP+Rt6AoWIK0tSZT35/KqjGJCYEA6o5jC0PAuCtWyseEwcXNucfml8Ps"
+    "3JD2tiJeF/e8894vbL4h6g0dwzA8SQjFQg0/X3BkhKGPINoh6ojXxXOPLeymIhcVD6NxLpf3"
+    "RGi7pH27oqjtXC/hcuU+BGLQOuyLjBAUbcVMSBXgw73MRU4I54ZUHBAqOqSA82IwSL6SCaId"
+    "Lwecl+pDJoguEW9X1iFV7UGd6yiv1WvEiQQRXaJcheCSR5a/DY63lUs6yv6zzWHTclWYqXPX"
+    "GdTrdSdFe80OSUfiy4smh03LTQfcFe1cs85rdog6XibYtJwejh7uPj0cAJf3cPv5qUvzxJMI"
+    "YtElylUILk1rw16b423lko5yOt3msGm5amGmzl1nUK/XnRTtNTskHZF3KBYS2hw2LTcdcFe0"
+    "c806r9kh6niZYNNyejh6uPv0cBQUlxYAAAAAAAAAAADowfTAvngi+ArBz2cFjoLQpdx3icqu"
+    "m9JhW9SR8podkg6/nksXHYiy6XYzAadV5223f0hoKO+woxQ1Jep86XQoyqbbLQScVjvXrHPJ"
+    "DlmHaLkoyqTbSamk1PukVAAYwzGG+/kxnFado1xBuXLAGWnn17tdtuNVy2WCSbeTUkmp90mp"
+    "ALAOxzrcL6/DMYZjDHdlwGm2c906V+3hVN1OSiWl3ialAmBv4Zdnqef37byexDoc63CM4RjD"
+    "8XoSKdV8Sh3H+T++Pn4B26FIEG/0dVGqylXb0n3dTsARcPdxO7gfaGq4HeUEHHVOwBFwv688"
+    "zKHnqfSUDqX5ecHhs8MDUUrLIn2W53aIOnJRU5coy27nSQNPGq5tagZ6uC+1c9U673LJVHH7"
+    "s44jy9sEc90rKZWUepuUCgBjOMZwfAjNt8h8CH1SwPERDR/RkFJJqT+7LMKTBp40sA7HOtw3"
+    "3c4YjjGcQlNT7V6/1c5V69x0D6evnJRKSr3Foy0mDUwaeJbKs1ReT2IdjnU4xnCM4Xg9iZSq"
+    "n1L/Crj42zb3d0g/Ov5Yfom/uG2nS/ZE3B9mJxYRKz3jLfhXfQt/oif+hf4POS03kw=="
+))
+
+
+# the tables are only used while the rules are the same
+CURRENT = DIGEST == rules.digest()
+
+
+def answers(name, state):
+    """Row of answers of a table for the game state, indexed by input number.
+
+    None if the rules changed since the tables were generated or the
+    generator never saw a game state with this fingerprint.
+    """
+
+    if not CURRENT:
+        return None
+    conditions, offsets = TABLES[name]
+    offset = offsets.get(rules.fingerprint(conditions, state))
+    if offset is None:
+        return None
+    return DATA[offset:offset + SIZES[name]]